@@ -0,0 +1,89 @@
+"""Compare the regex note and bracket removal with the stack-based scanner.
+
+Times ``remove_notes`` followed by ``remove_square_brackets``, as run by
+``process_text``, on a book-sized text built from the bundled subtitles with
+notes and references mixed in, and on adversarial inputs: brackets that are
+never closed, and notes nested deeper than the four levels the regex
+handles. Checks that both produce the same output on the book.
+
+Usage:
+    python -m benchmarks.bench_bracket_scanner --chars 2000000 --adversarial 20000
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+
+def legacy_remove_notes(text):
+    pattern = r'\[Note:(?:[^\[\]]|\[(?:[^\[\]]|\[(?:[^\[\]]|\[[^\[\]]*\])*\])*\])*\]'
+    text = re.sub(pattern, '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<p>\s*</p>', '', text)
+    text = re.sub(r'<br>\s*', '', text)
+    text = re.sub(r'<small>\s*</small>', '', text)
+    return text
+
+
+def legacy_remove_square_brackets(text):
+    return re.sub(r'\[.*?\]', '', text, flags=re.DOTALL)
+
+
+def book_text(chars, seed=0):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "subtitles", "english_original.srt"), encoding="utf-8") as f:
+        blocks = f.read().strip().split("\n\n")
+    sentences = [block.split("\n", 2)[2].replace("\n", " ") for block in blocks]
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < chars:
+        part = rng.choice(sentences)
+        roll = rng.random()
+        if roll < 0.05:
+            part = f"<p>{part} [Note: see {rng.choice(sentences)} [{rng.randint(1, 300)}]]</p>"
+        elif roll < 0.15:
+            part += f" [{rng.randint(1, 300)}]"
+        parts.append(part)
+        size += len(part) + 1
+    return "\n".join(parts)
+
+
+def time_pair(text):
+    timings = {}
+    outputs = {}
+    for name, notes, brackets in (("regex", legacy_remove_notes, legacy_remove_square_brackets),
+                                  ("scanner", remove_notes, remove_square_brackets)):
+        start = time.perf_counter()
+        outputs[name] = brackets(notes(text))
+        timings[name] = time.perf_counter() - start
+    return timings, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=2_000_000)
+    parser.add_argument("--adversarial", type=int, default=20_000,
+                        help="Number of brackets in the adversarial inputs")
+    args = parser.parse_args()
+
+    global remove_notes, remove_square_brackets
+    from pipeline_support.text_processing import remove_notes, remove_square_brackets
+
+    inputs = {
+        "book": book_text(args.chars),
+        "unclosed [": "[a " * args.adversarial,
+        "deep [Note:": "[Note: a " * args.adversarial + "]" * args.adversarial,
+    }
+    print(f"{'input':<18}{'chars':>10}{'regex s':>10}{'scanner s':>11}{'speedup':>9}")
+    for name, text in inputs.items():
+        timings, outputs = time_pair(text)
+        if name == "book":
+            assert outputs["regex"] == outputs["scanner"], "outputs differ"
+        print(f"{name:<18}{len(text):>10}{timings['regex']:>10.3f}{timings['scanner']:>11.3f}"
+              f"{timings['regex'] / timings['scanner']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare MP3 concatenation strategies on a synthetic multi-part book.
+
+Generates ``--parts`` short MP3 files with ffmpeg (Polly-like 24 kHz mono),
+then combines them with the legacy pydub implementation and with
+``combine_mp3_files``. Each run happens in a fresh subprocess so wall time
+and peak RSS (including ffmpeg children) are measured independently.
+
+Usage:
+    python -m benchmarks.bench_combine_mp3 --parts 200 --seconds 30
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def legacy_combine(files, output_file):
+    """The pre-concat-demuxer implementation, kept for comparison."""
+    from pydub import AudioSegment
+    from pipeline_support.audio_processing import natural_sort_key
+
+    combined = AudioSegment.empty()
+    for file in sorted(files, key=natural_sort_key):
+        combined += AudioSegment.from_mp3(file)
+    combined.export(output_file, format="mp3")
+    return output_file
+
+
+def make_parts(directory, parts, seconds):
+    for i in range(1, parts + 1):
+        path = os.path.join(directory, f"book_part{i:03d}_Matthew.mp3")
+        subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                        "-f", "lavfi", "-i", f"sine=frequency={200 + i}:duration={seconds}",
+                        "-ar", "24000", "-ac", "1", "-c:a", "libmp3lame", "-b:a", "48k", path],
+                       check=True)
+
+
+def run_variant(variant, parts_dir, output_file):
+    """Run one variant in this process and print its wall time and peak RSS as JSON."""
+    from pipeline_support.audio_processing import combine_mp3_files
+
+    files = glob.glob(os.path.join(parts_dir, "*.mp3"))
+    start = time.perf_counter()
+    if variant == "legacy":
+        legacy_combine(files, output_file)
+    else:
+        combine_mp3_files(files, output_file)
+    seconds = time.perf_counter() - start
+
+    # Linux reports ru_maxrss in KiB; the ffmpeg children count separately
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({"seconds": seconds, "peak_mb": max(self_kb, children_kb) / 1024}))
+
+
+def measure(variant, parts_dir, output_file):
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_combine_mp3",
+                             "--run", variant, "--parts-dir", parts_dir, "--output", output_file],
+                            check=True, capture_output=True, text=True)
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    return stats["seconds"], stats["peak_mb"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parts", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--run", choices=["legacy", "concat"], help=argparse.SUPPRESS)
+    parser.add_argument("--parts-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_variant(args.run, args.parts_dir, args.output)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parts_dir = os.path.join(tmp_dir, "parts")
+        os.makedirs(parts_dir)
+        print(f"Generating {args.parts} parts of {args.seconds:g}s...")
+        make_parts(parts_dir, args.parts, args.seconds)
+
+        print(f"{'variant':<10}{'wall (s)':>12}{'peak RSS (MB)':>16}")
+        for variant in ("legacy", "concat"):
+            output_file = os.path.join(tmp_dir, f"{variant}.mp3")
+            seconds, peak_mb = measure(variant, parts_dir, output_file)
+            print(f"{variant:<10}{seconds:>12.2f}{peak_mb:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Measure how segmented moviepy rendering scales with worker count.
+
+Generates a synthetic book of ``--seconds`` of audio with a subtitle every
+three seconds, then renders it with ``renderer='segmented'`` for each worker
+count in ``--workers`` and prints wall time and speedup over one worker.
+
+Usage:
+    python -m benchmarks.bench_segmented_video --seconds 600 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+
+def make_book(directory, seconds):
+    mp3_path = os.path.join(directory, "book.mp3")
+    subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                    "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+                    "-ar", "24000", "-ac", "1", "-c:a", "libmp3lame", "-b:a", "48k", mp3_path],
+                   check=True)
+
+    srt_path = os.path.join(directory, "book.srt")
+    with open(srt_path, "w", encoding="utf-8") as f:
+        for i, start in enumerate(range(0, int(seconds) - 3, 3), 1):
+            f.write(f"{i}\n{srt_time(start + 0.2)} --> {srt_time(start + 2.8)}\n"
+                    f"Subtitle number {i} of the synthetic benchmark book.\n\n")
+    return mp3_path, srt_path
+
+
+def srt_time(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=600.0)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    from pipeline_support.audio_processing import enhanced_mp3_to_mp4_with_subtitles
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Generating {args.seconds:g}s synthetic book...")
+        mp3_path, srt_path = make_book(tmp_dir, args.seconds)
+
+        print(f"{'workers':<10}{'wall (s)':>12}{'speedup':>10}")
+        baseline = None
+        for workers in args.workers:
+            output_path = os.path.join(tmp_dir, f"segmented_{workers}.mp4")
+            start = time.perf_counter()
+            enhanced_mp3_to_mp4_with_subtitles(mp3_path, srt_path, None, output_path, "Benchmark Book",
+                                               renderer="segmented", workers=workers)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(f"{workers:<10}{seconds:>12.2f}{baseline / seconds:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare the character-loop sentence splitters with the index-slicing ones.
+
+Builds a book-scale text by repeating the bundled subtitle text, then times
+the legacy per-character splitters against ``split_english_sentences``,
+``split_latin_sentences`` and ``split_long_sentence`` and checks that both
+produce the same output.
+
+Usage:
+    python -m benchmarks.bench_sentence_splitters --chars 2000000
+"""
+
+import argparse
+import os
+import time
+
+
+def legacy_split_english(text):
+    result = []
+    current_sentence = ""
+    in_special_block = False
+    special_block_char = None
+    for char in text:
+        current_sentence += char
+        if char in "([\"":
+            in_special_block = True
+            special_block_char = char
+        elif (char == ")" and special_block_char == "(") or \
+             (char == "]" and special_block_char == "[") or \
+             (char == "\"" and special_block_char == "\""):
+            in_special_block = False
+            special_block_char = None
+        elif char in ".!?" and not in_special_block and len(current_sentence.strip()) > 0:
+            result.append(current_sentence.strip())
+            current_sentence = ""
+    if current_sentence.strip():
+        result.append(current_sentence.strip())
+    return result
+
+
+def legacy_split_latin(text):
+    sentences = []
+    current_sentence = ""
+    parenthesis_level = 0
+    for char in text:
+        current_sentence += char
+        if char == '(':
+            parenthesis_level += 1
+        elif char == ')':
+            parenthesis_level -= 1
+        elif char == '.' and parenthesis_level == 0 and len(current_sentence.strip()) > 0:
+            sentences.append(current_sentence.strip())
+            current_sentence = ""
+    if current_sentence.strip():
+        sentences.append(current_sentence.strip())
+    return sentences
+
+
+def legacy_split_long(sentence, max_chars):
+    chunks = []
+    current_chunk = ""
+    for word in sentence.split():
+        if len(current_chunk) + len(word) + 1 <= max_chars:
+            current_chunk += (" " if current_chunk else "") + word
+        else:
+            if current_chunk:
+                chunks.append(current_chunk)
+            current_chunk = word
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def book_text(language, chars):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "subtitles", f"{language}_original.srt"), encoding="utf-8") as f:
+        blocks = f.read().strip().split("\n\n")
+    sample = "\n".join(block.split("\n", 2)[2] for block in blocks)
+    return (sample + "\n") * (chars // len(sample) + 1)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=2000000)
+    args = parser.parse_args()
+
+    from textract_ssml_processor.timestamp import split_english_sentences, split_latin_sentences, split_long_sentence
+
+    english = book_text("english", args.chars)
+    latin = book_text("latin", args.chars)
+    cases = [
+        ("english sentences", legacy_split_english, split_english_sentences, (english,)),
+        ("latin sentences", legacy_split_latin, split_latin_sentences, (latin,)),
+        ("long sentence", legacy_split_long, split_long_sentence, (latin, 300)),
+    ]
+
+    print(f"{'splitter':<20}{'legacy (s)':>12}{'new (s)':>12}{'speedup':>10}")
+    for name, legacy, new, case_args in cases:
+        legacy_seconds, expected = timed(legacy, *case_args)
+        new_seconds, actual = timed(new, *case_args)
+        assert actual == expected, f"{name}: outputs differ"
+        print(f"{name:<20}{legacy_seconds:>12.3f}{new_seconds:>12.3f}{legacy_seconds / new_seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Compare the ten separate SSML checks with the one-pass validator engine.
+
+Writes ``--files`` processed JSON files of ``--chunks`` SSML chunks each,
+built from the bundled subtitle text, then validates the corpus with the
+individual ``test_*`` functions and with ``run_tests_on_file``, checks that
+both report the same findings and prints the throughput of each.
+
+Usage:
+    python -m benchmarks.bench_ssml_validator --files 200 --chunks 60
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+
+def legacy_run_tests_on_file(validator, file_path):
+    """The per-check implementation of ``run_tests_on_file``, kept for comparison."""
+    data = validator.load_json_data(file_path)
+    ssml_list = validator.extract_clean_english_ssml(data)
+    return {
+        "English Word": validator.test_english_word(ssml_list),
+        "Punctuation": validator.test_punctuation(ssml_list),
+        "Speak Tags": validator.test_speak_tags(ssml_list),
+        "Non-standard Characters": validator.test_non_standard_characters_outside_tags(ssml_list),
+        "Translation Length": validator.test_translation_length(data),
+        "Malformed Closing Tags": validator.test_malformed_closing_tags(data),
+        "Misplaced Closing Tags": validator.test_misplaced_closing_tags(ssml_list),
+        "Random Single Letters": validator.test_random_single_letters_outside_tags(ssml_list),
+        "Balanced Tags": validator.test_balanced_tags(ssml_list),
+        "Nested Tags": validator.test_nested_tags(ssml_list),
+    }
+
+
+def subtitle_sentences(language):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "subtitles", f"{language}_original.srt"), encoding="utf-8") as f:
+        blocks = f.read().strip().split("\n\n")
+    text = " ".join(block.split("\n", 2)[2].replace("\n", " ") for block in blocks)
+    return [sentence.strip() + "." for sentence in text.split(". ") if sentence.strip()]
+
+
+def ssml_chunk(rng, english):
+    paragraphs = []
+    for _ in range(rng.randint(2, 5)):
+        sentences = [f"<s>{rng.choice(english)}</s>" for _ in range(rng.randint(2, 6))]
+        if rng.random() < 0.3:
+            sentences.insert(1, '<lang xml:lang="la">Dominus vobiscum</lang>')
+        paragraphs.append("<p>" + " ".join(sentences) + "</p>")
+    return "<speak>" + '<break time="500ms"/>'.join(paragraphs) + "</speak>"
+
+
+def write_corpus(directory, files, chunks, seed=0):
+    rng = random.Random(seed)
+    english = subtitle_sentences("english")
+    latin = subtitle_sentences("latin")
+    total_bytes = 0
+    for number in range(files):
+        data = {"chunks": [
+            {"chunk_number": i, "original_latin": " ".join(rng.sample(latin, 12)),
+             "cleaned_english_translation": ssml_chunk(rng, english)}
+            for i in range(1, chunks + 1)
+        ]}
+        path = os.path.join(directory, f"book{number:04d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        total_bytes += os.path.getsize(path)
+    return total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=60)
+    args = parser.parse_args()
+
+    from pipeline_support import ssml_validator
+
+    with tempfile.TemporaryDirectory() as directory:
+        total_bytes = write_corpus(directory, args.files, args.chunks)
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+        timings = {}
+        outputs = {}
+        for name, run in (("separate checks", lambda path: legacy_run_tests_on_file(ssml_validator, path)),
+                          ("one-pass engine", ssml_validator.run_tests_on_file)):
+            start = time.perf_counter()
+            outputs[name] = [run(path) for path in paths]
+            timings[name] = time.perf_counter() - start
+        assert outputs["separate checks"] == outputs["one-pass engine"], "findings differ"
+
+    megabytes = total_bytes / 1e6
+    print(f"corpus: {len(paths)} files, {len(paths) * args.chunks} chunks, {megabytes:.1f} MB")
+    print(f"{'validator':<20}{'seconds':>10}{'MB/s':>10}")
+    for name, seconds in timings.items():
+        print(f"{name:<20}{seconds:>10.2f}{megabytes / seconds:>10.1f}")
+    print(f"speedup: {timings['separate checks'] / timings['one-pass engine']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
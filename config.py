@@ -8,3 +8,5 @@ class Config:
     LATIN_FOLDER = os.path.join(os.getcwd(), 'latin')
     AUDIO_OUTPUT_FOLDER = os.path.join(os.getcwd(), 'audio')
     SUBTITLE_OUTPUT = os.path.join(os.getcwd(), 'subtitles')
+    # Worker processes for batch timestamp generation (None uses every CPU)
+    TIMESTAMP_WORKERS = int(os.environ.get('TIMESTAMP_WORKERS', 0)) or None
@@ -3,16 +3,20 @@ import shutil
 import re
 import glob
 import subprocess
+import tempfile
 import time
 import logging
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from pydub import AudioSegment
 from mutagen.mp4 import MP4, MP4Cover
 from mutagen.id3 import ID3, TIT2, TPE1, TALB, TDRC, TCON, COMM, APIC, error
 from mutagen.mp3 import MP3
-from moviepy.editor import AudioFileClip, ColorClip, CompositeVideoClip, TextClip, ImageClip
+from moviepy.editor import AudioFileClip, ColorClip, CompositeVideoClip, TextClip, ImageClip, VideoClip
 from moviepy.config import change_settings
-
-from moviepy.video.tools.subtitles import SubtitlesClip
+from PIL import Image, ImageDraw, ImageFont
 
 # Configuration
 image_magick_binary = os.environ.get("IMAGEMAGICK_BINARY")
@@ -23,11 +27,19 @@ if image_magick_binary:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
 # Constants
-FONT_DIR = os.path.join('../static', os.path.dirname(os.path.abspath(__file__)))
+FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'textract_ssml_processor', 'static', 'fonts')
 LUXURIOUS_ROMAN = os.path.join(FONT_DIR, "LuxuriousRoman-Regular.ttf")
 OPEN_SANS = os.path.join(FONT_DIR, "OpenSans-VariableFont_wdth,wght.ttf")
 PT_SERIF = os.path.join(FONT_DIR, "PTSerif-Regular.ttf")
 
+# Family names libass resolves from FONT_DIR
+FONT_FAMILIES = {
+    LUXURIOUS_ROMAN: "Luxurious Roman",
+    OPEN_SANS: "Open Sans",
+    PT_SERIF: "PT Serif",
+}
+
 BACKGROUND_COLOR = (237, 224, 202)  # #EDE0CA (light beige)
 TEXT_COLOR = (62, 44, 27)  # #3E2C1B (dark brown)
 HIGHLIGHT_COLOR = (184, 134, 11)  # #B8860B (Dark Goldenrod)
@@ -43,6 +55,20 @@ def check_ffmpeg_installed():
     except subprocess.CalledProcessError:
         return False
 
+def ffmpeg_version():
+    """``(major, minor)`` of the installed ffmpeg, or ``None`` when the build has no release number."""
+    output = subprocess.run(["ffmpeg", "-version"], check=True, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True).stdout
+    match = re.match(r'ffmpeg version n?(\d+)(?:\.(\d+))?', output)
+    return (int(match.group(1)), int(match.group(2) or 0)) if match else None
+
+def vfr_output_options():
+    """Variable frame rate output: ``-fps_mode`` from ffmpeg 5.1 on, ``-vsync`` before it."""
+    version = ffmpeg_version()
+    if version is not None and version < (5, 1):
+        return ["-vsync", "vfr"]
+    return ["-fps_mode", "vfr"]
+
 def natural_sort_key(s):
     return [int(c) if c.isdigit() else c.lower() for c in re.split(r'(\d+)', s)]
 
@@ -52,56 +78,284 @@ def rgb_to_string(rgb_tuple):
 def remove_ssml_tags(text):
     return re.sub(r'<[^>]+>', '', text).strip()
 
-def parse_srt(srt_file):
-    with open(srt_file, 'r', encoding='utf-8') as file:
-        content = file.read()
-
-    # Split the content into individual subtitle blocks
-    subtitle_blocks = re.split(r'\n\s*\n', content.strip())
-    
-    subtitles = []
-    for block in subtitle_blocks:
-        parts = block.split('\n', 2)
-        if len(parts) < 3:
-            continue  # Skip invalid blocks
-        
-        index = parts[0]
-        time_range = parts[1]
-        text = parts[2].strip()
-        
-        # Extract start and end times
-        time_pattern = r'(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})'
-        time_match = re.match(time_pattern, time_range)
+SRT_TIME_PATTERN = re.compile(r'(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})')
+
+class SubtitleIndex:
+    """
+    Compact, time-sorted subtitle store.
+
+    Start and end times live in parallel ``array('d')`` columns next to a
+    plain list of texts, so 20k subtitles take a few hundred kilobytes and the
+    subtitle on screen at any time is found by bisection. Iterating yields the
+    same ``{'index', 'start', 'end', 'text'}`` dicts ``parse_srt`` always
+    returned, so list-based helpers keep working.
+    """
+
+    def __init__(self):
+        self.numbers = array('l')
+        self.starts = array('d')
+        self.ends = array('d')
+        self.texts = []
+
+    @classmethod
+    def from_srt(cls, srt_file):
+        index = cls()
+        for number, start, end, text in iter_srt_blocks(srt_file):
+            index.append(number, start, end, text)
+        index.sort()
+        return index
+
+    @classmethod
+    def from_subtitles(cls, subtitles):
+        index = cls()
+        for i, sub in enumerate(subtitles, 1):
+            index.append(sub.get('index', i), sub['start'], sub['end'], sub['text'])
+        index.sort()
+        return index
+
+    def append(self, number, start, end, text):
+        self.numbers.append(number)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.texts.append(text)
+
+    def sort(self):
+        """Order by start time; a no-op for the already-sorted files we generate."""
+        if all(a <= b for a, b in zip(self.starts, self.starts[1:])):
+            return
+        order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+        self.numbers = array('l', (self.numbers[i] for i in order))
+        self.starts = array('d', (self.starts[i] for i in order))
+        self.ends = array('d', (self.ends[i] for i in order))
+        self.texts = [self.texts[i] for i in order]
+
+    def position_at(self, t):
+        """
+        Position of the subtitle showing at ``t`` or -1. When subtitles overlap,
+        the one that started most recently wins.
+        """
+        i = bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.ends[i]:
+            return i
+        return -1
+
+    def text_at(self, t):
+        i = self.position_at(t)
+        return self.texts[i] if i >= 0 else None
+
+    @property
+    def duration(self):
+        return max(self.ends) if self.ends else 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, i):
+        return {'index': self.numbers[i], 'start': self.starts[i], 'end': self.ends[i], 'text': self.texts[i]}
+
+    def __iter__(self):
+        for i in range(len(self.texts)):
+            yield self[i]
+
+def iter_srt_blocks(srt_file):
+    """
+    Stream ``(index, start, end, text)`` from an SRT file one line at a time.
+
+    Blocks are separated by blank lines; blocks without a text line or with a
+    malformed timing line are skipped, as ``parse_srt`` always did.
+    """
+    def finish(block):
+        if len(block) < 3:
+            return None
+        time_match = SRT_TIME_PATTERN.match(block[1])
         if not time_match:
-            continue  # Skip if time format is invalid
-        
+            return None
         start_time, end_time = time_match.groups()
-        
-        subtitles.append({
-            'index': int(index),
-            'start': time_to_seconds(start_time),
-            'end': time_to_seconds(end_time),
-            'text': text
-        })
-    
-    return subtitles
+        return (int(block[0]), time_to_seconds(start_time), time_to_seconds(end_time),
+                '\n'.join(block[2:]).strip())
+
+    with open(srt_file, 'r', encoding='utf-8') as file:
+        block = []
+        for line in file:
+            line = line.rstrip('\n')
+            if line.strip():
+                block.append(line if block else line.strip())
+                continue
+            parsed = finish(block)
+            if parsed:
+                yield parsed
+            block = []
+        parsed = finish(block)
+        if parsed:
+            yield parsed
+
+def parse_srt(srt_file):
+    return SubtitleIndex.from_srt(srt_file)
 
 def time_to_seconds(time_str):
     h, m, s = time_str.replace(',', '.').split(':')
     return int(h) * 3600 + int(m) * 60 + float(s)
 
+def concat_file_line(file):
+    """A concat demuxer ``file`` line for ``file``, with single quotes escaped."""
+    escaped = os.path.abspath(file).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+def write_concat_list(files, list_path):
+    """Write an ffmpeg concat demuxer list for ``files``."""
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for file in files:
+            f.write(concat_file_line(file))
+    return list_path
+
 # Audio Processing Functions
+def mp3_stream_parameters(file):
+    """Return the MPEG parameters that must match for a lossless stream copy."""
+    info = MP3(file).info
+    return (info.version, info.layer, info.sample_rate, info.channels)
+
+def mp3_files_share_codec_parameters(files):
+    parameters = {mp3_stream_parameters(file) for file in files}
+    return len(parameters) <= 1
+
 def combine_mp3_files(files, output_file):
-    combined = AudioSegment.empty()
-    for file in sorted(files, key=natural_sort_key):
-        combined += AudioSegment.from_mp3(file)
-    combined.export(output_file, format="mp3")
+    """
+    Concatenate MP3 parts in natural order into ``output_file``.
+
+    When every part has the same MPEG version, layer, sample rate and channel
+    count, ffmpeg's concat demuxer copies the frames without decoding. Otherwise
+    the parts are decoded one at a time and streamed into a single encoder, so
+    memory use stays bounded regardless of the book length.
+    """
+    if not check_ffmpeg_installed():
+        raise RuntimeError("ffmpeg is required to combine MP3 files.")
+
+    ordered = sorted(files, key=natural_sort_key)
+    if mp3_files_share_codec_parameters(ordered):
+        logging.info(f"Combining {len(ordered)} MP3 files with stream copy")
+        concat_mp3_stream_copy(ordered, output_file)
+    else:
+        logging.info(f"MP3 parameters differ; re-encoding {len(ordered)} files")
+        concat_mp3_reencode(ordered, output_file)
     return output_file
 
+def concat_mp3_stream_copy(files, output_file):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        list_path = write_concat_list(files, os.path.join(tmp_dir, 'parts.txt'))
+        subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                        "-f", "concat", "-safe", "0", "-i", list_path,
+                        "-map", "0:a", "-c", "copy", output_file], check=True)
+
+def concat_mp3_reencode(files, output_file, sample_rate=None, channels=None):
+    """Decode each file in turn and pipe raw PCM into one MP3 encoder."""
+    _, _, first_rate, first_channels = mp3_stream_parameters(files[0])
+    sample_rate = str(sample_rate or first_rate)
+    channels = str(channels or first_channels)
+    pcm_format = ["-f", "s16le", "-ar", sample_rate, "-ac", channels]
+
+    encoder = subprocess.Popen(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                                *pcm_format, "-i", "pipe:0",
+                                "-c:a", "libmp3lame", output_file],
+                               stdin=subprocess.PIPE)
+    try:
+        for file in files:
+            decoder = subprocess.Popen(["ffmpeg", "-hide_banner", "-loglevel", "error",
+                                        "-i", file, *pcm_format, "pipe:1"],
+                                       stdout=subprocess.PIPE)
+            shutil.copyfileobj(decoder.stdout, encoder.stdin, 1 << 16)
+            decoder.stdout.close()
+            if decoder.wait() != 0:
+                raise subprocess.CalledProcessError(decoder.returncode, decoder.args)
+    finally:
+        encoder.stdin.close()
+        encoder.wait()
+    if encoder.returncode != 0:
+        raise subprocess.CalledProcessError(encoder.returncode, encoder.args)
+
 def convert_to_audiobook(mp3_file, audiobook_file):
     AudioSegment.from_mp3(mp3_file).export(audiobook_file, format="mp4")
     return audiobook_file
 
+def escape_ffmetadata(value):
+    """Escape a value for ffmpeg's FFMETADATA1 format."""
+    return re.sub(r'([=;#\\\n])', r'\\\1', str(value))
+
+def chapters_from_durations(durations, chapter_titles=None):
+    """
+    Build chapter boundaries, one per part, in synthesis order.
+
+    ``durations`` are the part lengths in seconds; ``chapter_titles`` defaults
+    to "Part N".
+    """
+    chapters = []
+    start = 0.0
+    for i, duration in enumerate(durations, start=1):
+        title = chapter_titles[i - 1] if chapter_titles else f"Part {i}"
+        chapters.append({'title': title, 'start': start, 'end': start + duration})
+        start += duration
+    return chapters
+
+def write_ffmetadata(metadata_path, tags, chapters):
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        f.write(";FFMETADATA1\n")
+        for key, value in tags.items():
+            if value:
+                f.write(f"{key}={escape_ffmetadata(value)}\n")
+        for chapter in chapters:
+            f.write("[CHAPTER]\nTIMEBASE=1/1000\n")
+            f.write(f"START={int(round(chapter['start'] * 1000))}\n")
+            f.write(f"END={int(round(chapter['end'] * 1000))}\n")
+            f.write(f"title={escape_ffmetadata(chapter['title'])}\n")
+    return metadata_path
+
+def build_m4b_audiobook(part_files, audiobook_file, title, author, year, genre, description,
+                        cover_image_path=None, chapter_titles=None, durations=None, bitrate='64k'):
+    """
+    Build a tagged M4B with one chapter per part in a single ffmpeg pass.
+
+    The parts are decoded once and encoded straight to AAC; tags, chapters and
+    the cover are written by the same invocation, so no combined MP3 is
+    produced and nothing is held in memory. ``durations`` (for example from
+    the synthesis manifest) avoid reading the MP3 headers for chapter times.
+    """
+    if not check_ffmpeg_installed():
+        raise RuntimeError("ffmpeg is required to build an audiobook.")
+
+    ordered = sorted(part_files, key=natural_sort_key)
+    if durations is None:
+        durations = [MP3(file).info.length for file in ordered]
+    chapters = chapters_from_durations(durations, chapter_titles)
+    tags = {
+        'title': title,
+        'artist': author,
+        'album': title,
+        'date': year,
+        'genre': genre,
+        'description': description,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        list_path = write_concat_list(ordered, os.path.join(tmp_dir, 'parts.txt'))
+        metadata_path = write_ffmetadata(os.path.join(tmp_dir, 'metadata.txt'), tags, chapters)
+
+        command = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                   "-f", "concat", "-safe", "0", "-i", list_path,
+                   "-f", "ffmetadata", "-i", metadata_path]
+        if cover_image_path:
+            command += ["-i", cover_image_path]
+        command += ["-map", "0:a", "-map_metadata", "1", "-map_chapters", "1"]
+        if cover_image_path:
+            command += ["-map", "2:v", "-c:v", "copy", "-disposition:v:0", "attached_pic"]
+        command += ["-c:a", "aac", "-b:a", bitrate, "-movflags", "+faststart",
+                    "-f", "mp4", audiobook_file]
+
+        start_time = time.time()
+        subprocess.run(command, check=True)
+
+    logging.info(f"Audiobook with {len(chapters)} chapters written to {audiobook_file} "
+                 f"in {time.time() - start_time:.2f} seconds")
+    return audiobook_file
+
 def add_metadata_to_m4b(m4b_file_path, cover_image_path, title, author, year, genre, description):
     audio = MP4(m4b_file_path)
     audio['\xa9nam'] = title
@@ -137,6 +391,43 @@ def add_metadata_to_mp3(mp3_file_path, cover_image_path, title, author, year, ge
     audio.save()
     logging.info("Metadata added successfully to MP3.")
 
+class IndexedSubtitlesClip(VideoClip):
+    """
+    Drop-in replacement for moviepy's ``SubtitlesClip`` backed by a
+    ``SubtitleIndex``. The active subtitle is found by bisection instead of a
+    scan over every subtitle, and only the text clip currently on screen is
+    kept rather than one per subtitle ever shown.
+    """
+
+    def __init__(self, subtitles, make_textclip):
+        VideoClip.__init__(self, has_constant_size=False)
+        self.subtitles = subtitles
+        self.make_textclip = make_textclip
+        self.start = 0
+        self.duration = subtitles.duration
+        self.end = self.duration
+        self._current = (-1, None)
+
+        def textclip_at(t):
+            i = subtitles.position_at(t)
+            if i < 0:
+                return None
+            if self._current[0] != i:
+                self._current = (i, make_textclip(subtitles.texts[i]))
+            return self._current[1]
+
+        def make_frame(t):
+            textclip = textclip_at(t)
+            return textclip.get_frame(t) if textclip else np.array([[[0, 0, 0]]])
+
+        def make_mask_frame(t):
+            textclip = textclip_at(t)
+            return textclip.mask.get_frame(t) if textclip else np.array([[0]])
+
+        self.make_frame = make_frame
+        hasmask = bool(make_textclip("T").mask)
+        self.mask = VideoClip(make_mask_frame, ismask=True) if hasmask else None
+
 def create_optimized_video(audio, subtitles, book_title, logo_path, main_font):
     bg_clip = ColorClip(size=(1920, 1080), color=BACKGROUND_COLOR).set_duration(audio.duration)
 
@@ -157,22 +448,18 @@ def create_optimized_video(audio, subtitles, book_title, logo_path, main_font):
                   .set_position(('center', 50))
                   .set_duration(audio.duration))
 
-    # Sort subtitles by start time
-    subtitles.sort(key=lambda x: x['start'])
-
-    # Prepare subtitles in the format expected by SubtitlesClip
-    subtitle_clips = [((sub['start'], sub['end']), sub['text']) for sub in subtitles]
+    if not isinstance(subtitles, SubtitleIndex):
+        subtitles = SubtitleIndex.from_subtitles(subtitles)
 
-    # Create a SubtitlesClip with a custom text clip generator
     def make_textclip(txt):
         return TextClip(txt, fontsize=40, color=rgb_to_string(TEXT_COLOR), 
                         font=main_font, size=(1720, None), method='caption')
 
-    subtitles_clip = SubtitlesClip(subtitle_clips, make_textclip)
-    subtitles_clip = subtitles_clip.set_position(('center', 'center'))
-
     # Create the composite video clip
-    video_elements = [bg_clip, title_clip, subtitles_clip]
+    video_elements = [bg_clip, title_clip]
+    if len(subtitles):
+        subtitles_clip = IndexedSubtitlesClip(subtitles, make_textclip)
+        video_elements.append(subtitles_clip.set_position(('center', 'center')))
     if logo:
         video_elements.append(logo)
     
@@ -196,20 +483,301 @@ def write_optimized_video(video, output_path):
     logging.info(f"Video write completed at {time.strftime('%H:%M:%S')}")
     logging.info(f"Total time taken: {end_time - start_time:.2f} seconds")
 
-def enhanced_mp3_to_mp4_with_subtitles(mp3_path, srt_path, logo_path, output_path, book_title, main_font='open_sans'):
+def rgb_to_ass(rgb_tuple):
+    r, g, b = rgb_tuple
+    return f"&H00{b:02X}{g:02X}{r:02X}"
+
+def seconds_to_ass_time(seconds):
+    centiseconds = int(round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+def escape_ass_text(text):
+    return text.replace('{', '\\{').replace('}', '\\}').replace('\n', '\\N')
+
+def write_ass_subtitles(subtitles, ass_path, book_title, main_font, duration):
+    """
+    Write the title and subtitles as an ASS script that reproduces the layout of
+    ``create_optimized_video``: a 60px title 50px from the top and 40px
+    captions wrapped to 1720px, centred on a 1920x1080 frame.
+    """
+    text_color = rgb_to_ass(TEXT_COLOR)
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        "PlayResX: 1920",
+        "PlayResY: 1080",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Title,{FONT_FAMILIES[LUXURIOUS_ROMAN]},60,{text_color},{text_color},{text_color},&H00000000,"
+        "0,0,0,0,100,100,0,0,1,0,0,8,0,0,70,1",
+        f"Style: Main,{FONT_FAMILIES[main_font]},40,{text_color},{text_color},{text_color},&H00000000,"
+        "0,0,0,0,100,100,0,0,1,0,0,5,100,100,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        f"Dialogue: 1,{seconds_to_ass_time(0)},{seconds_to_ass_time(duration)},Title,,0,0,0,,{escape_ass_text(book_title)}",
+    ]
+    for sub in sorted(subtitles, key=lambda x: x['start']):
+        lines.append(f"Dialogue: 0,{seconds_to_ass_time(sub['start'])},{seconds_to_ass_time(sub['end'])},"
+                     f"Main,,0,0,0,,{escape_ass_text(sub['text'])}")
+
+    with open(ass_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return ass_path
+
+def escape_filter_path(path):
+    """Quote a file path for use as an ffmpeg filter option value."""
+    return "'" + path.replace('\\', '/').replace(':', '\\:') + "'"
+
+def write_ffmpeg_subtitle_video(mp3_path, subtitles, output_path, book_title, main_font, fps=24):
+    """
+    Render the subtitle video entirely inside ffmpeg.
+
+    The title and subtitles are converted to ASS and burned onto a generated
+    background by libass, then encoded with libx264; no frame passes through
+    Python.
+    """
+    duration = MP3(mp3_path).info.length
+    background = "0x{:02X}{:02X}{:02X}".format(*BACKGROUND_COLOR)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ass_path = write_ass_subtitles(subtitles, os.path.join(tmp_dir, 'subtitles.ass'),
+                                       book_title, main_font, duration)
+        video_filter = f"ass={escape_filter_path(ass_path)}:fontsdir={escape_filter_path(FONT_DIR)}"
+
+        start_time = time.time()
+        logging.info(f"Starting ffmpeg video render at {time.strftime('%H:%M:%S')}")
+        subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                        "-f", "lavfi", "-i", f"color=c={background}:s=1920x1080:r={fps}",
+                        "-i", mp3_path,
+                        "-vf", video_filter,
+                        "-map", "0:v", "-map", "1:a",
+                        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage",
+                        "-pix_fmt", "yuv420p", "-c:a", "aac", "-t", f"{duration:.3f}",
+                        output_path], check=True)
+        logging.info(f"Total time taken: {time.time() - start_time:.2f} seconds")
+
+def subtitle_intervals(subtitles, duration):
+    """
+    Split ``[0, duration]`` into consecutive intervals with constant on-screen
+    text. Gaps between subtitles get ``None`` as their text.
+    """
+    intervals = []
+    current = 0.0
+    for sub in sorted(subtitles, key=lambda x: x['start']):
+        start = max(sub['start'], current)
+        end = min(sub['end'], duration)
+        if end <= start:
+            continue
+        if start > current:
+            intervals.append((current, start, None))
+        if intervals and intervals[-1][2] == sub['text'] and intervals[-1][1] == start:
+            intervals[-1] = (intervals[-1][0], end, sub['text'])
+        else:
+            intervals.append((start, end, sub['text']))
+        current = end
+    if current < duration:
+        intervals.append((current, duration, None))
+    return intervals
+
+def wrap_text_to_width(draw, text, font, max_width):
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and draw.textlength(candidate, font=font) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+def render_still_frame(text, book_title, main_font, path):
+    """
+    Render one full 1920x1080 frame (background, title and optional caption)
+    to a PNG, using the same layout as ``create_optimized_video``.
+    """
+    image = Image.new('RGB', (1920, 1080), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(image)
+
+    title_font = ImageFont.truetype(LUXURIOUS_ROMAN, 60)
+    draw.text((960, 100), book_title, font=title_font, fill=TEXT_COLOR, anchor='mm')
+
+    if text:
+        font = ImageFont.truetype(main_font, 40)
+        lines = wrap_text_to_width(draw, text, font, 1720)
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent
+        top = 540 - line_height * len(lines) / 2
+        for i, line in enumerate(lines):
+            draw.text((960, top + i * line_height), line, font=font, fill=TEXT_COLOR, anchor='ma')
+
+    image.save(path, compress_level=1)
+    return path
+
+def write_static_segment_video(mp3_path, subtitles, output_path, book_title, main_font,
+                               keyframe_seconds=10):
+    """
+    Encode the subtitle video as a sequence of still frames, one per interval
+    of constant text.
+
+    Each distinct caption is rendered once to a PNG. ffmpeg's concat demuxer
+    shows every still for its interval and the video is encoded with a
+    variable frame rate, so libx264 encodes one frame per subtitle change
+    rather than 24 per second. Encode time therefore scales with the number of
+    subtitles, not the audio duration. A keyframe is forced at least every
+    ``keyframe_seconds`` to keep seeking responsive.
+    """
+    duration = MP3(mp3_path).info.length
+    intervals = subtitle_intervals(subtitles, duration)
+    if not intervals:
+        raise ValueError(f"{mp3_path} has no audio to render")
+    logging.info(f"Rendering {len(intervals)} still intervals")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stills = {}
+        list_path = os.path.join(tmp_dir, 'stills.txt')
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for start, end, text in intervals:
+                if text not in stills:
+                    stills[text] = render_still_frame(text, book_title, main_font,
+                                                      os.path.join(tmp_dir, f"still_{len(stills):06d}.png"))
+                f.write(f"{concat_file_line(stills[text])}duration {end - start:.3f}\n")
+            # The concat demuxer ignores the duration of the final entry unless it is repeated
+            f.write(concat_file_line(stills[intervals[-1][2]]))
+
+        start_time = time.time()
+        logging.info(f"Starting static segment encode at {time.strftime('%H:%M:%S')}")
+        subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                        "-f", "concat", "-safe", "0", "-i", list_path,
+                        "-i", mp3_path,
+                        "-map", "0:v", "-map", "1:a",
+                        *vfr_output_options(),
+                        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage",
+                        "-force_key_frames", f"expr:gte(t,n_forced*{keyframe_seconds})",
+                        "-pix_fmt", "yuv420p", "-c:a", "aac", "-t", f"{duration:.3f}",
+                        output_path], check=True)
+        logging.info(f"Total time taken: {time.time() - start_time:.2f} seconds")
+
+def split_timeline_at_subtitles(subtitles, duration, segments, fps=24):
+    """
+    Choose ``segments`` roughly equal ``(start, end)`` ranges covering
+    ``[0, duration]``. Cuts are placed at subtitle starts that no earlier
+    subtitle overlaps, so no caption spans two segments, and are rounded to
+    whole frames so the segments concatenate without drift.
+    """
+    candidates = []
+    latest_end = 0.0
+    for sub in sorted(subtitles, key=lambda x: x['start']):
+        if 0 < sub['start'] < duration and sub['start'] >= latest_end:
+            candidates.append(sub['start'])
+        latest_end = max(latest_end, sub['end'])
+
+    cuts = []
+    for k in range(1, segments):
+        target = duration * k / segments
+        remaining = [t for t in candidates if not cuts or t > cuts[-1]]
+        if not remaining:
+            break
+        cuts.append(min(remaining, key=lambda t: abs(t - target)))
+
+    bounds = [0.0] + sorted({round(t * fps) / fps for t in cuts}) + [duration]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def subtitles_in_range(subtitles, start, end):
+    """Subtitles overlapping ``[start, end)``, clipped and shifted to start at zero."""
+    return [{'start': max(sub['start'], start) - start,
+             'end': min(sub['end'], end) - start,
+             'text': sub['text']}
+            for sub in subtitles if sub['end'] > start and sub['start'] < end]
+
+def render_video_segment(mp3_path, subtitles, start, end, book_title, logo_path, main_font, segment_path, fps=24):
+    """Render the silent video for ``[start, end)`` of the book; runs in a worker process."""
+    audio = AudioFileClip(mp3_path).subclip(start, end)
+    video = create_optimized_video(audio, subtitles, book_title, logo_path, main_font)
+    video.write_videofile(segment_path,
+                          codec='libx264',
+                          preset='ultrafast',
+                          fps=fps,
+                          threads=1,
+                          audio=False,
+                          logger=None)
+    audio.close()
+    return segment_path
+
+def write_segmented_video(mp3_path, subtitles, output_path, book_title, logo_path, main_font, workers=None, fps=24):
+    """
+    Render the moviepy video in parallel.
+
+    The timeline is split at subtitle boundaries into one segment per worker,
+    each segment is rendered by its own process, and the segments are joined
+    with ffmpeg stream copy. The full audio track is muxed once at the end so
+    segment joins never introduce gaps in the sound.
+    """
+    workers = workers or os.cpu_count() or 1
+    duration = MP3(mp3_path).info.length
+    ranges = split_timeline_at_subtitles(subtitles, duration, workers, fps)
+    logging.info(f"Rendering {len(ranges)} segments with {workers} workers")
+
+    start_time = time.time()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render_video_segment, mp3_path, subtitles_in_range(subtitles, start, end),
+                                       start, end, book_title, logo_path, main_font,
+                                       os.path.join(tmp_dir, f"segment_{i:03d}.mp4"), fps)
+                       for i, (start, end) in enumerate(ranges)]
+            segment_files = [future.result() for future in futures]
+
+        list_path = write_concat_list(segment_files, os.path.join(tmp_dir, 'segments.txt'))
+        subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                        "-f", "concat", "-safe", "0", "-i", list_path,
+                        "-i", mp3_path,
+                        "-map", "0:v", "-map", "1:a",
+                        "-c:v", "copy", "-c:a", "aac", "-t", f"{duration:.3f}",
+                        output_path], check=True)
+    logging.info(f"Total time taken: {time.time() - start_time:.2f} seconds")
+
+def enhanced_mp3_to_mp4_with_subtitles(mp3_path, srt_path, logo_path, output_path, book_title, main_font='open_sans',
+                                       renderer='moviepy', workers=None):
+    """
+    Create an MP4 of the title and subtitles over a plain background with the audio.
+
+    ``renderer='moviepy'`` composites every frame in Python; ``renderer='ffmpeg'``
+    burns the subtitles in with libass and is much faster for long books;
+    ``renderer='static'`` encodes one still frame per subtitle change;
+    ``renderer='segmented'`` splits the moviepy render across ``workers``
+    processes.
+    """
     start_time = time.time()
     logging.info(f"Starting enhanced MP3 to MP4 conversion at {time.strftime('%H:%M:%S')}")
 
-    audio = AudioFileClip(mp3_path)
-    logging.info(f"Audio duration: {audio.duration} seconds")
-
     subtitles = parse_srt(srt_path)
     logging.info(f"Number of subtitles: {len(subtitles)}")
 
     main_font_file = OPEN_SANS if main_font.lower() == 'open_sans' else PT_SERIF
 
-    video = create_optimized_video(audio, subtitles, book_title, logo_path, main_font_file)
-    write_optimized_video(video, output_path)
+    if renderer == 'ffmpeg':
+        write_ffmpeg_subtitle_video(mp3_path, subtitles, output_path, book_title, main_font_file)
+    elif renderer == 'static':
+        write_static_segment_video(mp3_path, subtitles, output_path, book_title, main_font_file)
+    elif renderer == 'segmented':
+        write_segmented_video(mp3_path, subtitles, output_path, book_title, logo_path, main_font_file, workers)
+    else:
+        audio = AudioFileClip(mp3_path)
+        logging.info(f"Audio duration: {audio.duration} seconds")
+
+        video = create_optimized_video(audio, subtitles, book_title, logo_path, main_font_file)
+        write_optimized_video(video, output_path)
 
     end_time = time.time()
     logging.info(f"Enhanced MP4 with subtitles created successfully using {os.path.basename(main_font_file)} for main text.")
@@ -240,12 +808,13 @@ def store_mp4_components(combined_mp3_file_path, srt_path, logo_path, output_pat
     shutil.copy(srt_path, mp4_components_dir)
     shutil.copy(logo_path, mp4_components_dir)
 
-    # Create a JSON file with component information
+    # Create a JSON file with component information; the output path is stored
+    # absolute because the batch renderer resolves relative paths against this directory
     component_info = {
         "mp3_file": os.path.basename(combined_mp3_file_path),
         "srt_file": os.path.basename(srt_path),
         "logo_file": os.path.basename(logo_path),
-        "output_path": output_path,
+        "output_path": os.path.abspath(output_path),
         "book_title": book_title,
         "main_font": main_font
     }
@@ -2,14 +2,104 @@
 
 import os
 import re
-import shutil
 import glob
-from bs4 import BeautifulSoup
+from lxml import etree
 
-def process_files(volume, author, title, base_path, ssml_source_dir):
+from pipeline_support.utils import parallel_map
+
+ASCII_SPACES = str.maketrans('', '', '\x20\x0a\x09\x0c\x0d')
+
+class TextCollector:
+    """
+    lxml parser target that gathers text the way ``BeautifulSoup(content, 'xml')``
+    builds its strings: one string per run of character data between two markup
+    events, with all-whitespace runs collapsed to a newline or a space.
+    Comments, processing instructions and doctypes contribute no text. Runs
+    are joined before they are normalized, so the result does not depend on
+    how lxml splits the character data between ``data`` calls.
+    """
+    def __init__(self):
+        self.strings = []
+        self.pending = []
+
+    def flush(self):
+        if self.pending:
+            text = ''.join(self.pending)
+            self.pending = []
+            if not text.translate(ASCII_SPACES):
+                text = '\n' if '\n' in text else ' '
+            self.strings.append(text)
+
+    def start(self, tag, attrib, nsmap=None):
+        self.flush()
+
+    def end(self, tag):
+        self.flush()
+
+    def data(self, text):
+        self.pending.append(text)
+
+    def comment(self, text):
+        self.flush()
+
+    def pi(self, target, data=None):
+        self.flush()
+
+    def doctype(self, *args):
+        self.flush()
+
+    def close(self):
+        self.flush()
+        return self.strings
+
+def ssml_text(content):
+    """Equivalent of ``BeautifulSoup(content, 'xml').get_text(separator='\\n')`` without building a tree."""
+    if content[:1] == '\N{BYTE ORDER MARK}':
+        content = content[1:]
+    parser = etree.XMLParser(target=TextCollector(), strip_cdata=False, recover=True)
+    parser.feed(content)
+    return '\n'.join(parser.close())
+
+def soup_text(content):
+    """The BeautifulSoup extraction ``ssml_text`` replaces, kept as its reference."""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, 'xml').get_text(separator='\n')
+
+def clean_ssml_text(content):
+    # Remove SSML tags, then collapse every blank-line run to one blank line
+    clean_text = re.sub(r'\n\s*\n\s*', '\n\n', ssml_text(content))
+    return clean_text.strip()
+
+def process_file(file_path, output_dir, ssml_dir, author, title):
+    """Write the SSML copy and the clean text of one chunk file."""
+    filename = os.path.basename(file_path)
+    result = {'file': filename}
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        # Decode like a text-mode read, so the clean text sees universal newlines
+        content = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        if not content:
+            result['status'] = 'empty'
+            return result
+
+        with open(os.path.join(ssml_dir, filename), 'wb') as f:
+            f.write(raw)
+
+        clean_text = clean_ssml_text(content)
+        output_file = os.path.join(output_dir, f"{author} - {title}_{filename.split('_')[-1].split('.')[0]} (English).txt")
+        with open(output_file, 'w', encoding='utf-8') as out_f:
+            out_f.write(clean_text)
+        result.update(status='written', output_file=output_file, length=len(clean_text))
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    return result
+
+def process_files(volume, author, title, base_path, ssml_source_dir, workers=None):
     # Create directory name
     dir_name = f"{author} - {title}"
-    
+
     # Create output directory
     output_dir = os.path.join(base_path, f"vol_{volume}", dir_name)
     os.makedirs(output_dir, exist_ok=True)
@@ -21,36 +111,20 @@ def process_files(volume, author, title, base_path, ssml_source_dir):
     # Get list of files
     files = sorted(glob.glob(os.path.join(ssml_source_dir, "*chunk*.txt")), key=lambda x: int(re.search(r"chunk_(\d+)", x).group(1)))
 
-    # Process files
-    for file_path in files:
-        filename = os.path.basename(file_path)
+    # Process files in parallel (workers=1 runs inline), reporting in chunk order
+    arguments = [files, [output_dir] * len(files), [ssml_dir] * len(files), [author] * len(files), [title] * len(files)]
+    results = list(parallel_map(process_file, *arguments, workers=workers, chunksize=8))
+
+    for file_path, result in zip(files, results):
+        filename = result['file']
         print(f"Reading file: {filename}")  # Debugging: file being read
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if content:  # Verify that content is not empty
-                    shutil.copy(file_path, ssml_dir)
-                    print(f"File {filename} copied to {ssml_dir}.")  # Debugging: confirm file copy
-
-                    # Remove SSML tags and format
-                    soup = BeautifulSoup(content, 'xml')
-                    clean_text = soup.get_text(separator='\n')
-
-                    # Additional formatting
-                    clean_text = re.sub(r'\n\s*\n', '\n\n', clean_text)  # Remove excessive blank lines
-                    clean_text = re.sub(r'(\n\s*){2,}', '\n\n', clean_text)  # Ensure no multiple blank lines
-                    clean_text = clean_text.strip()  # Remove leading/trailing whitespace
-                    print(f"Clean text length: {len(clean_text)}")  # Debugging: show length of clean text
-
-                    # Write clean text to file with the combined output naming convention
-                    output_file = os.path.join(output_dir, f"{author} - {title}_{filename.split('_')[-1].split('.')[0]} (English).txt")
-                    with open(output_file, 'w', encoding='utf-8') as out_f:
-                        out_f.write(clean_text)
-                        print(f"Clean text written to {output_file}.")  # Debugging: confirm file write
-
-                else:
-                    print(f"File {filename} is empty.")  # Debugging: alert if content is empty
-        except Exception as e:
-            print(f"Failed to read file {file_path} with error: {e}")  # Debugging: file read error
+        if result['status'] == 'written':
+            print(f"File {filename} copied to {ssml_dir}.")  # Debugging: confirm file copy
+            print(f"Clean text length: {result['length']}")  # Debugging: show length of clean text
+            print(f"Clean text written to {result['output_file']}.")  # Debugging: confirm file write
+        elif result['status'] == 'empty':
+            print(f"File {filename} is empty.")  # Debugging: alert if content is empty
+        else:
+            print(f"Failed to read file {file_path} with error: {result['error']}")  # Debugging: file read error
 
     return output_dir
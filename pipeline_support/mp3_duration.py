@@ -0,0 +1,200 @@
+# mp3_duration.py
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional
+
+DURATION_INDEX_FILENAME = '.mp3_durations.json'
+
+# Bitrates in kbps by (MPEG-1?, layer) and header index
+BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates by the header's 2-bit version field
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+# Only the first few frames are searched for sync after the ID3v2 tag
+MAX_SYNC_SEARCH = 64 * 1024
+
+
+def parse_frame_header(data, offset: int) -> Optional[Dict]:
+    """Decode the 4-byte MPEG audio frame header at ``offset``, or None if it is not one."""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset:offset + 4]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        frame_length = samples // 8 * bitrate // sample_rate + padding
+
+    return {
+        'mpeg1': mpeg1,
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'samples': samples,
+        'frame_length': frame_length,
+        'mono': (b3 >> 6) == 3,
+        'crc': not (b1 & 0x01),
+    }
+
+
+def id3v2_size(data) -> int:
+    """Bytes taken by a leading ID3v2 tag (0 if there is none)."""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def find_first_frame(data, start: int):
+    """
+    Offset and header of the first frame at or after ``start``. A candidate is
+    only accepted when another valid header follows it, which rules out stray
+    0xFF bytes in padding or cover art.
+    """
+    end = min(len(data) - 4, start + MAX_SYNC_SEARCH)
+    offset = data.find(b'\xff', start, end)
+    while 0 <= offset < end:
+        header = parse_frame_header(data, offset)
+        if header:
+            following = offset + header['frame_length']
+            if following + 4 > len(data) or parse_frame_header(data, following):
+                return offset, header
+        offset = data.find(b'\xff', offset + 1, end)
+    return None, None
+
+
+def vbr_header_duration(data, offset: int, header: Dict) -> Optional[float]:
+    """Duration from a Xing/Info or VBRI header in the first frame, if it has one."""
+    if header['mpeg1']:
+        side_info = 17 if header['mono'] else 32
+    else:
+        side_info = 9 if header['mono'] else 17
+    xing = offset + 4 + (2 if header['crc'] else 0) + side_info
+
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags, = struct.unpack('>I', data[xing + 4:xing + 8])
+        if not flags & 0x01:
+            return None
+        frames, = struct.unpack('>I', data[xing + 8:xing + 12])
+        samples = frames * header['samples']
+
+        # LAME-style tags record the encoder delay and padding to trim
+        lame = xing + 8 + 4 * bin(flags & 0x0B).count('1') + (100 if flags & 0x04 else 0)
+        if data[lame:lame + 4] in (b'LAME', b'Lavc', b'Lavf') and lame + 24 <= len(data):
+            d0, d1, d2 = data[lame + 21:lame + 24]
+            samples -= ((d0 << 4) | (d1 >> 4)) + (((d1 & 0x0F) << 8) | d2)
+        return max(samples, 0) / header['sample_rate']
+
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI':
+        frames, = struct.unpack('>I', data[vbri + 14:vbri + 18])
+        return frames * header['samples'] / header['sample_rate']
+
+    return None
+
+
+def mp3_duration_from_buffer(data) -> float:
+    """
+    Duration in seconds of the MP3 in ``data`` (bytes or an mmap), reading only
+    the ID3v2 size, the first frame header and any Xing/VBRI header. Files
+    without a VBR header are treated as constant bitrate.
+    """
+    offset, header = find_first_frame(data, id3v2_size(data))
+    if header is None:
+        raise ValueError("No MPEG audio frame found")
+
+    duration = vbr_header_duration(data, offset, header)
+    if duration is not None:
+        return duration
+
+    audio_end = len(data)
+    if audio_end >= 128 and data[audio_end - 128:audio_end - 125] == b'TAG':
+        audio_end -= 128
+    return (audio_end - offset) * 8 / header['bitrate']
+
+
+def mp3_duration(path: str) -> float:
+    """Duration of the MP3 at ``path``; the file is memory-mapped so only the touched pages are read."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"Empty MP3 file: {path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return mp3_duration_from_buffer(data)
+
+
+def load_duration_index(directory: str) -> Dict[str, List]:
+    """Cached ``{name: [size, mtime_ns, duration]}`` for ``directory``; empty if missing or unreadable."""
+    try:
+        with open(os.path.join(directory, DURATION_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_duration_index(directory: str, index: Dict[str, List]) -> None:
+    path = os.path.join(directory, DURATION_INDEX_FILENAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def directory_durations(directory: str, filenames: List[str]) -> Dict[str, float]:
+    """
+    Durations of ``filenames`` in ``directory``, using the directory's duration
+    index. A file is only opened when its size or modification time differs
+    from the cached entry, so unchanged parts cost a single ``stat``.
+    """
+    index = load_duration_index(directory)
+    durations = {}
+    changed = False
+
+    for name in filenames:
+        stat = os.stat(os.path.join(directory, name))
+        cached = index.get(name)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            durations[name] = cached[2]
+            continue
+        durations[name] = mp3_duration(os.path.join(directory, name))
+        index[name] = [stat.st_size, stat.st_mtime_ns, durations[name]]
+        changed = True
+
+    if changed:
+        try:
+            save_duration_index(directory, index)
+        except OSError as e:
+            print(f"Warning: Could not save duration index in {directory}: {e}")
+    return durations
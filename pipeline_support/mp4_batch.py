@@ -0,0 +1,166 @@
+# mp4_batch.py
+
+import argparse
+import json
+import os
+import time
+import traceback
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pipeline_support.audio_processing import enhanced_mp3_to_mp4_with_subtitles
+from pipeline_support.utils import parallel_map
+
+MP4_INFO_FILENAME = 'mp4_info.json'
+
+
+def default_job_limit() -> int:
+    """
+    Renders running at once on this machine. Each render already uses several
+    encoder threads, so the default is half the cores; ``MP4_RENDER_JOBS``
+    overrides it.
+    """
+    configured = os.environ.get('MP4_RENDER_JOBS')
+    if configured:
+        return max(1, int(configured))
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def find_mp4_bundles(root: str) -> List[str]:
+    """Paths of every ``mp4_info.json`` under ``root``, in a stable order."""
+    info_paths = []
+    for dirpath, _, filenames in os.walk(root):
+        if MP4_INFO_FILENAME in filenames:
+            info_paths.append(os.path.join(dirpath, MP4_INFO_FILENAME))
+    return sorted(info_paths)
+
+
+def load_bundle(info_path: str) -> Dict:
+    """
+    Read a bundle written by ``store_mp4_components``. Component files are
+    resolved against the bundle directory. ``store_mp4_components`` writes an
+    absolute ``output_path``; a relative one in a hand-written bundle is also
+    resolved against the bundle directory.
+    """
+    bundle_dir = os.path.dirname(os.path.abspath(info_path))
+    with open(info_path, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+
+    def resolve(path):
+        return path if os.path.isabs(path) else os.path.join(bundle_dir, path)
+
+    return {
+        'info_path': info_path,
+        'mp3_path': resolve(info['mp3_file']),
+        'srt_path': resolve(info['srt_file']),
+        'logo_path': resolve(info['logo_file']) if info.get('logo_file') else None,
+        'output_path': resolve(info['output_path']),
+        'book_title': info['book_title'],
+        'main_font': info.get('main_font', 'open_sans'),
+    }
+
+
+def bundle_is_current(bundle: Dict) -> bool:
+    """True when the rendered MP4 is newer than the bundle and all of its inputs."""
+    if not os.path.exists(bundle['output_path']):
+        return False
+    inputs = [bundle['info_path'], bundle['mp3_path'], bundle['srt_path']]
+    if bundle['logo_path']:
+        inputs.append(bundle['logo_path'])
+    existing = [path for path in inputs if os.path.exists(path)]
+    if not existing:
+        return False
+    newest_input = max(os.path.getmtime(path) for path in existing)
+    return os.path.getmtime(bundle['output_path']) >= newest_input
+
+
+def render_bundle(bundle: Dict, renderer: str = 'moviepy') -> Dict:
+    """Render one bundle and report its outcome."""
+    result = {
+        'book_title': bundle['book_title'],
+        'info_path': bundle['info_path'],
+        'output_path': bundle['output_path'],
+    }
+    start_time = time.time()
+    try:
+        output_dir = os.path.dirname(bundle['output_path'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        enhanced_mp3_to_mp4_with_subtitles(bundle['mp3_path'], bundle['srt_path'], bundle['logo_path'],
+                                           bundle['output_path'], bundle['book_title'],
+                                           main_font=bundle['main_font'], renderer=renderer)
+        result['status'] = 'rendered'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    result['seconds'] = round(time.time() - start_time, 3)
+    return result
+
+
+def write_render_summary(directory: str, results: List[Dict]) -> str:
+    """Write the batch results to ``directory`` and return the summary path."""
+    summary_path = os.path.join(directory, f'mp4_render_summary_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    summary = {
+        'rendered': sum(1 for result in results if result['status'] == 'rendered'),
+        'skipped': sum(1 for result in results if result['status'] == 'skipped'),
+        'failed': sum(1 for result in results if result['status'] == 'failed'),
+        'seconds': round(sum(result['seconds'] for result in results), 3),
+        'books': results,
+    }
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary_path
+
+
+def render_mp4_bundles(root: str,
+                       jobs: Optional[int] = None,
+                       renderer: str = 'moviepy',
+                       force: bool = False) -> str:
+    """
+    Render every ``mp4_components`` bundle under ``root`` through a process pool
+    of at most ``jobs`` workers. Bundles whose MP4 is already newer than their
+    inputs are skipped unless ``force`` is set. One failed book does not stop
+    the batch. Returns the path of the results summary written to ``root``.
+    """
+    jobs = jobs or default_job_limit()
+    results = []
+    pending = []
+    for info_path in find_mp4_bundles(root):
+        try:
+            bundle = load_bundle(info_path)
+            current = not force and bundle_is_current(bundle)
+        except Exception as e:
+            results.append({'book_title': info_path, 'info_path': info_path, 'output_path': None,
+                            'status': 'failed', 'error': f"{type(e).__name__}: {e}",
+                            'traceback': traceback.format_exc(), 'seconds': 0.0})
+            continue
+        if current:
+            print(f"Skipping {bundle['book_title']}: {bundle['output_path']} is up to date")
+            results.append({'book_title': bundle['book_title'], 'info_path': info_path,
+                            'output_path': bundle['output_path'], 'status': 'skipped', 'seconds': 0.0})
+        else:
+            pending.append(bundle)
+
+    print(f"Rendering {len(pending)} books with {jobs} jobs")
+    results.extend(parallel_map(render_bundle, pending, [renderer] * len(pending), workers=jobs))
+
+    for result in results:
+        if result['status'] == 'failed':
+            print(f"Failed to render {result['book_title']}: {result['error']}")
+
+    summary_path = write_render_summary(root, results)
+    print(f"Render summary written to {summary_path}")
+    return summary_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render stored mp4_components bundles to MP4.")
+    parser.add_argument("root", help="Directory searched recursively for mp4_info.json bundles")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Concurrent renders (default: MP4_RENDER_JOBS or half the CPU cores)")
+    parser.add_argument("--renderer", choices=["moviepy", "ffmpeg", "static", "segmented"], default="moviepy")
+    parser.add_argument("--force", action="store_true", help="Re-render bundles whose MP4 is up to date")
+    args = parser.parse_args()
+
+    render_mp4_bundles(args.root, jobs=args.jobs, renderer=args.renderer, force=args.force)
@@ -0,0 +1,172 @@
+# near_duplicates.py
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pipeline_support.utils import parallel_map
+
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=\.|\?|!)\s+')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+WORD_PATTERN = re.compile(r'\w+')
+
+SHINGLE_WORDS = 3
+PERMUTATION_SEED = 20240519
+
+
+def split_sentences(ssml: str) -> List[str]:
+    """Sentences of a chunk with their tags removed, split like ``test_duplicates``."""
+    sentences = (TAG_PATTERN.sub('', line).strip() for line in SENTENCE_SPLIT_PATTERN.split(ssml))
+    return [sentence for sentence in sentences if sentence]
+
+
+def word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def file_sentences(root: str, relative_path: str, min_words: int = 5) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+    """
+    Read one processed JSON file.
+
+    Returns the location of every sentence with at least ``min_words`` words,
+    the 64-bit hashes of their words in order, and each sentence's word count.
+    Unreadable files contribute no sentences; the validator reports them.
+    """
+    locations, hashes, lengths = [], [], []
+    try:
+        with open(os.path.join(root, relative_path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+
+    known = {}
+    for chunk_index, chunk in enumerate(data.get('chunks', [])):
+        for sentence in split_sentences(chunk.get('cleaned_english_translation', '')):
+            words = WORD_PATTERN.findall(sentence.lower())
+            if len(words) < min_words:
+                continue
+            for word in words:
+                value = known.get(word)
+                if value is None:
+                    value = known[word] = word_hash(word)
+                hashes.append(value)
+            lengths.append(len(words))
+            locations.append({'file': relative_path, 'chunk_index': chunk_index,
+                              'chunk_number': chunk.get('chunk_number'), 'sentence': sentence})
+    return locations, np.array(hashes, dtype=np.uint64), np.array(lengths, dtype=np.int64)
+
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, applied element-wise with wrap-around arithmetic."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def minhash_signatures(word_hashes: np.ndarray, lengths: np.ndarray, num_perm: int = 64) -> np.ndarray:
+    """
+    MinHash signature of every sentence's word 3-shingles, shape ``(sentences, num_perm)``.
+
+    ``word_hashes`` holds the words of all sentences back to back and
+    ``lengths`` the number of words in each; every sentence needs at least
+    ``SHINGLE_WORDS`` words.
+    """
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    # A shingle starting at word i stays within its sentence when i + 2 < end
+    sentence_of_word = np.repeat(np.arange(len(lengths)), lengths)
+    positions = np.arange(len(word_hashes) - SHINGLE_WORDS + 1)
+    positions = positions[positions + SHINGLE_WORDS <= ends[sentence_of_word[positions]]]
+
+    shingles = word_hashes[positions]
+    for offset in range(1, SHINGLE_WORDS):
+        shingles = mix64(shingles ^ word_hashes[positions + offset])
+    shingle_starts = starts - np.arange(len(lengths)) * (SHINGLE_WORDS - 1)
+
+    # Odd multipliers make each (a * x + b) mod 2**64 a permutation of the shingle hashes
+    rng = np.random.default_rng(PERMUTATION_SEED)
+    multipliers = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(lengths), num_perm), dtype=np.uint64)
+    for i in range(num_perm):
+        signatures[:, i] = np.minimum.reduceat(shingles * multipliers[i] + offsets[i], shingle_starts)
+    return signatures
+
+
+def find(parent: List[int], item: int) -> int:
+    while parent[item] != item:
+        parent[item] = parent[parent[item]]
+        item = parent[item]
+    return item
+
+
+def lsh_clusters(signatures: np.ndarray, bands: int = 8, threshold: float = 0.8) -> List[List[int]]:
+    """
+    Group sentences whose estimated Jaccard similarity reaches ``threshold``.
+
+    Each band of the signature is hashed into buckets; every member of a
+    bucket is compared with the bucket's first sentence only, so the work
+    grows with the number of sentences rather than the number of pairs.
+    Confirmed pairs are merged with union-find. Returns clusters of two or
+    more sentence indices.
+    """
+    count, num_perm = signatures.shape
+    rows = num_perm // bands
+    parent = list(range(count))
+
+    for band in range(bands):
+        keys = np.zeros(count, dtype=np.uint64)
+        for column in range(band * rows, (band + 1) * rows):
+            keys = mix64(keys ^ signatures[:, column])
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        new_bucket = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        bucket_first = order[np.maximum.accumulate(np.where(new_bucket, np.arange(count), 0))]
+
+        members = order[~new_bucket]
+        firsts = bucket_first[~new_bucket]
+        if len(members) == 0:
+            continue
+        similarity = np.mean(signatures[members] == signatures[firsts], axis=1)
+        for member, first in zip(members[similarity >= threshold].tolist(), firsts[similarity >= threshold].tolist()):
+            member_root, first_root = find(parent, member), find(parent, first)
+            if member_root != first_root:
+                parent[max(member_root, first_root)] = min(member_root, first_root)
+
+    clusters = {}
+    for item in range(count):
+        clusters.setdefault(find(parent, item), []).append(item)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def find_near_duplicates(root: str, paths: List[str], num_perm: int = 64, bands: int = 8,
+                         threshold: float = 0.8, min_words: int = 5,
+                         workers: Optional[int] = None) -> List[List[Dict]]:
+    """
+    Near-duplicate sentences across every ``cleaned_english_translation`` in ``paths``.
+
+    Files are read in parallel, sentences of at least ``min_words`` words are
+    shingled and MinHashed, and LSH groups those with an estimated Jaccard
+    similarity of ``threshold`` or more. Returns one list of sentence
+    locations per cluster, largest clusters first.
+    """
+    roots = [root] * len(paths)
+    minimums = [max(min_words, SHINGLE_WORDS)] * len(paths)
+    per_file = list(parallel_map(file_sentences, roots, paths, minimums, workers=workers))
+
+    locations = [location for file_locations, _, _ in per_file for location in file_locations]
+    if len(locations) < 2:
+        return []
+    word_hashes = np.concatenate([hashes for _, hashes, _ in per_file])
+    lengths = np.concatenate([file_lengths for _, _, file_lengths in per_file])
+
+    signatures = minhash_signatures(word_hashes, lengths, num_perm)
+    clusters = lsh_clusters(signatures, bands, threshold)
+    clusters.sort(key=lambda members: (-len(members), members[0]))
+    return [[locations[item] for item in members] for members in clusters]
@@ -0,0 +1,109 @@
+# polly_scheduler.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Conservative per-engine defaults; Polly's generative and long-form engines
+# have separate throughput quotas, so each gets its own workers and rate.
+DEFAULT_ENGINE_LIMITS = {
+    'generative': {'concurrency': 2, 'requests_per_second': 2.0},
+    'long-form': {'concurrency': 2, 'requests_per_second': 2.0},
+}
+
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'TooManyRequestsException', 'Throttling'}
+
+
+def is_throttling_error(error: Exception) -> bool:
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / requests_per_second`` apart across threads."""
+
+    def __init__(self, requests_per_second: Optional[float]):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def back_off(self, seconds: float) -> None:
+        """Delay every caller of this limiter, e.g. after the engine throttled us."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def run_engine_queues(jobs: List[Dict],
+                      handler: Callable[[Dict], object],
+                      engine_limits: Optional[Dict[str, Dict]] = None,
+                      max_retries: int = 5,
+                      backoff_seconds: float = 1.0,
+                      is_retryable: Callable[[Exception], bool] = is_throttling_error) -> Dict[int, object]:
+    """
+    Runs ``handler(job)`` for every job, grouped into one queue per ``job['engine']``.
+
+    Each engine queue has its own thread pool and rate limiter, so throttling on
+    one engine only slows that engine. Retryable errors are retried with
+    exponential backoff; any other error stops all queues from starting new
+    jobs and is re-raised once in-flight jobs finish. Returns the handler
+    results keyed by ``job['part_number']``.
+    """
+    limits = dict(DEFAULT_ENGINE_LIMITS)
+    limits.update(engine_limits or {})
+
+    queues = {}
+    for job in jobs:
+        queues.setdefault(job['engine'], []).append(job)
+
+    results = {}
+    errors = []
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def run_job(job, limiter):
+        for attempt in range(max_retries + 1):
+            if stop.is_set():
+                return
+            limiter.wait()
+            try:
+                result = handler(job)
+            except Exception as error:
+                if attempt < max_retries and is_retryable(error):
+                    delay = backoff_seconds * 2 ** attempt
+                    print(f"Throttled on {job['engine']} (part {job['part_number']}); retrying in {delay}s")
+                    limiter.back_off(delay)
+                    continue
+                with lock:
+                    errors.append(error)
+                stop.set()
+                return
+            with lock:
+                results[job['part_number']] = result
+            return
+
+    executors = []
+    try:
+        for engine, engine_jobs in queues.items():
+            engine_limit = limits.get(engine, {})
+            limiter = RateLimiter(engine_limit.get('requests_per_second'))
+            executor = ThreadPoolExecutor(max_workers=engine_limit.get('concurrency', 1),
+                                          thread_name_prefix=f"polly-{engine}")
+            executors.append(executor)
+            for job in engine_jobs:
+                executor.submit(run_job, job, limiter)
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+    if errors:
+        raise errors[0]
+    return results
@@ -0,0 +1,155 @@
+# polly_usage.py
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Amazon Polly price in USD per 1M billed characters for each engine we use
+ENGINE_PRICE_PER_MILLION = {
+    'generative': 30,
+    'long-form': 100,
+}
+
+SSML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Statuses of requests Polly accepted and billed, whether or not the audio was saved
+BILLED_STATUSES = ('synthesized', 'not_saved')
+
+
+def strip_ssml_tags(text: str) -> str:
+    """Remove every SSML tag, leaving exactly the characters Polly bills for."""
+    return SSML_TAG_PATTERN.sub('', text)
+
+
+def billed_characters(text: str) -> int:
+    """Number of characters Polly bills for ``text`` (SSML tags are free)."""
+    return len(strip_ssml_tags(text))
+
+
+def character_cost(characters: int, engine: str) -> float:
+    return (characters / 1000000) * ENGINE_PRICE_PER_MILLION[engine]
+
+
+class UsageMeter:
+    """
+    Tracks billed characters and cost per chunk for one synthesis run and
+    enforces an optional hard budget in USD. Safe to update from worker threads.
+    """
+
+    def __init__(self, budget_usd: Optional[float] = None):
+        self.budget_usd = budget_usd
+        self.spent_usd = 0.0
+        self.budget_exhausted = False
+        self.chunks: List[Dict] = []
+        self._by_part: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, job: Dict) -> bool:
+        """
+        Account for ``job`` before its request is sent. Returns False, and stops
+        admitting any further jobs, once the job would exceed the budget.
+        """
+        characters = billed_characters(job['ssml'])
+        cost = character_cost(characters, job['engine'])
+        row = {
+            'source_json': job['source_json'],
+            'chunk_number': job['chunk_number'],
+            'part_number': job['part_number'],
+            'voice': job['voice'],
+            'engine': job['engine'],
+            'billed_characters': characters,
+            'cost_usd': cost,
+        }
+
+        with self._lock:
+            if self.budget_exhausted or (self.budget_usd is not None and self.spent_usd + cost > self.budget_usd):
+                self.budget_exhausted = True
+                row['status'] = 'over_budget'
+            else:
+                self.spent_usd += cost
+                row['status'] = 'scheduled'
+
+            self.chunks.append(row)
+            self._by_part[job['part_number']] = row
+        return row['status'] == 'scheduled'
+
+    def start(self, job: Dict) -> bool:
+        """
+        Confirm ``job`` just before its request is sent. Reservations use the
+        estimated character count; if Polly's reconciled counts have since
+        pushed the run over budget, the job's reservation is released and
+        False is returned, so the budget stays a hard limit.
+        """
+        with self._lock:
+            row = self._by_part[job['part_number']]
+            if row['status'] != 'scheduled':
+                return False
+            # The tolerance ignores float rounding in the running total
+            if self.budget_usd is not None and self.spent_usd - self.budget_usd > 1e-9:
+                self.budget_exhausted = True
+                row['status'] = 'over_budget'
+                self.spent_usd -= row['cost_usd']
+                return False
+            return True
+
+    def complete(self, job: Dict, request_characters: Optional[int] = None) -> None:
+        """
+        Mark ``job`` as synthesized as soon as Polly responds, trusting Polly's
+        own character count when given.
+        """
+        with self._lock:
+            row = self._by_part[job['part_number']]
+            row['status'] = 'synthesized'
+            if request_characters is not None and request_characters != row['billed_characters']:
+                self.spent_usd += character_cost(request_characters, row['engine']) - row['cost_usd']
+                row['billed_characters'] = request_characters
+                row['cost_usd'] = character_cost(request_characters, row['engine'])
+
+    def fail(self, job: Dict) -> None:
+        """Mark ``job`` as failed and release its reservation; Polly does not bill rejected requests."""
+        with self._lock:
+            row = self._by_part[job['part_number']]
+            row['status'] = 'failed'
+            self.spent_usd -= row['cost_usd']
+
+    def not_saved(self, job: Dict) -> None:
+        """Mark a synthesized ``job`` whose audio could not be saved; Polly billed it, so its cost stays counted."""
+        with self._lock:
+            self._by_part[job['part_number']]['status'] = 'not_saved'
+
+    def status(self, job: Dict) -> Optional[str]:
+        row = self._by_part.get(job['part_number'])
+        return row['status'] if row else None
+
+    def totals(self) -> Dict[str, Dict]:
+        """Billed characters and cost of billed chunks grouped by ``voice/engine``."""
+        totals = {}
+        for row in self.chunks:
+            if row['status'] not in BILLED_STATUSES:
+                continue
+            key = f"{row['voice']}/{row['engine']}"
+            entry = totals.setdefault(key, {'chunks': 0, 'billed_characters': 0, 'cost_usd': 0.0})
+            entry['chunks'] += 1
+            entry['billed_characters'] += row['billed_characters']
+            entry['cost_usd'] += row['cost_usd']
+        return totals
+
+    def write_report(self, directory: str) -> str:
+        """Write the usage report for this run to ``directory`` and return its path."""
+        os.makedirs(directory, exist_ok=True)
+        report_path = os.path.join(directory, f'polly_usage_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+        billed = [row for row in self.chunks if row['status'] in BILLED_STATUSES]
+        report = {
+            'budget_usd': self.budget_usd,
+            'budget_exhausted': self.budget_exhausted,
+            'billed_characters': sum(row['billed_characters'] for row in billed),
+            'cost_usd': sum(row['cost_usd'] for row in billed),
+            'by_voice_engine': self.totals(),
+            'chunks': self.chunks,
+        }
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report_path
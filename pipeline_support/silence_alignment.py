@@ -0,0 +1,113 @@
+# silence_alignment.py
+
+import subprocess
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+
+
+def decode_pcm(audio_path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode ``audio_path`` once with ffmpeg to mono float32 samples in [-1, 1]."""
+    raw = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", audio_path,
+                          "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+                         check=True, capture_output=True).stdout
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def energy_envelope(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                    frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """RMS level in dBFS of consecutive ``frame_seconds`` frames; trailing samples are dropped."""
+    frame_length = int(sample_rate * frame_seconds)
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def detect_pauses(envelope_db: np.ndarray,
+                  frame_seconds: float = FRAME_SECONDS,
+                  min_pause_seconds: float = 0.2,
+                  threshold_db: Optional[float] = None) -> List[Tuple[float, float]]:
+    """
+    Find runs of quiet frames at least ``min_pause_seconds`` long.
+
+    The threshold defaults to 30 dB below the loud (90th percentile) speech
+    level, which separates Polly's sentence gaps and ``<break>`` silences from
+    speech. Silence touching either end of the part is not a pause between
+    sentences and is left out. Returns ``(start, end)`` seconds from the start
+    of the part.
+    """
+    if len(envelope_db) == 0:
+        return []
+    if threshold_db is None:
+        threshold_db = np.percentile(envelope_db, 90) - 30
+
+    quiet = np.concatenate(([0], (envelope_db < threshold_db).astype(np.int8), [0]))
+    edges = np.diff(quiet)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    keep = ((ends - starts) * frame_seconds >= min_pause_seconds) & (starts > 0) & (ends < len(envelope_db))
+    return [(float(start) * frame_seconds, float(end) * frame_seconds)
+            for start, end in zip(starts[keep], ends[keep])]
+
+
+def find_pauses(audio_path: str, min_pause_seconds: float = 0.2) -> List[Tuple[float, float]]:
+    samples = decode_pcm(audio_path)
+    return detect_pauses(energy_envelope(samples), min_pause_seconds=min_pause_seconds)
+
+
+def find_pauses_for_files(audio_paths: List[str], workers: int = 4) -> Dict[str, List[Tuple[float, float]]]:
+    """
+    Detect pauses in every file. Decoding happens in ffmpeg and the analysis in
+    NumPy, both outside the GIL, so a thread pool keeps all cores busy.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(audio_paths, executor.map(find_pauses, audio_paths)))
+
+
+def snap_to_pauses(subtitles: List[Dict], pauses: List[Tuple[float, float]],
+                   start_time: float, end_time: float, max_shift: float = 1.5,
+                   min_duration: float = 0.1) -> List[Dict]:
+    """
+    Move each boundary between consecutive subtitles of one chunk to the middle
+    of the nearest unused pause within ``max_shift`` seconds.
+
+    ``pauses`` are relative to the chunk's audio, which starts at ``start_time``
+    on the book timeline. Boundaries with no pause nearby keep their estimated
+    time. A boundary only moves to a pause that leaves both subtitles next to
+    it at least ``min_duration`` long, so boundaries never cross each other,
+    the following subtitle's end or the chunk's end.
+    """
+    if len(subtitles) < 2 or not pauses:
+        return subtitles
+
+    middles = [start_time + (start + end) / 2 for start, end in pauses]
+    used = set()
+    previous = start_time
+
+    for current, following in zip(subtitles, subtitles[1:]):
+        boundary = current['end']
+        i = bisect_left(middles, boundary)
+        latest = min(following['end'], end_time) - min_duration
+        candidates = [j for j in (i - 1, i)
+                      if 0 <= j < len(middles) and j not in used and previous + min_duration <= middles[j] <= latest]
+        if candidates:
+            j = min(candidates, key=lambda j: abs(middles[j] - boundary))
+            if abs(middles[j] - boundary) <= max_shift:
+                used.add(j)
+                boundary = middles[j]
+
+        boundary = min(max(boundary, previous), end_time)
+        current['end'] = boundary
+        following['start'] = boundary
+        previous = boundary
+
+    return subtitles
@@ -3,8 +3,15 @@ import os
 import re
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
-from typing import List, Dict
+from typing import List, Dict, Optional
 import shutil
+import threading
+
+from pipeline_support.polly_scheduler import is_throttling_error, run_engine_queues
+from pipeline_support.polly_usage import UsageMeter
+from pipeline_support.ssml_validator import validate_ssml_for_synthesis
+from pipeline_support.synthesis_manifest import append_manifest_entry, audio_duration, load_manifest, ssml_hash, write_manifest
+from pipeline_support.utils import parallel_map
 
 def split_ssml(ssml_text, max_chunk_size=2500):
     parts = re.split(r'(<[^>]+>)', ssml_text)
@@ -55,26 +62,26 @@ def split_ssml(ssml_text, max_chunk_size=2500):
 
     return [x.replace('<p></p>', '').replace("<speak><speak>", '<speak>').replace('</speak></speak>', '</speak>') for x in chunks]
 
+VOICE_ENGINE_MAP = {
+    'Ruth': 'generative',
+    'Matthew': 'generative',
+    'Gregory': 'long-form'
+}
+
 class SSMLProcessingError(Exception):
     """Custom exception for SSML processing errors"""
     pass
 
-def process_ssml_from_json_files(input_directory: str,
-                                 output_directory: str, 
-                                 default_voice_id: str,
-                                 start_part: int = 1) -> List[str]:
-    print(f"Starting process_ssml_from_json_files with start_part={start_part}")
-    polly_client = boto3.client('polly')
-
-    voice_engine_map = {
-        'Ruth': 'generative',
-        'Matthew': 'generative',
-        'Gregory': 'long-form'
-    }
-
-    os.makedirs(output_directory, exist_ok=True)
-    output_files = []
+def load_synthesis_jobs(input_directory: str, default_voice_id: str, start_part: int = 1) -> List[Dict]:
+    """
+    Reads every JSON file in ``input_directory`` and returns one job per chunk
+    that should be synthesized, in final part order.
 
+    Each job carries its final ``book/book_partNNN_Voice.mp3`` output path.
+    Parts are numbered within each book counting every chunk, including those
+    skipped by ``start_part``, so a resumed run produces the same names as a
+    full run.
+    """
     def sort_key(filename):
         match = re.search(r'_part_(\d+)\.txt\.json$', filename)
         if match:
@@ -88,14 +95,15 @@ def process_ssml_from_json_files(input_directory: str,
 
     print(f"Found {len(json_files)} input JSON files")
 
+    jobs = []
     global_part_number = 1  # Keeps track of the part number overall
+    book_part_numbers = {}  # Part number within each book folder
 
     for json_file in json_files:
         print(f"Processing file: {json_file}")
 
         # Extract book name from filename
         book_name = json_file.split('_part_')[0]
-        output_filename = book_name
 
         try:
             with open(os.path.join(input_directory, json_file), 'r', encoding='utf-8') as file:
@@ -104,56 +112,229 @@ def process_ssml_from_json_files(input_directory: str,
             raise ValueError(f"Error reading JSON file {json_file}: {str(e)}")
 
         for chunk_index, chunk in enumerate(data['chunks'], start=1):
+            book_part_number = book_part_numbers.get(book_name, 0) + 1
+            book_part_numbers[book_name] = book_part_number
+
             if global_part_number < start_part:
                 # Skip parts until we reach the start_part
                 global_part_number += 1
                 continue
 
-            ssml_text = chunk['cleaned_english_translation']
-            
             # Use the voice from the JSON if available, otherwise use the default
             voice_id = chunk.get('voice', default_voice_id)
-            if voice_id not in voice_engine_map:
+            if voice_id not in VOICE_ENGINE_MAP:
                 print(f"Warning: Unsupported voice '{voice_id}' for chunk {chunk_index} in {json_file}. Using default voice.")
                 voice_id = default_voice_id
 
-            engine = voice_engine_map[voice_id]
-            print(f"Using voice: {voice_id} with engine: {engine}")
-
-            try:
-                print(f"Attempting to synthesize speech for chunk {chunk_index} with voice {voice_id}")
-                response = polly_client.synthesize_speech(
-                    Engine=engine,
-                    Text=ssml_text,
-                    TextType='ssml',
-                    OutputFormat='mp3',
-                    VoiceId=voice_id
-                )
-
-                output_file = f"{output_filename}_part{global_part_number:03d}_{voice_id}.mp3"
-                output_path = os.path.join(output_directory, output_file)
-                
-                with open(output_path, 'wb') as file:
-                    file.write(response['AudioStream'].read())
-                
-                output_files.append(output_path)
-                print(f"Generated: {output_file} using {voice_id} voice with {engine} engine")
+            jobs.append({
+                'source_json': json_file,
+                'book_name': book_name,
+                'chunk_index': chunk_index,
+                'chunk_number': chunk.get('chunk_number', chunk_index),
+                'part_number': global_part_number,
+                'book_part_number': book_part_number,
+                'voice': voice_id,
+                'engine': VOICE_ENGINE_MAP[voice_id],
+                'ssml': chunk['cleaned_english_translation'],
+                # Final location relative to the output directory
+                'output_path': f"{book_name}/{book_name}_part{book_part_number:03d}_{voice_id}.mp3",
+            })
+            global_part_number += 1
+
+    return jobs
+
+def validate_synthesis_jobs(jobs: List[Dict], workers: Optional[int] = None) -> Dict[int, List[str]]:
+    """
+    Runs the structural SSML checks over every job before anything is sent to
+    Polly. Files are validated in parallel; returns findings keyed by part number.
+    """
+    by_file = {}
+    for job in jobs:
+        by_file.setdefault(job['source_json'], []).append(job)
+    groups = list(by_file.values())
+    ssml_lists = [[job['ssml'] for job in group] for group in groups]
 
-                global_part_number += 1
+    findings_per_file = parallel_map(validate_ssml_for_synthesis, ssml_lists, workers=workers)
+
+    findings = {}
+    for group, file_findings in zip(groups, findings_per_file):
+        for index, messages in file_findings.items():
+            findings[group[index]['part_number']] = messages
+    return findings
+
+def quarantine_job(output_directory: str, job: Dict, messages: List[str]) -> str:
+    """
+    Writes a rejected chunk and its validation findings to the quarantine folder
+    so it can be fixed and re-synthesized later with ``start_part``.
+    """
+    quarantine_dir = os.path.join(output_directory, 'quarantine')
+    os.makedirs(quarantine_dir, exist_ok=True)
+    stem = job['source_json'][:-len('.json')]
+    path = os.path.join(quarantine_dir, f"{stem}_chunk_{job['chunk_number']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(job, findings=messages), f, ensure_ascii=False, indent=2)
+    return path
 
-            except (BotoCoreError, ClientError) as error:
-                print(f"Error synthesizing speech: {error}")
-                raise ValueError(f"Error processing {json_file} (part {global_part_number}, chunk {chunk_index}): {error}\nProblematic SSML: {ssml_text}")
-            except Exception as error:
-                print(f"Unexpected error: {error}")
-                raise ValueError(f"Unexpected error processing {json_file} (part {global_part_number}, chunk {chunk_index}): {error}\nProblematic SSML: {ssml_text}")
+def process_ssml_from_json_files(input_directory: str,
+                                 output_directory: str, 
+                                 default_voice_id: str,
+                                 start_part: int = 1,
+                                 on_invalid: str = 'fail',
+                                 validation_workers: Optional[int] = None,
+                                 budget_usd: Optional[float] = None,
+                                 engine_limits: Optional[Dict[str, Dict]] = None) -> List[str]:
+    """
+    Synthesizes every SSML chunk in ``input_directory`` to MP3 with Amazon Polly.
+
+    All chunks are validated before the first synthesis request. With
+    ``on_invalid='fail'`` any finding aborts the run with SSMLProcessingError;
+    with ``on_invalid='quarantine'`` the bad chunks are written to
+    ``output_directory/quarantine`` and skipped, keeping their part numbers
+    reserved so the remaining parts are numbered as in a full run.
+
+    Billed characters are metered per chunk, voice and engine. Once the next
+    chunk would exceed ``budget_usd`` no further requests are sent. A usage
+    report is written to ``output_directory`` at the end of every run.
+
+    Chunks are synthesized through one queue per engine, each with its own
+    concurrency and rate limit (see ``polly_scheduler.DEFAULT_ENGINE_LIMITS``);
+    part numbers are fixed before synthesis, so output names do not depend on
+    completion order.
+    """
+    if on_invalid not in ('fail', 'quarantine'):
+        raise ValueError(f"on_invalid must be 'fail' or 'quarantine', got {on_invalid!r}")
 
+    print(f"Starting process_ssml_from_json_files with start_part={start_part}")
+    polly_client = boto3.client('polly')
+
+    os.makedirs(output_directory, exist_ok=True)
+    output_files = []
+
+    jobs = load_synthesis_jobs(input_directory, default_voice_id, start_part)
+
+    print(f"Validating {len(jobs)} chunks before synthesis")
+    findings = validate_synthesis_jobs(jobs, validation_workers)
+    if findings:
+        bad_jobs = [job for job in jobs if job['part_number'] in findings]
+        if on_invalid == 'fail':
+            summary = "\n".join(
+                f"{job['source_json']} (part {job['part_number']}, chunk {job['chunk_index']}): {'; '.join(findings[job['part_number']])}"
+                for job in bad_jobs
+            )
+            raise SSMLProcessingError(f"{len(bad_jobs)} chunk(s) failed validation; nothing was synthesized.\n{summary}")
+        for job in bad_jobs:
+            path = quarantine_job(output_directory, job, findings[job['part_number']])
+            print(f"Quarantined {job['source_json']} chunk {job['chunk_index']}: {path}")
+        jobs = [job for job in jobs if job['part_number'] not in findings]
+
+    meter = UsageMeter(budget_usd)
+    try:
+        synthesize_jobs(polly_client, jobs, output_directory, meter, output_files, engine_limits)
+    finally:
+        report_path = meter.write_report(output_directory)
+        print(f"Usage report written to {report_path}")
+
+    if meter.budget_exhausted:
+        print(f"Budget of ${budget_usd:.2f} reached; remaining chunks were not synthesized.")
     print(f"Finished processing. Generated {len(output_files)} output files.")
     return output_files
 
+def synthesize_jobs(polly_client, jobs: List[Dict], output_directory: str, meter: UsageMeter,
+                    output_files: List[str], engine_limits: Optional[Dict[str, Dict]] = None) -> None:
+    """
+    Sends jobs to Polly through one queue per engine, writing each MP3 straight
+    to its final book folder and recording its manifest entry. Jobs are admitted against ``meter`` in part order before
+    anything is sent, so the same budget always selects the same parts; each job is confirmed against the reconciled
+    total again just before its request goes out. A request counts as billed as soon as Polly responds, even if saving
+    its audio fails afterwards.
+    """
+    admitted = [job for job in jobs if meter.reserve(job)]
+    manifest_lock = threading.Lock()
+
+    for book_name in {job['book_name'] for job in admitted}:
+        os.makedirs(os.path.join(output_directory, book_name), exist_ok=True)
+
+    def synthesize(job):
+        json_file = job['source_json']
+        chunk_index = job['chunk_index']
+        global_part_number = job['part_number']
+        voice_id = job['voice']
+        engine = job['engine']
+        ssml_text = job['ssml']
+
+        if not meter.start(job):
+            print(f"Skipping part {global_part_number}: the budget has been reached")
+            return None
+
+        try:
+            print(f"Attempting to synthesize speech for chunk {chunk_index} with voice {voice_id} ({engine})")
+            response = polly_client.synthesize_speech(
+                Engine=engine,
+                Text=ssml_text,
+                TextType='ssml',
+                OutputFormat='mp3',
+                VoiceId=voice_id
+            )
+        except (BotoCoreError, ClientError) as error:
+            if is_throttling_error(error):
+                raise
+            print(f"Error synthesizing speech: {error}")
+            meter.fail(job)
+            raise ValueError(f"Error processing {json_file} (part {global_part_number}, chunk {chunk_index}): {error}\nProblematic SSML: {ssml_text}")
+
+        # Polly bills the request once it responds, whatever happens to the audio next
+        meter.complete(job, response.get('RequestCharacters'))
+        try:
+            output_file = job['output_path']
+            output_path = os.path.join(output_directory, *output_file.split('/'))
+            
+            audio_bytes = response['AudioStream'].read()
+            with open(output_path, 'wb') as file:
+                file.write(audio_bytes)
+
+            # Record the chunk while its audio is still in memory so later
+            # steps never have to re-open the MP3 to recover its duration.
+            entry = {
+                'source_json': json_file,
+                'chunk_number': job['chunk_number'],
+                'part_number': global_part_number,
+                'book_part_number': job['book_part_number'],
+                'voice': voice_id,
+                'engine': engine,
+                'output_path': output_file,
+                'bytes': len(audio_bytes),
+                'duration': audio_duration(audio_bytes),
+                'ssml_sha256': ssml_hash(ssml_text),
+            }
+            with manifest_lock:
+                append_manifest_entry(output_directory, entry)
+
+            print(f"Generated: {output_file} using {voice_id} voice with {engine} engine")
+            return output_path
+
+        except Exception as error:
+            print(f"Unexpected error: {error}")
+            meter.not_saved(job)
+            raise ValueError(f"Unexpected error processing {json_file} (part {global_part_number}, chunk {chunk_index}): {error}\nProblematic SSML: {ssml_text}")
+
+    try:
+        run_engine_queues(admitted, synthesize, engine_limits)
+    except (BotoCoreError, ClientError) as error:
+        raise ValueError(f"Polly kept throttling requests after repeated retries: {error}")
+    finally:
+        # Keep whatever finished, in part order, even if the run was aborted
+        output_files.extend(
+            os.path.join(output_directory, *job['output_path'].split('/'))
+            for job in admitted
+            if meter.status(job) == 'synthesized'
+        )
+
 def move_files_to_book_folders(output_directory: str):
     """
     Moves processed audio files into separate folders for each book.
+
+    Synthesis now writes directly into book folders; this is only needed for
+    flat output directories produced by older runs.
     """
     # List all .mp3 files in the output directory
     files = [f for f in os.listdir(output_directory) if f.endswith('.mp3')]
@@ -179,20 +360,88 @@ def move_files_to_book_folders(output_directory: str):
         except Exception as e:
             print(f"An error occurred: {e}")
 
+RENUMBER_JOURNAL = 'renumber_journal.json'
+
+def _write_journal(path: str, journal: Dict) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, indent=2)
+    os.replace(tmp_path, path)
+
+def plan_part_renumbering(output_directory: str) -> List[Dict]:
+    """
+    Lists the renames needed so every book folder is numbered 1..n in part
+    order. Paths are relative to ``output_directory``.
+    """
+    renames = []
+    for book_folder in sorted(os.listdir(output_directory)):
+        book_path = os.path.join(output_directory, book_folder)
+        if not os.path.isdir(book_path):
+            continue
+        files = [f for f in os.listdir(book_path) if f.endswith('.mp3') and re.search(r'part(\d+)', f)]
+        files.sort(key=lambda x: int(re.search(r'part(\d+)', x).group(1)))
+
+        for i, file in enumerate(files, start=1):
+            new_name = re.sub(r'part\d+', f'part{i:03d}', file, count=1)
+            if new_name != file:
+                renames.append({
+                    'from': f"{book_folder}/{file}",
+                    'tmp': f"{book_folder}/.renumber_{i:06d}.tmp",
+                    'to': f"{book_folder}/{new_name}",
+                })
+    return renames
+
 def reorder_part_numbers(output_directory: str):
     """
     Reorders the part numbers within each book folder to start from 1 and be sequential.
+
+    The renames are written to a journal first and applied in two phases
+    (every file to a temporary name, then every temporary name to its final
+    name), so no rename can overwrite another part. The synthesis manifest is
+    updated last. If the process is interrupted, calling this again resumes
+    from the journal.
     """
-    for book_folder in os.listdir(output_directory):
-        book_path = os.path.join(output_directory, book_folder)
-        if os.path.isdir(book_path):
-            files = [f for f in os.listdir(book_path) if f.endswith('.mp3')]
-            files.sort(key=lambda x: int(re.search(r'part(\d+)', x).group(1)))
-            
-            for i, file in enumerate(files, start=1):
-                old_name = os.path.join(book_path, file)
-                new_name = re.sub(r'part\d+', f'part{i:03d}', file)
-                os.rename(old_name, os.path.join(book_path, new_name))
+    journal_path = os.path.join(output_directory, RENUMBER_JOURNAL)
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+        print(f"Resuming interrupted renumbering at phase {journal['phase']}")
+    else:
+        renames = plan_part_renumbering(output_directory)
+        if not renames:
+            print("Part numbers are already sequential.")
+            return
+        journal = {'phase': 1, 'renames': renames}
+        _write_journal(journal_path, journal)
+
+    def path_of(relative):
+        return os.path.join(output_directory, *relative.split('/'))
+
+    if journal['phase'] == 1:
+        for rename in journal['renames']:
+            if os.path.exists(path_of(rename['from'])) and not os.path.exists(path_of(rename['tmp'])):
+                os.rename(path_of(rename['from']), path_of(rename['tmp']))
+        journal['phase'] = 2
+        _write_journal(journal_path, journal)
+
+    if journal['phase'] == 2:
+        for rename in journal['renames']:
+            if os.path.exists(path_of(rename['tmp'])):
+                os.rename(path_of(rename['tmp']), path_of(rename['to']))
+        journal['phase'] = 3
+        _write_journal(journal_path, journal)
+
+    if journal['phase'] == 3:
+        new_paths = {rename['from']: rename['to'] for rename in journal['renames']}
+        entries = load_manifest(output_directory)
+        if entries:
+            for entry in entries.values():
+                if entry['output_path'] in new_paths:
+                    entry['output_path'] = new_paths[entry['output_path']]
+                    part = re.search(r'part(\d+)', entry['output_path'].rsplit('/', 1)[-1])
+                    entry['book_part_number'] = int(part.group(1))
+            write_manifest(output_directory, entries.values())
+        os.remove(journal_path)
     
     print("Part numbers have been reordered within each book folder.")
 
@@ -202,6 +451,7 @@ if __name__ == "__main__":
     output_directory = 'C:/Users/rdw71/Documents/Python/TextractSSMLProcessor/audio_output'
     default_voice_id = 'Matthew'
     start_part = 1
+    on_invalid = 'fail'  # or 'quarantine' to skip bad chunks and continue
 
     if not os.path.exists(input_directory):
         print(f"Error: Input directory '{input_directory}' does not exist.")
@@ -212,7 +462,8 @@ if __name__ == "__main__":
                 input_directory=input_directory,
                 output_directory=output_directory,
                 default_voice_id=default_voice_id,
-                start_part=start_part
+                start_part=start_part,
+                on_invalid=on_invalid
             )
 
             print(f"Processed {len(outfiles)} files.")
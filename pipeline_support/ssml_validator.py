@@ -1,9 +1,16 @@
+import argparse
+import hashlib
 import json
 import re
 import os
-from typing import List, Dict, Tuple
+import sys
+from contextlib import ExitStack
+from datetime import datetime
+from typing import List, Dict, Optional, TextIO, Tuple
 from colorama import init, Fore, Style
 
+from pipeline_support.utils import parallel_map
+
 # Initialize colorama for cross-platform colored output
 init()
 
@@ -251,23 +258,333 @@ def test_nested_tags(ssml_list: List[str], non_self_closing_tags: List[str] = No
     return results
 
 
+# One-pass engine: each chunk is scanned once for tags, which splits it into
+# alternating text and tag events, and every check is a visitor over that
+# stream. The visitors reproduce the findings of the test_* functions above
+# exactly and in the same order, quirks included (see
+# NonStandardCharactersCheck). Checks that cannot fire on a chunk (no
+# non-ASCII text, no "english") switch themselves off for it in start_chunk.
+
+TAG_SCAN_PATTERN = re.compile(r'(?P<tag><(?:(?P<close>/?)(?P<name>\w+)[^>]*?(?P<selfclose>/?)>|[^>]+>))(?=(?P<after>\s*[(.,:;!?)])|)')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+ELEMENT_PATTERN = re.compile(r'<(/?)(\w+)([^>]*?)(/?)>')
+ENGLISH_WORD_PATTERN = re.compile(r'\b(?:E|e)nglish\b', re.IGNORECASE)
+NON_STANDARD_PATTERN = re.compile(r'[^\x00-\x7F]+')
+SINGLE_LETTER_PATTERN = re.compile(r'\b(?!I\b|A\b|O\b|s\b|t\b)[B-HJ-NP-Zb-hj-np-z]\b')
+MALFORMED_CLOSING_PATTERN = re.compile(r'</\s*(\w+)[^>]*[.,:;!?][^>]*>')
+CLOSING_TAG_PATTERN = re.compile(r'</[^>]+>')
+# Finds the same words as count_words' r'\b[\w-]+\b' once trailing hyphens are
+# stripped, without testing a word boundary at every position
+WORD_RUN_PATTERN = re.compile(r'\w[\w-]*')
+
+class SSMLCheck:
+    """Base visitor for ``run_checks``.
+
+    ``events`` names the methods the engine calls, in document order:
+    ``text(text, position, part_index)`` for each text between tags,
+    ``tag(match, element)`` for each tag (only those matching ``tag_filter``,
+    if set) and ``after(match)`` for each tag followed by punctuation.
+    ``match`` is the ``TAG_SCAN_PATTERN`` match and ``element`` is
+    ``(closing, name, self_closing, start, end)`` or None. A check that sets
+    ``active`` to False in ``start_chunk`` gets no events for that chunk.
+    """
+    name = ''
+    events: Tuple[str, ...] = ()
+    tag_filter = None
+
+    def __init__(self):
+        self.results: List[Tuple[int, str]] = []
+        self.active = True
+
+    def start_chunk(self, index: int, ssml: str, chunk: Dict) -> None:
+        self.index = index
+        self.ssml = ssml
+
+    def end_chunk(self) -> None:
+        pass
+
+class EnglishWordCheck(SSMLCheck):
+    name = "English Word"
+    events = ('text', 'tag')
+    tag_filter = ENGLISH_WORD_PATTERN
+
+    def start_chunk(self, index, ssml, chunk):
+        super().start_chunk(index, ssml, chunk)
+        # Case-insensitive matching only needs the regex for non-ASCII text
+        self.active = not ssml.isascii() or 'english' in ssml.lower()
+
+    def text(self, text, position, part_index):
+        for match in ENGLISH_WORD_PATTERN.finditer(text):
+            if not is_within_language_tag(self.ssml, position + match.start()):
+                self.results.append((self.index, f"Found '{match.group()}' outside language tags"))
+
+    def tag(self, match, element):
+        self.text(match.group('tag'), match.start(), -1)
+
+class PunctuationCheck(SSMLCheck):
+    name = "Punctuation"
+    events = ('after',)
+
+    def after(self, match):
+        tag, punctuation = match.group('tag'), match.group('after')[-1]
+        if punctuation in '.,:;' and tag not in {"<phoneme>", "</phoneme>", "<lang>", "</lang>"}:
+            self.results.append((self.index, f"Suspicious punctuation: '{tag}' followed by '{punctuation}'"))
+
+class SpeakTagsCheck(SSMLCheck):
+    name = "Speak Tags"
+    events = ('tag',)
+    tag_filter = re.compile('speak>')
+
+    def start_chunk(self, index, ssml, chunk):
+        super().start_chunk(index, ssml, chunk)
+        self.opening = self.closing = 0
+        self.first_opening = self.first_closing = -1
+
+    def tag(self, match, element):
+        # '<speak>' ends in '>', so it can only occur at the end of a tag
+        if match.group('tag').endswith("<speak>"):
+            if not self.opening:
+                self.first_opening = match.end('tag') - 7
+            self.opening += 1
+        elif match.group('tag').endswith("</speak>"):
+            if not self.closing:
+                self.first_closing = match.end('tag') - 8
+            self.closing += 1
+
+    def end_chunk(self):
+        if self.opening != 1 or self.closing != 1:
+            self.results.append((self.index, f"Incorrect number of <speak> tags. Found {self.opening} opening and {self.closing} closing tags."))
+        elif self.first_opening > self.first_closing:
+            self.results.append((self.index, "Closing </speak> tag appears before opening <speak> tag."))
+        elif not self.ssml.strip().startswith("<speak>") or not self.ssml.strip().endswith("</speak>"):
+            self.results.append((self.index, "<speak> tags are not at the start and end of the SSML."))
+
+class NonStandardCharactersCheck(SSMLCheck):
+    name = "Non-standard Characters"
+    events = ('text',)
+
+    def start_chunk(self, index, ssml, chunk):
+        super().start_chunk(index, ssml, chunk)
+        self.active = not ssml.isascii()
+
+    def text(self, text, position, part_index):
+        # test_non_standard_characters_outside_tags only looks at every other
+        # text part (its j % 2 test assumes the split keeps the tags)
+        if part_index % 2 == 0:
+            for match in NON_STANDARD_PATTERN.finditer(text):
+                self.results.append((self.index, f"Non-standard character(s) found outside tags: '{match.group()}'"))
+
+class TranslationLengthCheck(SSMLCheck):
+    """Word counts come from the chunk with its tags stripped; chunks that may
+    contain <sub> elements go through ``remove_ssml_tags`` instead, which also
+    drops their content."""
+    name = "Translation Length"
+    events = ('tag',)
+    tag_filter = re.compile('sub')
+
+    def __init__(self, low_threshold: float = 0.95, high_threshold: float = 3.0, debug: bool = False):
+        super().__init__()
+        self.low_threshold = low_threshold
+        self.high_threshold = high_threshold
+        self.debug = debug
+
+    def start_chunk(self, index, ssml, chunk):
+        super().start_chunk(index, ssml, chunk)
+        self.latin_text = chunk['original_latin']
+        self.has_sub = False
+
+    def tag(self, match, element):
+        self.has_sub = True
+
+    def end_chunk(self):
+        clean_english_text = remove_ssml_tags(self.ssml) if self.has_sub else TAG_PATTERN.sub('', self.ssml)
+        english_word_list = WORD_RUN_PATTERN.findall(clean_english_text)
+        latin_word_list = WORD_RUN_PATTERN.findall(self.latin_text)
+        latin_words, english_words = len(latin_word_list), len(english_word_list)
+        
+        ratio = english_words / latin_words if latin_words > 0 else float('inf')
+        
+        if self.debug or ratio > self.high_threshold or ratio < self.low_threshold:
+            latin_preview = ' '.join(word.rstrip('-') for word in latin_word_list[:5]) + ('...' if latin_words > 5 else '')
+            english_preview = ' '.join(word.rstrip('-') for word in english_word_list[:5]) + ('...' if english_words > 5 else '')
+            
+            self.results.append((self.index, f"Chunk {self.index}: {'Debug info' if self.debug else 'Translation length issue detected'}.\n"
+                                             f"  Latin words: {latin_words}\n"
+                                             f"  English words: {english_words}\n"
+                                             f"  Ratio (English/Latin): {ratio:.2f}\n"
+                                             f"  Latin preview: {latin_preview}\n"
+                                             f"  English preview: {english_preview}"))
+
+class MalformedClosingTagsCheck(SSMLCheck):
+    name = "Malformed Closing Tags"
+    events = ('tag',)
+    tag_filter = re.compile('</')
+
+    def tag(self, match, element):
+        malformed = MALFORMED_CLOSING_PATTERN.search(match.group('tag'))
+        if malformed:
+            start, end = match.start() + malformed.start(), match.end('tag')
+            context = self.ssml[max(0, start - 20):end + 20]
+            self.results.append((self.index, f"Chunk {self.index}: Malformed closing tag detected: '{malformed.group(0)}'\n"
+                                             f"  Tag: {malformed.group(1)}\n"
+                                             f"  Context: ...{context}..."))
+
+class MisplacedClosingTagsCheck(SSMLCheck):
+    name = "Misplaced Closing Tags"
+    events = ('after',)
+
+    def after(self, match):
+        closing = CLOSING_TAG_PATTERN.search(match.group('tag'))
+        if closing:
+            start, end = match.start() + closing.start(), match.end('after')
+            context = self.ssml[max(0, start - 20):end + 20]
+            self.results.append((self.index, f"Misplaced closing tag detected: '{self.ssml[start:end]}'\n"
+                                             f"  Context: ...{context}..."))
+
+class RandomSingleLettersCheck(SSMLCheck):
+    name = "Random Single Letters"
+    events = ('text',)
+
+    def text(self, text, position, part_index):
+        for match in SINGLE_LETTER_PATTERN.finditer(text):
+            context = text[max(0, match.start() - 20):match.end() + 20]
+            self.results.append((self.index, f"Random single letter detected: '{match.group(0)}'\n"
+                                             f"  Context: ...{context}..."))
+
+class BalancedTagsCheck(SSMLCheck):
+    name = "Balanced Tags"
+    events = ('tag',)
+
+    def __init__(self, allowed_tags: List[str] = None):
+        super().__init__()
+        if allowed_tags is None:
+            allowed_tags = ["break", "lang", "p", "phoneme", "s", "speak", "w"]
+        self.allowed_tags = set(allowed_tags)
+
+    def start_chunk(self, index, ssml, chunk):
+        super().start_chunk(index, ssml, chunk)
+        self.stack = []
+
+    def tag(self, match, element):
+        if element is None or element[1] not in self.allowed_tags:
+            return
+        closing, tag_name, self_closing, start, end = element
+        if closing:
+            if self.stack and self.stack[-1] == tag_name:
+                self.stack.pop()
+            else:
+                context = self.ssml[max(0, start - 20):end + 20]
+                self.results.append((self.index, f"Unmatched closing tag: </{tag_name}>\n"
+                                                 f"  Context: ...{context}..."))
+        elif not self_closing:
+            self.stack.append(tag_name)
+
+    def end_chunk(self):
+        while self.stack:
+            self.results.append((self.index, f"Unmatched opening tag: <{self.stack.pop()}>"))
+
+class NestedTagsCheck(SSMLCheck):
+    name = "Nested Tags"
+    events = ('tag',)
+
+    def __init__(self, non_self_closing_tags: List[str] = None):
+        super().__init__()
+        if non_self_closing_tags is None:
+            non_self_closing_tags = ["lang", "p", "phoneme", "s", "speak", "w"]
+        self.non_self_closing_tags = set(non_self_closing_tags)
+
+    def start_chunk(self, index, ssml, chunk):
+        super().start_chunk(index, ssml, chunk)
+        self.stack = []
+
+    def tag(self, match, element):
+        if element is None or element[1] not in self.non_self_closing_tags:
+            return
+        closing, tag_name, self_closing, start, end = element
+        if closing:
+            if self.stack and self.stack[-1] == tag_name:
+                self.stack.pop()
+            else:
+                self.results.append((self.index, f"Unmatched closing tag: </{tag_name}>"))
+        else:
+            if self.stack and self.stack[-1] == tag_name:
+                context = self.ssml[max(0, start - 20):end + 20]
+                self.results.append((self.index, f"Nested <{tag_name}> tag detected.\n"
+                                                 f"  Context: ...{context}..."))
+            self.stack.append(tag_name)
+
+ALL_CHECKS = [
+    EnglishWordCheck, PunctuationCheck, SpeakTagsCheck, NonStandardCharactersCheck,
+    TranslationLengthCheck, MalformedClosingTagsCheck, MisplacedClosingTagsCheck,
+    RandomSingleLettersCheck, BalancedTagsCheck, NestedTagsCheck,
+]
+
+SYNTHESIS_CHECKS = [SpeakTagsCheck, BalancedTagsCheck, NestedTagsCheck, MalformedClosingTagsCheck]
+
+def tag_element(match) -> Optional[Tuple[bool, str, bool, int, int]]:
+    """The element the legacy tag regexes see in a scanned tag, if any."""
+    if match.group('name') is not None:
+        return match.group('close') == '/', match.group('name'), match.group('selfclose') == '/', match.start(), match.end('tag')
+    tag = match.group('tag')
+    if '<' not in tag[1:]:
+        return None
+    # In a tag such as '<<p>' the element starts after the first character
+    element = ELEMENT_PATTERN.search(tag)
+    if element is None:
+        return None
+    return element.group(1) == '/', element.group(2), element.group(4) == '/', match.start() + element.start(), match.end('tag')
+
+def run_checks(data: Dict, checks: List[SSMLCheck]) -> Dict[str, List[Tuple[int, str]]]:
+    """Scan every chunk's ``cleaned_english_translation`` once, feeding all ``checks``."""
+    for index, chunk in enumerate(data['chunks']):
+        ssml = chunk['cleaned_english_translation']
+        for check in checks:
+            check.start_chunk(index, ssml, chunk)
+        active = [check for check in checks if check.active]
+        text_visitors = [check.text for check in active if 'text' in check.events]
+        tag_visitors = [(check.tag_filter, check.tag) for check in active if 'tag' in check.events]
+        after_visitors = [check.after for check in active if 'after' in check.events]
+        
+        position = 0
+        part_index = 0
+        for match in TAG_SCAN_PATTERN.finditer(ssml):
+            if text_visitors:
+                text = ssml[position:match.start()]
+                for visit in text_visitors:
+                    visit(text, position, part_index)
+            tag = match.group('tag')
+            element = tag_element(match)
+            for tag_filter, visit in tag_visitors:
+                if tag_filter is None or tag_filter.search(tag):
+                    visit(match, element)
+            if match.group('after') is not None:
+                for visit in after_visitors:
+                    visit(match)
+            position = match.end('tag')
+            part_index += 1
+        for visit in text_visitors:
+            visit(ssml[position:], position, part_index)
+        
+        for check in checks:
+            check.end_chunk()
+    return {check.name: check.results for check in checks}
+
+def validate_ssml_for_synthesis(ssml_list: List[str]) -> Dict[int, List[str]]:
+    """Run the checks that make Polly reject a chunk and group findings by chunk index.
+
+    Only the structural checks are included (speak tags, balanced and nested
+    tags, malformed closing tags); stylistic checks never block synthesis.
+    """
+    data = {'chunks': [{'cleaned_english_translation': ssml} for ssml in ssml_list]}
+    findings = {}
+    for test_results in run_checks(data, [check() for check in SYNTHESIS_CHECKS]).values():
+        for chunk_index, message in test_results:
+            findings.setdefault(chunk_index, []).append(message)
+    return findings
 
 def run_tests_on_file(file_path: str) -> Dict[str, List[Tuple[int, str]]]:
     data = load_json_data(file_path)
-    ssml_list = extract_clean_english_ssml(data)
-    
-    return {
-        "English Word": test_english_word(ssml_list),
-        "Punctuation": test_punctuation(ssml_list),
-        "Speak Tags": test_speak_tags(ssml_list),
-        "Non-standard Characters": test_non_standard_characters_outside_tags(ssml_list),
-        "Translation Length": test_translation_length(data),
-        "Malformed Closing Tags": test_malformed_closing_tags(data),
-        "Misplaced Closing Tags": test_misplaced_closing_tags(ssml_list),
-        "Random Single Letters": test_random_single_letters_outside_tags(ssml_list),
-        "Balanced Tags": test_balanced_tags(ssml_list) ,
-        "Nested Tags": test_nested_tags(ssml_list)
-    }
+    return run_checks(data, [check() for check in ALL_CHECKS])
 
 def run_tests_on_directory(directory_path: str) -> Dict[str, Dict[str, List[Tuple[int, str]]]]:
     results = {}
@@ -303,7 +620,104 @@ def display_results(results: Dict[str, Dict[str, List[Tuple[int, str]]]]) -> Non
         print(f"\n{Fore.GREEN}All tests passed successfully! No issues found.{Style.RESET_ALL}")
 
 
-def main():
+VALIDATION_CACHE_FILENAME = '.ssml_validation_cache.json'
+
+def find_json_files(root: str) -> List[str]:
+    """Every ``.json`` file under ``root``, relative to it, in a stable order."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.json') and filename != VALIDATION_CACHE_FILENAME:
+                found.append(os.path.relpath(os.path.join(dirpath, filename), root))
+    return found
+
+def validate_file(root: str, relative_path: str, cached_sha256: Optional[str] = None) -> Dict:
+    """Validate one file for the CLI.
+
+    Returns a JSON-ready record. When the file's SHA-256 equals
+    ``cached_sha256`` it is not parsed and the record is marked ``cached``.
+    """
+    record = {'file': relative_path}
+    try:
+        with open(os.path.join(root, relative_path), 'rb') as f:
+            content = f.read()
+        record['sha256'] = hashlib.sha256(content).hexdigest()
+        if record['sha256'] == cached_sha256:
+            record['cached'] = True
+            return record
+        results = run_checks(json.loads(content), [check() for check in ALL_CHECKS])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        return record
+    
+    findings = {name: findings for name, findings in results.items() if findings}
+    record['status'] = 'failed' if findings else 'passed'
+    record['findings'] = findings
+    return record
+
+def load_validation_cache(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_validation_cache(path: str, cache: Dict[str, Dict]) -> None:
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(path + '.tmp', path)
+
+def parse_changed_since(value: str) -> float:
+    """Accept a Unix timestamp or an ISO 8601 date/time."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a timestamp or ISO date: {value!r}")
+
+def validate_tree(root: str, output: TextIO, workers: Optional[int] = None,
+                  changed_since: Optional[float] = None, cache_path: Optional[str] = None) -> Dict[str, int]:
+    """Validate every JSON file under ``root``, writing one JSON line per file to ``output``.
+
+    Files last modified before ``changed_since`` are skipped. With
+    ``cache_path``, files whose content hash matches the cache reuse their
+    stored findings instead of being validated again. Returns counts by status.
+    """
+    paths = find_json_files(root)
+    if changed_since is not None:
+        paths = [path for path in paths if os.path.getmtime(os.path.join(root, path)) >= changed_since]
+    cache = load_validation_cache(cache_path) if cache_path else {}
+    cached_hashes = [cache.get(path, {}).get('sha256') for path in paths]
+    
+    counts = {'passed': 0, 'failed': 0, 'error': 0, 'cached': 0}
+    
+    def report(record: Dict) -> None:
+        if record.pop('cached', False):
+            entry = cache[record['file']]
+            record.update(status=entry['status'], findings=entry['findings'], cached=True)
+            counts['cached'] += 1
+        elif record['status'] != 'error':
+            cache[record['file']] = {'sha256': record['sha256'], 'status': record['status'],
+                                     'findings': record['findings']}
+        counts[record['status']] += 1
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+    
+    roots = [root] * len(paths)
+    for record in parallel_map(validate_file, roots, paths, cached_hashes, workers=workers, chunksize=16):
+        report(record)
+    
+    if cache_path:
+        save_validation_cache(cache_path, {path: entry for path, entry in cache.items()
+                                           if os.path.exists(os.path.join(root, path))})
+    return counts
+
+def interactive_main() -> None:
     print(f"{Fore.CYAN}SSML Test Suite{Style.RESET_ALL}")
     print(f"{Fore.CYAN}================={Style.RESET_ALL}")
     
@@ -322,5 +736,56 @@ def main():
         results = run_tests_on_directory(directory_path)
         display_results(results)
 
+def main(argv: Optional[List[str]] = None) -> int:
+    """Validate a directory tree from the command line; without arguments, prompt interactively.
+
+    Exits with 1 when any file has findings or cannot be read, 0 otherwise.
+    Near-duplicate clusters are reported as warnings and do not affect the exit status.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        interactive_main()
+        return 0
+    
+    parser = argparse.ArgumentParser(description="Validate the SSML in every processed JSON file under a directory.")
+    parser.add_argument("directory", help="Directory searched recursively for .json files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: every CPU)")
+    parser.add_argument("--output", help="Write the JSON lines to this file instead of stdout")
+    parser.add_argument("--changed-since", type=parse_changed_since, default=None,
+                        help="Only validate files modified at or after this Unix timestamp or ISO date")
+    parser.add_argument("--cache", nargs='?', const='', default=None,
+                        help="Reuse findings for files whose content hash is unchanged "
+                             f"(default file: DIRECTORY/{VALIDATION_CACHE_FILENAME})")
+    parser.add_argument("--near-duplicates", action="store_true",
+                        help="Also report clusters of near-duplicate English sentences across all files (needs numpy)")
+    parser.add_argument("--similarity", type=float, default=0.8,
+                        help="Estimated Jaccard similarity at which sentences count as near duplicates")
+    args = parser.parse_args(argv)
+    
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    cache_path = None
+    if args.cache is not None:
+        cache_path = args.cache or os.path.join(args.directory, VALIDATION_CACHE_FILENAME)
+    
+    with ExitStack() as stack:
+        output = stack.enter_context(open(args.output, 'w', encoding='utf-8')) if args.output else sys.stdout
+        counts = validate_tree(args.directory, output, workers=args.workers,
+                               changed_since=args.changed_since, cache_path=cache_path)
+        clusters = None
+        if args.near_duplicates:
+            from pipeline_support.near_duplicates import find_near_duplicates
+            clusters = find_near_duplicates(args.directory, find_json_files(args.directory),
+                                            threshold=args.similarity, workers=args.workers)
+            for cluster in clusters:
+                output.write(json.dumps({'near_duplicates': cluster, 'size': len(cluster)}, ensure_ascii=False) + '\n')
+    
+    print(f"Validated {sum(counts[status] for status in ('passed', 'failed', 'error'))} files "
+          f"({counts['cached']} from cache): {counts['passed']} passed, {counts['failed']} failed, "
+          f"{counts['error']} unreadable", file=sys.stderr)
+    if clusters is not None:
+        print(f"Found {len(clusters)} clusters of near-duplicate sentences", file=sys.stderr)
+    return 1 if counts['failed'] or counts['error'] else 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# synthesis_manifest.py
+
+import hashlib
+import io
+import json
+import os
+from typing import Dict, Tuple
+
+from mutagen.mp3 import MP3
+
+MANIFEST_FILENAME = 'synthesis_manifest.jsonl'
+
+
+def ssml_hash(ssml_text: str) -> str:
+    """Return the SHA-256 hex digest of an SSML chunk."""
+    return hashlib.sha256(ssml_text.encode('utf-8')).hexdigest()
+
+
+def manifest_path(directory: str) -> str:
+    return os.path.join(directory, MANIFEST_FILENAME)
+
+
+def audio_duration(audio_bytes: bytes) -> float:
+    """Return the duration in seconds of an in-memory MP3 stream."""
+    return MP3(io.BytesIO(audio_bytes)).info.length
+
+
+def append_manifest_entry(directory: str, entry: Dict) -> None:
+    """Append one synthesized chunk to the manifest in ``directory``.
+
+    The manifest is JSON Lines so each chunk is durable as soon as it is
+    written; an interrupted run leaves every earlier entry intact.
+    """
+    with open(manifest_path(directory), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        f.flush()
+
+
+def write_manifest(directory: str, entries) -> None:
+    """Atomically replace the manifest in ``directory`` with ``entries``."""
+    path = manifest_path(directory)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+
+
+def load_manifest(directory: str) -> Dict[Tuple[str, int], Dict]:
+    """Load the manifest in ``directory`` keyed by ``(source_json, chunk_number)``.
+
+    Later entries override earlier ones, so re-synthesizing a chunk simply
+    appends a newer record. A truncated final line from an interrupted write
+    is ignored. Returns an empty dict when no manifest exists.
+    """
+    path = manifest_path(directory)
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[(entry['source_json'], int(entry['chunk_number']))] = entry
+    return entries
@@ -2,11 +2,79 @@
 
 import re
 import os
+import time
+
+from pipeline_support.utils import parallel_map
+
+BRACKET_PATTERN = re.compile(r'[\[\]]')
+NOTE_PREFIX = 'note:'
+
+def strip_bracketed(pieces, notes_only=False):
+    """
+    Remove balanced ``[...]`` groups of any depth from a stream of text pieces.
+
+    With ``notes_only`` only groups starting with ``[Note:`` (any case) are
+    removed; other groups inside them go with them. Brackets without a
+    partner are kept as text. Text outside brackets is yielded as soon as it
+    is read; only the span of an open group is held back. Runs in linear time.
+    """
+    held = []
+    opens = []
+    for piece in pieces:
+        position = 0
+        end = len(piece)
+        while position < end:
+            if not opens:
+                # Outside any group, stray ']' are plain text up to the next '['
+                index = piece.find('[', position)
+                if index < 0:
+                    yield piece[position:]
+                    break
+                if index > position:
+                    yield piece[position:index]
+                opens.append(0)
+                held.append('[')
+                position = index + 1
+                continue
+            match = BRACKET_PATTERN.search(piece, position)
+            if match is None:
+                held.append(piece[position:])
+                break
+            index = match.start()
+            if index > position:
+                held.append(piece[position:index])
+            position = index + 1
+            if piece[index] == '[':
+                opens.append(len(held))
+                held.append('[')
+                continue
+            start = opens.pop()
+            if notes_only and not is_note(held, start):
+                held.append(']')
+            else:
+                del held[start:]
+                if opens:
+                    # Empty marker: a removed group still separates its parent from "Note:"
+                    held.append('')
+            if not opens and held:
+                yield ''.join(held)
+                held.clear()
+    if held:
+        yield ''.join(held)
+
+def is_note(held, start):
+    """Whether the group opened at ``held[start]`` begins with ``Note:``."""
+    prefix = ''
+    for index in range(start + 1, min(len(held), start + 1 + len(NOTE_PREFIX))):
+        text = held[index]
+        if text in ('', '['):
+            break
+        prefix += text
+    return prefix[:len(NOTE_PREFIX)].lower() == NOTE_PREFIX
 
 def remove_notes(text):
-    # Remove notes with nested square brackets
-    pattern = r'\[Note:(?:[^\[\]]|\[(?:[^\[\]]|\[(?:[^\[\]]|\[[^\[\]]*\])*\])*\])*\]'
-    text = re.sub(pattern, '', text, flags=re.DOTALL | re.IGNORECASE)
+    # Remove notes, including any square brackets nested inside them
+    text = ''.join(strip_bracketed([text], notes_only=True))
     
     # Clean up any leftover empty paragraphs, breaks, or small tags
     text = re.sub(r'<p>\s*</p>', '', text)
@@ -16,38 +84,38 @@ def remove_notes(text):
     return text
 
 def remove_square_brackets(text):
-    return re.sub(r'\[.*?\]', '', text, flags=re.DOTALL)
+    return ''.join(strip_bracketed([text]))
 
 def split_into_sections(text):
     sections = re.split(r'<h4><center>', text)
     return [section.strip() for section in sections if section.strip() and section.strip()!="<br>"]
 
-def extract_and_print_all_caps_title(content, part):
-    lines = content.split('\n')
+def all_caps_title(content):
     all_caps_lines = []
-    for line in lines:
+    for line in content.split('\n'):
         line = line.strip()
         if line.isupper() and line:
             all_caps_lines.append(line)
         else:
             break
-    
+    return all_caps_lines
+
+def extract_and_print_all_caps_title(content, part):
+    all_caps_lines = all_caps_title(content)
     if all_caps_lines:
         print("All-caps title found:")
         for line in all_caps_lines:
             print(f'Part {part}:\t', line)
-    else:
-        pass
 
-def process_text(input_text, filename_base, output_dir):
+def section_texts(input_text):
     cleaned_text = remove_notes(input_text)
     cleaned_text = remove_square_brackets(cleaned_text)
-    sections = split_into_sections(cleaned_text)
-    
-    for i, section in enumerate(sections, 1):
+    for section in split_into_sections(cleaned_text):
         content = re.sub(r'<h4><center>.*?</center></h4>', '', section, flags=re.DOTALL).strip()
-        content = re.sub(r'<.*?>', '', content)
-        
+        yield re.sub(r'<.*?>', '', content)
+
+def process_text(input_text, filename_base, output_dir):
+    for i, content in enumerate(section_texts(input_text), 1):
         extract_and_print_all_caps_title(content, i)
         
         filename = f"{filename_base}_part_{i}.txt"
@@ -56,15 +124,90 @@ def process_text(input_text, filename_base, output_dir):
             f.write(content)
     return f"Processed files have been saved in: {output_dir}"
 
-def process_files_in_directory(directory, output_dir):
-    for filename in os.listdir(directory):
+def section_outputs(output_dir):
+    """Existing ``<base>_part_<n>.txt`` outputs in ``output_dir``, as ``{base: {n: path}}``."""
+    outputs = {}
+    for filename in os.listdir(output_dir):
+        match = re.fullmatch(r'(.+)_part_(\d+)\.txt', filename)
+        if match:
+            outputs.setdefault(match.group(1), {})[int(match.group(2))] = os.path.join(output_dir, filename)
+    return outputs
+
+def outputs_are_current(file_path, parts):
+    """Whether ``parts`` are exactly sections ``1..n`` and all newer than ``file_path``."""
+    return (bool(parts) and sorted(parts) == list(range(1, len(parts) + 1))
+            and min(map(os.path.getmtime, parts.values())) >= os.path.getmtime(file_path))
+
+def process_file(file_path, output_dir, previous_parts=None):
+    """
+    Clean and section one input file and report its outcome. Outputs in
+    ``previous_parts`` (``{n: path}``) numbered above the new section count
+    are removed, so a shorter input leaves no stale parts.
+    """
+    filename = os.path.basename(file_path)
+    result = {'file': filename, 'status': 'processed', 'sections': 0, 'bytes': 0, 'titles': {}}
+    start_time = time.time()
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        filename_base = os.path.splitext(filename)[0]
+        for i, section in enumerate(section_texts(content), 1):
+            title = all_caps_title(section)
+            if title:
+                result['titles'][i] = title
+            with open(os.path.join(output_dir, f"{filename_base}_part_{i}.txt"), 'w', encoding='utf-8') as f:
+                f.write(section)
+            result['sections'] += 1
+            result['bytes'] += len(section.encode('utf-8'))
+        for number, path in (previous_parts or {}).items():
+            if number > result['sections']:
+                os.remove(path)
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.time() - start_time, 3)
+    return result
+
+def process_files_in_directory(directory, output_dir, workers=None, force=False):
+    """
+    Clean and section every file in ``directory`` into ``output_dir`` using a
+    process pool of ``workers`` processes (default: every CPU; 1 runs inline).
+
+    A file is skipped when its outputs are exactly parts ``1..n`` and all are
+    newer than it, unless ``force`` is set. One failed file does not stop the others.
+    Returns a summary with the sections and bytes written, the failures and
+    the outcome and timing of every file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    existing = section_outputs(output_dir)
+    
+    results = []
+    pending = []
+    previous = []
+    for filename in sorted(os.listdir(directory)):
         file_path = os.path.join(directory, filename)
-        if os.path.isfile(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            filename_base = os.path.splitext(filename)[0]
-            try:
-                result = process_text(content, filename_base, output_dir)
-                print(result)
-            except Exception as e:
-                print(f"An error occurred while processing the file '{filename}': {e}")
+        if not os.path.isfile(file_path):
+            continue
+        parts = existing.get(os.path.splitext(filename)[0], {})
+        if not force and outputs_are_current(file_path, parts):
+            results.append({'file': filename, 'status': 'skipped', 'sections': 0, 'bytes': 0,
+                            'titles': {}, 'seconds': 0.0})
+        else:
+            pending.append(file_path)
+            previous.append(parts)
+    
+    start_time = time.time()
+    output_dirs = [output_dir] * len(pending)
+    results.extend(parallel_map(process_file, pending, output_dirs, previous, workers=workers))
+    results.sort(key=lambda result: result['file'])
+    
+    return {
+        'processed': sum(1 for result in results if result['status'] == 'processed'),
+        'skipped': sum(1 for result in results if result['status'] == 'skipped'),
+        'failed': sum(1 for result in results if result['status'] == 'failed'),
+        'sections': sum(result['sections'] for result in results),
+        'bytes': sum(result['bytes'] for result in results),
+        'errors': {result['file']: result['error'] for result in results if result['status'] == 'failed'},
+        'seconds': round(time.time() - start_time, 3),
+        'files': results,
+    }
@@ -0,0 +1,22 @@
+# utils.py
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+
+def parallel_map(function: Callable, *iterables: Iterable, workers: Optional[int] = None,
+                 chunksize: int = 1) -> Iterator:
+    """
+    ``map(function, *iterables)`` over a process pool of ``workers`` processes
+    (default: every CPU), yielding the results in input order.
+
+    With ``workers`` of 1 or less, or fewer than two items, the calls run
+    inline, so no pool is started. ``function`` must be defined at module
+    level so it can be sent to the worker processes.
+    """
+    arguments = [list(iterable) for iterable in iterables]
+    if (workers is not None and workers <= 1) or len(arguments[0]) < 2:
+        yield from map(function, *arguments)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(function, *arguments, chunksize=chunksize)
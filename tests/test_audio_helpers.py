@@ -0,0 +1,261 @@
+import io
+import types
+
+import pytest
+
+from tests.test_subtitle_index import load_audio_module
+
+
+def sub(start, end, text):
+    return {'start': start, 'end': end, 'text': text}
+
+
+def test_subtitle_intervals_fill_gaps_and_the_tail():
+    audio = load_audio_module()
+    intervals = audio.subtitle_intervals([sub(2.0, 3.0, 'b'), sub(0.5, 1.5, 'a')], 5.0)
+    assert intervals == [(0.0, 0.5, None), (0.5, 1.5, 'a'), (1.5, 2.0, None), (2.0, 3.0, 'b'), (3.0, 5.0, None)]
+
+
+def test_subtitle_intervals_merge_adjacent_identical_text_and_clip_overlaps():
+    audio = load_audio_module()
+    intervals = audio.subtitle_intervals([sub(0.0, 1.0, 'same'), sub(1.0, 2.0, 'same'),
+                                          sub(1.5, 2.5, 'next'), sub(2.5, 9.0, 'last')], 4.0)
+    assert intervals == [(0.0, 2.0, 'same'), (2.0, 2.5, 'next'), (2.5, 4.0, 'last')]
+    assert audio.subtitle_intervals([], 3.0) == [(0.0, 3.0, None)]
+    assert audio.subtitle_intervals([sub(0.0, 1.0, 'a')], 0.0) == []
+
+
+def test_static_video_escapes_still_paths_and_rejects_empty_audio(tmp_path, monkeypatch):
+    audio = load_audio_module()
+    lists, commands = [], []
+
+    def run(command, check, **kwargs):
+        if command == ['ffmpeg', '-version']:
+            return types.SimpleNamespace(stdout='ffmpeg version 4.4.2-0ubuntu0.22.04.1 Copyright (c) 2000-2021\n')
+        commands.append(command)
+        with open(command[command.index('-i') + 1], encoding='utf-8') as f:
+            lists.append(f.read())
+
+    def render(text, book_title, main_font, path):
+        path = path.replace('still_', "it's still_")
+        open(path, 'wb').close()
+        return path
+
+    monkeypatch.setattr(audio, 'MP3', lambda path: types.SimpleNamespace(info=types.SimpleNamespace(length=2.0)))
+    monkeypatch.setattr(audio, 'render_still_frame', render)
+    monkeypatch.setattr(audio.subprocess, 'run', run)
+    audio.write_static_segment_video('book.mp3', [sub(0.5, 1.0, 'a')], str(tmp_path / 'out.mp4'), 'Title', 'font')
+
+    lines = lists[0].splitlines()
+    assert lines[0].startswith("file '") and "it'\\''s still_000000.png'" in lines[0]
+    assert lines[1] == 'duration 0.500'
+    assert lines[-1] == lines[0]
+    assert '-fps_mode' not in commands[0] and commands[0][commands[0].index('-vsync') + 1] == 'vfr'
+
+    monkeypatch.setattr(audio, 'MP3', lambda path: types.SimpleNamespace(info=types.SimpleNamespace(length=0.0)))
+    with pytest.raises(ValueError):
+        audio.write_static_segment_video('book.mp3', [], str(tmp_path / 'out.mp4'), 'Title', 'font')
+
+
+def test_chapters_start_where_the_previous_part_ends():
+    audio = load_audio_module()
+    assert audio.chapters_from_durations([1.5, 2.25]) == [
+        {'title': 'Part 1', 'start': 0.0, 'end': 1.5},
+        {'title': 'Part 2', 'start': 1.5, 'end': 3.75},
+    ]
+    assert [c['title'] for c in audio.chapters_from_durations([1.0, 1.0], ['Prologue', 'Book I'])] == ['Prologue', 'Book I']
+
+
+def test_ffmetadata_escapes_values_and_writes_chapters_in_milliseconds(tmp_path):
+    audio = load_audio_module()
+    assert audio.escape_ffmetadata('a=b;c#d\\e\nf') == 'a\\=b\\;c\\#d\\\\e\\\nf'
+
+    chapters = audio.chapters_from_durations([1.2345, 2.0], ['One; two', 'Three'])
+    path = audio.write_ffmetadata(str(tmp_path / 'metadata.txt'), {'title': 'A=B', 'genre': ''}, chapters)
+    assert open(path, encoding='utf-8').read() == (
+        ';FFMETADATA1\n'
+        'title=A\\=B\n'
+        '[CHAPTER]\nTIMEBASE=1/1000\nSTART=0\nEND=1234\ntitle=One\\; two\n'
+        '[CHAPTER]\nTIMEBASE=1/1000\nSTART=1234\nEND=3234\ntitle=Three\n'
+    )
+
+
+def test_m4b_is_built_by_one_ffmpeg_invocation(tmp_path, monkeypatch):
+    audio = load_audio_module()
+    commands = []
+
+    def run(command, check, **kwargs):
+        if '-version' not in command:
+            parts = open(command[command.index('concat') + 4], encoding='utf-8').read()
+            metadata = open(command[command.index('ffmetadata') + 2], encoding='utf-8').read()
+            commands.append((command, parts, metadata))
+
+    monkeypatch.setattr(audio.subprocess, 'run', run)
+    audio.build_m4b_audiobook(['part10.mp3', 'part2.mp3'], 'book.m4b', 'Title', 'Author', '1600', 'Latin', '',
+                              cover_image_path='cover.png', durations=[2.0, 3.0])
+
+    [(command, parts, metadata)] = commands
+    assert [line.rsplit('/', 1)[-1] for line in parts.splitlines()] == ["part2.mp3'", "part10.mp3'"]
+    assert command[command.index('-c:a') + 1:] == ['aac', '-b:a', '64k', '-movflags', '+faststart', '-f', 'mp4', 'book.m4b']
+    assert command[command.index('-map_metadata'):command.index('-c:a')] == [
+        '-map_metadata', '1', '-map_chapters', '1',
+        '-map', '2:v', '-c:v', 'copy', '-disposition:v:0', 'attached_pic']
+    assert command[command.index('cover.png') - 1] == '-i'
+    assert 'START=2000\nEND=5000\n' in metadata
+    assert 'description' not in metadata
+
+
+def test_timeline_cuts_never_fall_inside_a_subtitle():
+    audio = load_audio_module()
+    subtitles = [sub(0.0, 3.2, 'a'), sub(3.2, 5.1, 'b'), sub(4.0, 7.5, 'overlaps b'), sub(7.5, 9.0, 'c'), sub(9.5, 12.0, 'd')]
+    segments = audio.split_timeline_at_subtitles(subtitles, 12.0, 4, fps=10)
+
+    assert segments[0][0] == 0.0 and segments[-1][1] == 12.0
+    assert all(end == start for (_, end), (start, _) in zip(segments, segments[1:]))
+    cuts = [start for start, _ in segments[1:]]
+    assert cuts == [3.2, 7.5, 9.5]
+    assert not any(s['start'] < cut < s['end'] for s in subtitles for cut in cuts)
+    assert audio.split_timeline_at_subtitles([sub(0.0, 10.0, 'one long caption')], 10.0, 3) == [(0.0, 10.0)]
+
+
+def test_subtitles_in_range_clips_and_rebases_crossing_captions():
+    audio = load_audio_module()
+    subtitles = [sub(0.0, 2.0, 'before'), sub(1.5, 3.5, 'crosses start'), sub(3.0, 4.0, 'inside'),
+                 sub(4.5, 6.0, 'crosses end'), sub(6.0, 7.0, 'after')]
+    assert audio.subtitles_in_range(subtitles, 2.0, 5.0) == [
+        sub(0.0, 1.5, 'crosses start'), sub(1.0, 2.0, 'inside'), sub(2.5, 3.0, 'crosses end')]
+
+
+def stub_ffmpeg(audio, monkeypatch, sample_rates):
+    """Stub MP3 headers and ffmpeg; returns the commands ffmpeg would have run."""
+    commands = []
+
+    class Process:
+        def __init__(self, command, stdin=None, stdout=None):
+            commands.append(command)
+            self.args, self.returncode = command, 0
+            self.stdin = io.BytesIO() if stdin else None
+            self.stdout = io.BytesIO(b'pcm') if stdout else None
+
+        def wait(self):
+            return self.returncode
+
+    info = lambda path: types.SimpleNamespace(version=1, layer=3, sample_rate=sample_rates[path], channels=1)
+    monkeypatch.setattr(audio, 'MP3', lambda path: types.SimpleNamespace(info=info(path)))
+    monkeypatch.setattr(audio.subprocess, 'run', lambda command, check, **kwargs: commands.append(command))
+    monkeypatch.setattr(audio.subprocess, 'Popen', Process)
+    return commands
+
+
+def test_matching_parts_are_combined_with_stream_copy(monkeypatch):
+    audio = load_audio_module()
+    commands = stub_ffmpeg(audio, monkeypatch, {'part1.mp3': 24000, 'part2.mp3': 24000})
+    audio.combine_mp3_files(['part2.mp3', 'part1.mp3'], 'book.mp3')
+
+    assert commands[0] == ['ffmpeg', '-version']
+    [command] = commands[1:]
+    assert command[command.index('-c'):] == ['-c', 'copy', 'book.mp3']
+
+
+def test_mismatched_parts_are_decoded_in_order_into_one_encoder(monkeypatch):
+    audio = load_audio_module()
+    commands = stub_ffmpeg(audio, monkeypatch, {'part1.mp3': 24000, 'part2.mp3': 22050})
+    audio.combine_mp3_files(['part2.mp3', 'part1.mp3'], 'book.mp3')
+
+    encoder, *decoders = commands[1:]
+    assert encoder[encoder.index('-f'):] == ['-f', 's16le', '-ar', '24000', '-ac', '1', '-i', 'pipe:0',
+                                            '-c:a', 'libmp3lame', 'book.mp3']
+    assert [decoder[decoder.index('-i') + 1] for decoder in decoders] == ['part1.mp3', 'part2.mp3']
+    assert all(decoder[-5:] == ['-ar', '24000', '-ac', '1', 'pipe:1'] for decoder in decoders)
+
+
+@pytest.mark.parametrize('banner, options', [
+    ('ffmpeg version 4.4.2-0ubuntu0.22.04.1 Copyright', ['-vsync', 'vfr']),
+    ('ffmpeg version 5.0.1 Copyright', ['-vsync', 'vfr']),
+    ('ffmpeg version 5.1 Copyright', ['-fps_mode', 'vfr']),
+    ('ffmpeg version n6.1.1 Copyright', ['-fps_mode', 'vfr']),
+    ('ffmpeg version N-113456-g1a2b3c Copyright', ['-fps_mode', 'vfr']),
+])
+def test_variable_frame_rate_option_follows_the_ffmpeg_version(monkeypatch, banner, options):
+    audio = load_audio_module()
+    monkeypatch.setattr(audio.subprocess, 'run', lambda command, **kwargs: types.SimpleNamespace(stdout=banner + '\n'))
+    assert audio.vfr_output_options() == options
+
+
+SRT = """1
+00:00:02,000 --> 00:00:03,250
+Second {line}
+wrapped.
+
+2
+00:00:00,500 --> 00:00:01,500
+First line.
+"""
+
+
+def test_ffmpeg_renderer_burns_an_ass_script_onto_a_generated_background(tmp_path, monkeypatch):
+    audio = load_audio_module()
+    srt_path = tmp_path / 'book.srt'
+    srt_path.write_text(SRT, encoding='utf-8')
+    runs = []
+
+    def run(command, check, **kwargs):
+        video_filter = command[command.index('-vf') + 1]
+        with open(video_filter[len("ass='"):video_filter.index("':fontsdir=")], encoding='utf-8') as f:
+            runs.append((command, f.read()))
+
+    monkeypatch.setattr(audio, 'MP3', lambda path: types.SimpleNamespace(info=types.SimpleNamespace(length=3.5)))
+    monkeypatch.setattr(audio.subprocess, 'run', run)
+    audio.enhanced_mp3_to_mp4_with_subtitles('book.mp3', str(srt_path), None, 'book.mp4', 'My {Book}',
+                                             renderer='ffmpeg')
+
+    [(command, script)] = runs
+    lines = script.splitlines()
+    assert lines[0] == '[Script Info]' and 'PlayResX: 1920' in lines and 'PlayResY: 1080' in lines
+    assert [line for line in lines if line.startswith('Style: Main,')][0].startswith('Style: Main,Open Sans,40,&H001B2C3E,')
+    assert [line for line in lines if line.startswith('Dialogue:')] == [
+        'Dialogue: 1,0:00:00.00,0:00:03.50,Title,,0,0,0,,My \\{Book\\}',
+        'Dialogue: 0,0:00:00.50,0:00:01.50,Main,,0,0,0,,First line.',
+        'Dialogue: 0,0:00:02.00,0:00:03.25,Main,,0,0,0,,Second \\{line\\}\\Nwrapped.',
+    ]
+    assert command[command.index('lavfi') + 2] == 'color=c=0xEDE0CA:s=1920x1080:r=24'
+    assert command[command.index('-vf') + 1].endswith(f":fontsdir='{audio.FONT_DIR}'")
+    assert command[command.index('-map'):] == ['-map', '0:v', '-map', '1:a', '-c:v', 'libx264', '-preset', 'ultrafast',
+                                               '-tune', 'stillimage', '-pix_fmt', 'yuv420p', '-c:a', 'aac',
+                                               '-t', '3.500', 'book.mp4']
+
+
+def test_ass_times_round_to_centiseconds():
+    audio = load_audio_module()
+    assert audio.seconds_to_ass_time(3723.456) == '1:02:03.46'
+    assert audio.seconds_to_ass_time(59.999) == '0:01:00.00'
+
+
+def test_segmented_render_joins_segments_cut_between_subtitles(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    audio = load_audio_module()
+    rendered, runs = [], []
+
+    def render(mp3_path, subtitles, start, end, book_title, logo_path, main_font, segment_path, fps):
+        rendered.append((start, end, subtitles))
+        open(segment_path, 'wb').close()
+        return segment_path
+
+    def run(command, check, **kwargs):
+        with open(command[command.index('concat') + 4], encoding='utf-8') as f:
+            runs.append((command, f.read()))
+
+    monkeypatch.setattr(audio, 'MP3', lambda path: types.SimpleNamespace(info=types.SimpleNamespace(length=9.0)))
+    monkeypatch.setattr(audio, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(audio, 'render_video_segment', render)
+    monkeypatch.setattr(audio.subprocess, 'run', run)
+    subtitles = [sub(0.0, 2.5, 'a'), sub(2.5, 5.0, 'b'), sub(5.0, 9.0, 'c')]
+    audio.write_segmented_video('book.mp3', subtitles, 'book.mp4', 'Title', None, 'font', workers=3)
+
+    assert [(start, end) for start, end, _ in rendered] == [(0.0, 2.5), (2.5, 5.0), (5.0, 9.0)]
+    assert [texts for _, _, texts in rendered] == [[sub(0.0, 2.5, 'a')], [sub(0.0, 2.5, 'b')], [sub(0.0, 4.0, 'c')]]
+    [(command, segments)] = runs
+    assert [line.rsplit('/', 1)[-1] for line in segments.splitlines()] == [
+        "segment_000.mp4'", "segment_001.mp4'", "segment_002.mp4'"]
+    assert command[command.index('-c:v'):] == ['-c:v', 'copy', '-c:a', 'aac', '-t', '9.000', 'book.mp4']
@@ -0,0 +1,82 @@
+import shutil
+import subprocess
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('pydub')
+pytest.importorskip('moviepy.editor')
+pytestmark = pytest.mark.skipif(
+    not (shutil.which('ffmpeg') and (shutil.which('magick') or shutil.which('convert'))),
+    reason='ffmpeg and ImageMagick are required to render videos',
+)
+
+from pipeline_support import audio_processing  # noqa: E402
+
+SRT = """1
+00:00:00,500 --> 00:00:01,500
+First line of the sample subtitle.
+
+2
+00:00:02,000 --> 00:00:02,800
+Second line.
+"""
+
+
+def grab_frame(video_path, seconds):
+    raw = subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-ss', str(seconds), '-i', str(video_path),
+                          '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'],
+                         check=True, capture_output=True).stdout
+    return np.frombuffer(raw, dtype=np.uint8).reshape(1080, 1920, 3).astype(int)
+
+
+def text_rows(frame, top, bottom):
+    """Rows in [top, bottom) that differ noticeably from the background colour."""
+    region = frame[top:bottom]
+    differs = np.abs(region - np.array(audio_processing.BACKGROUND_COLOR)).sum(axis=2) > 90
+    return np.nonzero(differs.any(axis=1))[0] + top
+
+
+def video_duration(video_path):
+    out = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0',
+                          str(video_path)], check=True, capture_output=True, text=True).stdout
+    return float(out)
+
+
+@pytest.fixture
+def sample(tmp_path):
+    mp3_path = tmp_path / 'sample.mp3'
+    subprocess.run(['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-f', 'lavfi',
+                    '-i', 'sine=frequency=440:duration=3', str(mp3_path)], check=True)
+    srt_path = tmp_path / 'sample.srt'
+    srt_path.write_text(SRT, encoding='utf-8')
+    return mp3_path, srt_path
+
+
+@pytest.mark.parametrize('fast_renderer', ['ffmpeg', 'static'])
+def test_fast_renderers_match_moviepy(sample, tmp_path, fast_renderer):
+    mp3_path, srt_path = sample
+    outputs = {}
+    for renderer in ('moviepy', fast_renderer):
+        outputs[renderer] = tmp_path / f'{renderer}.mp4'
+        audio_processing.enhanced_mp3_to_mp4_with_subtitles(str(mp3_path), str(srt_path), None,
+                                                            str(outputs[renderer]), 'Sample Title',
+                                                            renderer=renderer)
+
+    assert video_duration(outputs[fast_renderer]) == pytest.approx(video_duration(outputs['moviepy']), abs=0.15)
+
+    for seconds, expect_subtitle in ((1.0, True), (1.75, False), (2.4, True)):
+        frames = {renderer: grab_frame(path, seconds) for renderer, path in outputs.items()}
+        for frame in frames.values():
+            # Same background colour in a corner that never holds text
+            assert np.abs(frame[1000:1070, 10:80] - np.array(audio_processing.BACKGROUND_COLOR)).max() < 12
+            # Title present in the top band
+            assert len(text_rows(frame, 0, 200)) > 0
+
+        caption_rows = {renderer: text_rows(frame, 300, 800) for renderer, frame in frames.items()}
+        if expect_subtitle:
+            centres = [rows.mean() for rows in caption_rows.values()]
+            assert all(len(rows) > 0 for rows in caption_rows.values())
+            assert abs(centres[0] - centres[1]) < 40
+        else:
+            assert all(len(rows) == 0 for rows in caption_rows.values())
@@ -0,0 +1,59 @@
+import random
+import re
+
+import pytest
+
+pytest.importorskip('bs4')
+pytest.importorskip('lxml')
+
+from pipeline_support import file_processing  # noqa: E402
+
+PIECES = ['<speak>', '</speak>', '<p>', '</p>', '<s>', '</s>', '<break time="1s"/>', '<![CDATA[c d]]>',
+          '<!-- note -->', '<?pi x?>', '&amp;', '&nbsp;', ' ', '\n', '\t', '  \n ', 'word', 'Ωmega', '<', '&',
+          '<sub alias="x">', '</sub>', '<?xml version="1.0"?>', '<lang xml:lang="la">', '</lang>']
+
+
+def legacy_clean_text(content):
+    clean_text = file_processing.soup_text(content)
+    clean_text = re.sub(r'\n\s*\n', '\n\n', clean_text)
+    clean_text = re.sub(r'(\n\s*){2,}', '\n\n', clean_text)
+    return clean_text.strip()
+
+
+def test_fast_extraction_matches_beautifulsoup():
+    for seed in range(3000):
+        rng = random.Random(seed)
+        content = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 30)))
+        if rng.random() < 0.2:
+            content *= 40
+        assert file_processing.ssml_text(content) == file_processing.soup_text(content), content
+        assert file_processing.clean_ssml_text(content) == legacy_clean_text(content), content
+
+
+def test_extraction_does_not_depend_on_where_text_is_split():
+    # Long runs reach the collector in several data calls, and bs4 feeds lxml 512 characters at a time
+    for offset in range(500, 530):
+        content = '<speak>' + 'x' * offset + ' ' * 40 + '&amp;' + 'word ' * 3000 + '</speak><p>' + ' \n ' * 300 + '</p>'
+        assert file_processing.ssml_text(content) == file_processing.soup_text(content)
+
+
+def test_process_files_writes_copies_and_clean_text(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    chunks = {
+        'book_chunk_2.txt': b'<speak><p>Second</p>\r\n\r\n<p>chunk</p></speak>',
+        'book_chunk_10.txt': '<speak>Tenth &amp; last</speak>'.encode('utf-8'),
+        'book_chunk_3.txt': b'',
+    }
+    for name, data in chunks.items():
+        (source / name).write_bytes(data)
+
+    output_dir = file_processing.process_files(1, 'Author', 'Title', str(tmp_path / 'out'), str(source), workers=2)
+
+    for name, data in chunks.items():
+        if data:
+            assert (tmp_path / 'out' / 'vol_1' / 'Author - Title' / 'SSML' / name).read_bytes() == data
+    with open(f"{output_dir}/Author - Title_2 (English).txt", encoding='utf-8') as f:
+        assert f.read() == 'Second\n\nchunk'
+    with open(f"{output_dir}/Author - Title_10 (English).txt", encoding='utf-8') as f:
+        assert f.read() == 'Tenth & last'
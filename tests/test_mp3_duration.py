@@ -0,0 +1,68 @@
+import os
+import struct
+
+import pytest
+
+from pipeline_support import mp3_duration
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono: Polly's default MP3 format
+HEADER = bytes([0xFF, 0xF3, 0x64, 0xC0])
+FRAME_LENGTH = 144
+SECONDS_PER_FRAME = 576 / 24000
+
+
+def frame(payload=b''):
+    return HEADER + payload.ljust(FRAME_LENGTH - 4, b'\x00')
+
+
+def id3v2_tag(body_size=20):
+    size = bytes([(body_size >> shift) & 0x7F for shift in (21, 14, 7, 0)])
+    return b'ID3\x03\x00\x00' + size + b'\xff' * body_size
+
+
+def test_constant_bitrate_duration_skips_id3_tags():
+    data = id3v2_tag() + frame() * 250 + b'TAG' + b'\x00' * 125
+    assert mp3_duration.mp3_duration_from_buffer(data) == pytest.approx(250 * SECONDS_PER_FRAME)
+
+
+def test_xing_header_with_lame_delay():
+    # Side info for MPEG-2 mono is 9 bytes, so the tag starts 13 bytes into the frame
+    lame = b'LAME3.100'.ljust(21, b'\x00') + bytes([576 >> 4, ((576 & 0x0F) << 4) | (100 >> 8), 100 & 0xFF])
+    info = b'\x00' * 9 + b'Info' + struct.pack('>II', 0x01, 1000) + lame
+    data = frame(info) + frame() * 20  # the frame count comes from the header, not the file size
+
+    assert mp3_duration.mp3_duration_from_buffer(data) == pytest.approx((1000 * 576 - 676) / 24000)
+
+
+def test_vbri_header():
+    vbri = b'\x00' * 32 + b'VBRI' + b'\x00' * 10 + struct.pack('>I', 400)
+    data = frame(vbri) + frame() * 3
+    assert mp3_duration.mp3_duration_from_buffer(data) == pytest.approx(400 * SECONDS_PER_FRAME)
+
+
+def test_rejects_data_without_frames():
+    with pytest.raises(ValueError):
+        mp3_duration.mp3_duration_from_buffer(b'\xff\x00' * 100)
+
+
+def test_directory_index_avoids_reopening_unchanged_files(tmp_path, monkeypatch):
+    (tmp_path / 'part1.mp3').write_bytes(frame() * 100)
+    (tmp_path / 'part2.mp3').write_bytes(frame() * 50)
+    names = ['part1.mp3', 'part2.mp3']
+
+    first = mp3_duration.directory_durations(str(tmp_path), names)
+    assert first['part1.mp3'] == pytest.approx(100 * SECONDS_PER_FRAME)
+    assert (tmp_path / mp3_duration.DURATION_INDEX_FILENAME).exists()
+
+    opened = []
+    real_duration = mp3_duration.mp3_duration
+    monkeypatch.setattr(mp3_duration, 'mp3_duration', lambda path: opened.append(path) or real_duration(path))
+
+    assert mp3_duration.directory_durations(str(tmp_path), names) == first
+    assert opened == []
+
+    (tmp_path / 'part2.mp3').write_bytes(frame() * 75)
+    os.utime(tmp_path / 'part2.mp3', ns=(1, 1))
+    updated = mp3_duration.directory_durations(str(tmp_path), names)
+    assert [os.path.basename(path) for path in opened] == ['part2.mp3']
+    assert updated['part2.mp3'] == pytest.approx(75 * SECONDS_PER_FRAME)
@@ -0,0 +1,119 @@
+import json
+import os
+import sys
+import types
+import importlib.util
+import importlib.machinery
+from pathlib import Path
+
+
+def load_batch_module(render):
+    sys.modules['pipeline_support.audio_processing'] = types.SimpleNamespace(enhanced_mp3_to_mp4_with_subtitles=render)
+    path = Path(__file__).resolve().parents[1] / 'pipeline_support' / 'mp4_batch.py'
+    loader = importlib.machinery.SourceFileLoader('mp4_batch_module', str(path))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    sys.modules.pop('pipeline_support.audio_processing')
+    return module
+
+
+def write_bundle(root, book):
+    components = root / book / 'mp4_components'
+    components.mkdir(parents=True)
+    for name in (f'{book}.mp3', f'{book}.srt', 'logo.png'):
+        (components / name).write_bytes(b'data')
+    info = {'mp3_file': f'{book}.mp3', 'srt_file': f'{book}.srt', 'logo_file': 'logo.png',
+            'output_path': str(root / 'videos' / f'{book}.mp4'), 'book_title': book, 'main_font': 'pt_serif'}
+    (components / 'mp4_info.json').write_text(json.dumps(info), encoding='utf-8')
+    return components
+
+
+def test_batch_renders_skips_current_and_reports_failures(tmp_path):
+    calls = []
+
+    def render(mp3_path, srt_path, logo_path, output_path, book_title, main_font='open_sans', renderer='moviepy'):
+        calls.append((book_title, main_font, renderer))
+        if book_title == 'broken':
+            raise RuntimeError('ffmpeg exploded')
+        Path(output_path).write_bytes(b'mp4')
+
+    batch = load_batch_module(render)
+    for book in ('alpha', 'beta', 'broken'):
+        write_bundle(tmp_path, book)
+    (tmp_path / 'videos').mkdir()
+
+    # beta was rendered after its inputs last changed
+    beta_output = tmp_path / 'videos' / 'beta.mp4'
+    beta_output.write_bytes(b'mp4')
+    newer = os.path.getmtime(tmp_path / 'beta' / 'mp4_components' / 'mp4_info.json') + 10
+    os.utime(beta_output, (newer, newer))
+
+    summary_path = batch.render_mp4_bundles(str(tmp_path), jobs=1, renderer='static')
+    summary = json.loads(Path(summary_path).read_text(encoding='utf-8'))
+
+    assert sorted(calls) == [('alpha', 'pt_serif', 'static'), ('broken', 'pt_serif', 'static')]
+    statuses = {book['book_title']: book['status'] for book in summary['books']}
+    assert statuses == {'alpha': 'rendered', 'beta': 'skipped', 'broken': 'failed'}
+    assert (summary['rendered'], summary['skipped'], summary['failed']) == (1, 1, 1)
+    broken = next(book for book in summary['books'] if book['book_title'] == 'broken')
+    assert 'ffmpeg exploded' in broken['error']
+    assert all('seconds' in book for book in summary['books'])
+
+    # A second run finds alpha current too; only the failed book is retried
+    calls.clear()
+    batch.render_mp4_bundles(str(tmp_path), jobs=1)
+    assert [call[0] for call in calls] == ['broken']
+
+
+def test_malformed_bundle_is_reported_without_stopping_the_batch(tmp_path):
+    calls = []
+
+    def render(mp3_path, srt_path, logo_path, output_path, book_title, main_font='open_sans', renderer='moviepy'):
+        calls.append(book_title)
+        Path(output_path).write_bytes(b'mp4')
+
+    batch = load_batch_module(render)
+    write_bundle(tmp_path, 'alpha')
+    (write_bundle(tmp_path, 'corrupt') / 'mp4_info.json').write_text('{"mp3_file": ', encoding='utf-8')
+    (tmp_path / 'videos').mkdir()
+
+    summary = json.loads(Path(batch.render_mp4_bundles(str(tmp_path), jobs=1)).read_text(encoding='utf-8'))
+
+    assert calls == ['alpha']
+    assert (summary['rendered'], summary['failed']) == (1, 1)
+    corrupt = next(book for book in summary['books'] if book['status'] == 'failed')
+    assert corrupt['info_path'].endswith(os.path.join('corrupt', 'mp4_components', 'mp4_info.json'))
+    assert 'JSONDecodeError' in corrupt['error']
+
+
+def test_bundle_with_no_inputs_on_disk_is_not_current(tmp_path):
+    batch = load_batch_module(None)
+    output = tmp_path / 'book.mp4'
+    output.write_bytes(b'mp4')
+    bundle = {'info_path': str(tmp_path / 'gone.json'), 'mp3_path': str(tmp_path / 'gone.mp3'),
+              'srt_path': str(tmp_path / 'gone.srt'), 'logo_path': None, 'output_path': str(output)}
+    assert batch.bundle_is_current(bundle) is False
+
+
+def test_stored_relative_output_path_is_found_by_the_batch(tmp_path, monkeypatch):
+    from tests.test_subtitle_index import load_audio_module
+
+    audio = load_audio_module()
+    book = tmp_path / 'book'
+    book.mkdir()
+    for name in ('book.mp3', 'book.srt', 'logo.png'):
+        (book / name).write_bytes(b'data')
+    monkeypatch.chdir(tmp_path)
+    audio.store_mp4_components(str(book / 'book.mp3'), str(book / 'book.srt'), str(book / 'logo.png'),
+                               os.path.join('videos', 'book.mp4'), 'Book', 'open_sans')
+
+    batch = load_batch_module(None)
+    bundle = batch.load_bundle(str(book / 'mp4_components' / 'mp4_info.json'))
+    assert bundle['output_path'] == str(tmp_path / 'videos' / 'book.mp4')
+
+    (tmp_path / 'videos').mkdir()
+    (tmp_path / 'videos' / 'book.mp4').write_bytes(b'mp4')
+    newer = os.path.getmtime(book / 'mp4_components' / 'mp4_info.json') + 10
+    os.utime(tmp_path / 'videos' / 'book.mp4', (newer, newer))
+    assert batch.bundle_is_current(bundle)
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pipeline_support import near_duplicates  # noqa: E402
+
+SENTENCES = [
+    "The abbot ordered that the brothers should rise before dawn for the night office.",
+    "Nobody may keep anything as his own, neither a book nor tablets nor a pen.",
+    "Idleness is the enemy of the soul, and so the brothers should be occupied with manual labour.",
+    "Let all guests who arrive be received as Christ, for he will say: I was a stranger.",
+]
+
+
+def write_book(path, chunks):
+    data = {'chunks': [{'chunk_number': number, 'cleaned_english_translation': f'<speak>{text}</speak>'}
+                       for number, text in enumerate(chunks, start=1)]}
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def test_clusters_near_duplicate_sentences_across_files(tmp_path):
+    write_book(tmp_path / 'a.json', [SENTENCES[0] + ' ' + SENTENCES[1], SENTENCES[2]])
+    # An OCR double page with one word changed, and an exact repeat
+    repeated = SENTENCES[2].replace('manual', 'hard manual')
+    write_book(tmp_path / 'b.json', [SENTENCES[3], repeated + ' ' + SENTENCES[1]])
+    (tmp_path / 'broken.json').write_text('{"chunks": [', encoding='utf-8')
+
+    clusters = near_duplicates.find_near_duplicates(str(tmp_path), ['a.json', 'b.json', 'broken.json'],
+                                                    threshold=0.6, workers=1)
+
+    found = sorted(sorted((location['file'], location['chunk_number']) for location in cluster)
+                   for cluster in clusters)
+    assert found == [[('a.json', 1), ('b.json', 2)], [('a.json', 2), ('b.json', 2)]]
+
+
+def test_lsh_scales_with_bucket_members_not_pairs():
+    rng = np.random.default_rng(0)
+    vocabulary = [f'w{i}' for i in range(5000)]
+    hashes, lengths = [], []
+    for _ in range(2000):
+        words = rng.choice(vocabulary, size=12)
+        hashes.extend(near_duplicates.word_hash(word) for word in words)
+        lengths.append(12)
+    # Sentence 2000 repeats sentence 0
+    hashes.extend(hashes[:12])
+    lengths.append(12)
+
+    signatures = near_duplicates.minhash_signatures(np.array(hashes, dtype=np.uint64), np.array(lengths))
+    assert near_duplicates.lsh_clusters(signatures) == [[0, 2000]]
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from pipeline_support.polly_scheduler import run_engine_queues
+
+
+class Throttled(Exception):
+    response = {'Error': {'Code': 'ThrottlingException'}}
+
+
+FAST_LIMITS = {
+    'generative': {'concurrency': 2, 'requests_per_second': None},
+    'long-form': {'concurrency': 1, 'requests_per_second': None},
+}
+
+
+def make_jobs(engines):
+    return [{'part_number': i, 'engine': engine} for i, engine in enumerate(engines, start=1)]
+
+
+def test_throttling_on_one_engine_does_not_stall_the_other():
+    jobs = make_jobs(['long-form', 'generative', 'generative', 'generative', 'long-form'])
+    finished = {}
+    throttled = set()
+    lock = threading.Lock()
+
+    def handler(job):
+        if job['engine'] == 'long-form' and job['part_number'] not in throttled:
+            throttled.add(job['part_number'])
+            raise Throttled()
+        with lock:
+            finished[job['part_number']] = time.monotonic()
+        return f"part{job['part_number']:03d}"
+
+    start = time.monotonic()
+    results = run_engine_queues(jobs, handler, FAST_LIMITS, backoff_seconds=0.3)
+
+    assert sorted(results) == [1, 2, 3, 4, 5]
+    assert results[5] == 'part005'
+    assert all(finished[p] - start < 0.2 for p in (2, 3, 4))
+    assert finished[1] - start >= 0.3
+
+
+def test_non_retryable_error_stops_queues():
+    jobs = make_jobs(['generative'] * 5)
+    calls = []
+
+    def handler(job):
+        calls.append(job['part_number'])
+        raise ValueError('bad chunk')
+
+    with pytest.raises(ValueError):
+        run_engine_queues(jobs, handler, {'generative': {'concurrency': 1}})
+    assert calls == [1]
@@ -0,0 +1,60 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pipeline_support import silence_alignment  # noqa: E402
+
+RATE = silence_alignment.SAMPLE_RATE
+
+
+def tone(seconds):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def test_detects_pauses_between_speech_only():
+    samples = np.concatenate([silence(0.3), tone(1.0), silence(0.5), tone(1.0),
+                              silence(0.1), tone(0.5), silence(0.4)])
+
+    pauses = silence_alignment.detect_pauses(silence_alignment.energy_envelope(samples))
+
+    # Leading/trailing silence and the 0.1 s gap are not sentence pauses
+    assert len(pauses) == 1
+    start, end = pauses[0]
+    assert start == pytest.approx(1.3, abs=0.03)
+    assert end == pytest.approx(1.8, abs=0.03)
+
+
+def test_snap_moves_boundaries_to_nearby_pauses():
+    subtitles = [
+        {'text': 'one', 'start': 10.0, 'end': 12.0},
+        {'text': 'two', 'start': 12.0, 'end': 15.0},
+        {'text': 'three', 'start': 15.0, 'end': 20.0},
+    ]
+    # Pauses relative to the chunk: one near each estimated boundary, one far away
+    pauses = [(2.4, 2.8), (7.8, 8.0)]
+
+    snapped = silence_alignment.snap_to_pauses(subtitles, pauses, 10.0, 20.0, max_shift=1.5)
+
+    assert snapped[0]['end'] == snapped[1]['start'] == pytest.approx(12.6)
+    # 17.9 is more than 1.5 s from 15.0, so that boundary keeps its estimate
+    assert snapped[1]['end'] == snapped[2]['start'] == 15.0
+    assert snapped[0]['start'] == 10.0 and snapped[2]['end'] == 20.0
+
+
+def test_snap_never_moves_a_boundary_past_the_following_subtitle():
+    subtitles = [
+        {'text': 'one', 'start': 0.0, 'end': 2.0},
+        {'text': 'two', 'start': 2.0, 'end': 2.3},
+        {'text': 'three', 'start': 2.3, 'end': 5.0},
+    ]
+    # The only pause lies beyond the short second subtitle
+    snapped = silence_alignment.snap_to_pauses(subtitles, [(3.0, 3.4)], 0.0, 5.0, max_shift=1.5)
+
+    assert snapped[0]['end'] == snapped[1]['start'] == 2.0
+    assert snapped[1]['end'] == snapped[2]['start'] == pytest.approx(3.2)
+    assert all(subtitle['end'] - subtitle['start'] >= 0.1 for subtitle in snapped)
@@ -1,24 +1,236 @@
+import io
+import json
 import sys
 import types
 import importlib.util
 import importlib.machinery
 from pathlib import Path
+import pytest
 
 
-def load_ssml_module():
-    sys.modules['boto3'] = types.SimpleNamespace(client=lambda *a, **k: None)
-    sys.modules['botocore.exceptions'] = types.SimpleNamespace(BotoCoreError=Exception, ClientError=Exception)
-    path = Path(__file__).resolve().parents[1] / 'pipeline_support' / 'ssml_processing.py'
-    loader = importlib.machinery.SourceFileLoader('ssml_module', str(path))
-    spec = importlib.util.spec_from_loader(loader.name, loader)
-    module = importlib.util.module_from_spec(spec)
-    loader.exec_module(module)
+class DummyMP3:
+    def __init__(self, fileobj):
+        self.info = types.SimpleNamespace(length=len(fileobj.read()) / 1000)
+
+
+class DummyPolly:
+    def __init__(self):
+        self.calls = []
+
+    def synthesize_speech(self, **kwargs):
+        self.calls.append(kwargs)
+        return {'AudioStream': io.BytesIO(b'x' * 1500)}
+
+
+def load_ssml_module(polly=None):
+    stubs = {
+        'boto3': types.SimpleNamespace(client=lambda *a, **k: polly),
+        'botocore.exceptions': types.SimpleNamespace(BotoCoreError=Exception, ClientError=Exception),
+        'mutagen.mp3': types.SimpleNamespace(MP3=DummyMP3),
+        'colorama': types.SimpleNamespace(init=lambda: None, Fore=types.SimpleNamespace(), Style=types.SimpleNamespace()),
+    }
+    # Modules that bind the stubs at import time are reloaded here and put back afterwards
+    bound = ['pipeline_support.synthesis_manifest', 'pipeline_support.ssml_validator']
+    saved = {name: sys.modules.get(name) for name in [*stubs, *bound]}
+    sys.modules.update(stubs)
+    for name in bound:
+        sys.modules.pop(name, None)
+    try:
+        path = Path(__file__).resolve().parents[1] / 'pipeline_support' / 'ssml_processing.py'
+        loader = importlib.machinery.SourceFileLoader('ssml_module', str(path))
+        spec = importlib.util.spec_from_loader(loader.name, loader)
+        module = importlib.util.module_from_spec(spec)
+        loader.exec_module(module)
+    finally:
+        for name, original in saved.items():
+            if original is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = original
     return module
 
 
+def write_book(directory, name, chunks):
+    data = {'chunks': [
+        {'chunk_number': i, 'original_latin': 'Lorem.', 'cleaned_english_translation': ssml}
+        for i, ssml in enumerate(chunks, start=1)
+    ]}
+    (directory / name).write_text(json.dumps(data), encoding='utf-8')
+
+
 def test_split_ssml_basic():
     ssml_mod = load_ssml_module()
     ssml = '<speak>Hello <break/>world <p>test</p></speak>'
     chunks = ssml_mod.split_ssml(ssml, max_chunk_size=30)
     assert len(chunks) == 2
     assert all(c.startswith('<speak>') and c.endswith('</speak>') for c in chunks)
+
+
+def test_process_ssml_writes_manifest(tmp_path):
+    ssml_mod = load_ssml_module(DummyPolly())
+    load_manifest = ssml_mod.load_manifest
+
+    input_dir = tmp_path / 'processed'
+    input_dir.mkdir()
+    write_book(input_dir, 'book_part_1.txt.json', ['<speak>One.</speak>', '<speak>Two.</speak>'])
+
+    output_dir = tmp_path / 'audio'
+    outputs = ssml_mod.process_ssml_from_json_files(str(input_dir), str(output_dir), 'Matthew')
+
+    manifest = load_manifest(str(output_dir))
+    assert len(outputs) == 2
+    entry = manifest[('book_part_1.txt.json', 2)]
+    assert entry['part_number'] == 2
+    assert entry['bytes'] == 1500
+    assert entry['duration'] == 1.5
+    assert (output_dir / entry['output_path']).exists()
+
+
+def test_invalid_chunk_fails_before_synthesis(tmp_path):
+    polly = DummyPolly()
+    ssml_mod = load_ssml_module(polly)
+
+    input_dir = tmp_path / 'processed'
+    input_dir.mkdir()
+    write_book(input_dir, 'book_part_1.txt.json', ['<speak>One.</speak>', '<speak><p>Two.</speak>'])
+
+    with pytest.raises(ssml_mod.SSMLProcessingError):
+        ssml_mod.process_ssml_from_json_files(str(input_dir), str(tmp_path / 'audio'), 'Matthew', validation_workers=1)
+    assert polly.calls == []
+
+
+def test_invalid_chunk_quarantined(tmp_path):
+    polly = DummyPolly()
+    ssml_mod = load_ssml_module(polly)
+
+    input_dir = tmp_path / 'processed'
+    input_dir.mkdir()
+    write_book(input_dir, 'book_part_1.txt.json', ['<speak><p>One.</speak>', '<speak>Two.</speak>'])
+
+    output_dir = tmp_path / 'audio'
+    outputs = ssml_mod.process_ssml_from_json_files(str(input_dir), str(output_dir), 'Matthew',
+                                                    on_invalid='quarantine', validation_workers=1)
+
+    assert [Path(p).name for p in outputs] == ['book_part002_Matthew.mp3']
+    assert (output_dir / 'quarantine' / 'book_part_1.txt_chunk_1.json').exists()
+    assert len(polly.calls) == 1
+
+
+def test_budget_stops_scheduling(tmp_path):
+    polly = DummyPolly()
+    ssml_mod = load_ssml_module(polly)
+
+    input_dir = tmp_path / 'processed'
+    input_dir.mkdir()
+    # 10 billed characters per chunk at the generative rate of $30 per 1M
+    write_book(input_dir, 'book_part_1.txt.json', ['<speak>0123456789</speak>'] * 3)
+
+    output_dir = tmp_path / 'audio'
+    outputs = ssml_mod.process_ssml_from_json_files(str(input_dir), str(output_dir), 'Matthew',
+                                                    budget_usd=0.00061)
+
+    assert len(outputs) == 2
+    assert len(polly.calls) == 2
+    report = json.loads(next(output_dir.glob('polly_usage_*.json')).read_text(encoding='utf-8'))
+    assert report['budget_exhausted'] is True
+    assert report['billed_characters'] == 20
+    assert report['by_voice_engine']['Matthew/generative']['chunks'] == 2
+    assert [row['status'] for row in report['chunks']] == ['synthesized', 'synthesized', 'over_budget']
+
+
+def test_reconciled_characters_keep_budget_hard(tmp_path):
+    class OvercountingPolly(DummyPolly):
+        def synthesize_speech(self, **kwargs):
+            return dict(super().synthesize_speech(**kwargs), RequestCharacters=15)
+
+    polly = OvercountingPolly()
+    ssml_mod = load_ssml_module(polly)
+
+    input_dir = tmp_path / 'processed'
+    input_dir.mkdir()
+    # Estimated at 10 characters each, so two chunks fit $0.00061; Polly bills 15 for the first
+    write_book(input_dir, 'book_part_1.txt.json', ['<speak>0123456789</speak>'] * 3)
+
+    output_dir = tmp_path / 'audio'
+    outputs = ssml_mod.process_ssml_from_json_files(
+        str(input_dir), str(output_dir), 'Matthew', budget_usd=0.00061,
+        engine_limits={'generative': {'concurrency': 1, 'requests_per_second': None}})
+
+    assert len(outputs) == 1
+    assert len(polly.calls) == 1
+    report = json.loads(next(output_dir.glob('polly_usage_*.json')).read_text(encoding='utf-8'))
+    assert report['billed_characters'] == 15
+    assert report['cost_usd'] <= 0.00061
+    assert [row['status'] for row in report['chunks']] == ['synthesized', 'over_budget', 'over_budget']
+
+
+def test_failed_save_still_counts_billed_request(tmp_path, monkeypatch):
+    ssml_mod = load_ssml_module(DummyPolly())
+
+    def broken_duration(audio_bytes):
+        raise RuntimeError('corrupt audio')
+
+    monkeypatch.setattr(ssml_mod, 'audio_duration', broken_duration)
+    input_dir = tmp_path / 'processed'
+    input_dir.mkdir()
+    write_book(input_dir, 'book_part_1.txt.json', ['<speak>0123456789</speak>'])
+
+    output_dir = tmp_path / 'audio'
+    with pytest.raises(ValueError, match='corrupt audio'):
+        ssml_mod.process_ssml_from_json_files(str(input_dir), str(output_dir), 'Matthew')
+
+    report = json.loads(next(output_dir.glob('polly_usage_*.json')).read_text(encoding='utf-8'))
+    assert [row['status'] for row in report['chunks']] == ['not_saved']
+    assert report['billed_characters'] == 10
+
+
+def test_synthesis_writes_book_layout(tmp_path):
+    ssml_mod = load_ssml_module(DummyPolly())
+
+    input_dir = tmp_path / 'processed'
+    input_dir.mkdir()
+    write_book(input_dir, 'alpha_part_1.txt.json', ['<speak>One.</speak>', '<speak>Two.</speak>'])
+    write_book(input_dir, 'beta_part_2.txt.json', ['<speak>Three.</speak>'])
+
+    output_dir = tmp_path / 'audio'
+    # Validation runs inline: the stubbed modules are not importable from a worker process
+    outputs = ssml_mod.process_ssml_from_json_files(str(input_dir), str(output_dir), 'Matthew', start_part=2,
+                                                    validation_workers=1)
+
+    assert [Path(p).relative_to(output_dir).as_posix() for p in outputs] == [
+        'alpha/alpha_part002_Matthew.mp3',
+        'beta/beta_part001_Matthew.mp3',
+    ]
+
+
+def test_reorder_part_numbers_resumes_after_interruption(tmp_path, monkeypatch):
+    ssml_mod = load_ssml_module()
+    append_manifest_entry, load_manifest = ssml_mod.append_manifest_entry, ssml_mod.load_manifest
+
+    book = tmp_path / 'book'
+    book.mkdir()
+    for part in (2, 3, 5):
+        (book / f'book_part{part:03d}_Ruth.mp3').write_bytes(str(part).encode())
+        append_manifest_entry(str(tmp_path), {'source_json': 'book_part_1.txt.json', 'chunk_number': part,
+                                              'output_path': f'book/book_part{part:03d}_Ruth.mp3'})
+
+    real_rename = ssml_mod.os.rename
+    calls = []
+
+    def failing_rename(src, dst):
+        calls.append(src)
+        if len(calls) == 4:
+            raise OSError('interrupted')
+        real_rename(src, dst)
+
+    monkeypatch.setattr(ssml_mod.os, 'rename', failing_rename)
+    with pytest.raises(OSError):
+        ssml_mod.reorder_part_numbers(str(tmp_path))
+    monkeypatch.setattr(ssml_mod.os, 'rename', real_rename)
+
+    ssml_mod.reorder_part_numbers(str(tmp_path))
+
+    assert sorted(p.name for p in book.iterdir()) == [f'book_part{i:03d}_Ruth.mp3' for i in (1, 2, 3)]
+    assert [(book / f'book_part{i:03d}_Ruth.mp3').read_bytes() for i in (1, 2, 3)] == [b'2', b'3', b'5']
+    assert load_manifest(str(tmp_path))[('book_part_1.txt.json', 5)]['output_path'] == 'book/book_part003_Ruth.mp3'
+    assert not (tmp_path / ssml_mod.RENUMBER_JOURNAL).exists()
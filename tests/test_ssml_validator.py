@@ -0,0 +1,121 @@
+import json
+import os
+import random
+import sys
+import time
+import types
+import importlib.util
+import importlib.machinery
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_validator_module():
+    sys.modules['colorama'] = types.SimpleNamespace(init=lambda: None, Fore=types.SimpleNamespace(),
+                                                    Style=types.SimpleNamespace())
+    path = ROOT / 'pipeline_support' / 'ssml_validator.py'
+    loader = importlib.machinery.SourceFileLoader('ssml_validator_module', str(path))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def legacy_results(validator, data):
+    ssml_list = validator.extract_clean_english_ssml(data)
+    return {
+        "English Word": validator.test_english_word(ssml_list),
+        "Punctuation": validator.test_punctuation(ssml_list),
+        "Speak Tags": validator.test_speak_tags(ssml_list),
+        "Non-standard Characters": validator.test_non_standard_characters_outside_tags(ssml_list),
+        "Translation Length": validator.test_translation_length(data),
+        "Malformed Closing Tags": validator.test_malformed_closing_tags(data),
+        "Misplaced Closing Tags": validator.test_misplaced_closing_tags(ssml_list),
+        "Random Single Letters": validator.test_random_single_letters_outside_tags(ssml_list),
+        "Balanced Tags": validator.test_balanced_tags(ssml_list),
+        "Nested Tags": validator.test_nested_tags(ssml_list),
+    }
+
+
+PIECES = ['<speak>', '</speak>', '<p>', '</p>', '<s>', '</s>', '<lang xml:lang="en-US">', '</lang>', '<lang>',
+          '<phoneme>', '</phoneme>', '<break time="1s"/>', '<sub alias="x">', '</sub>', '< sub a>', '</ sub >',
+          '</p.>', '</w ,>', '<w>', '</w>', '<', '>', '/', ' ', ' ', '\n', '.', ',', ';', '(', ')', '!', '?',
+          'English', 'ENGLISH', 'Engliſh', 'b', 'x', 'A', 'I', 'word', 'two-part', 'x-', '-', 'é', '—', 'sub',
+          '<<p>', '<x <s>']
+
+
+def test_one_pass_engine_matches_individual_checks():
+    validator = load_validator_module()
+    rng = random.Random(7)
+    for _ in range(300):
+        chunks = []
+        for _ in range(rng.randint(1, 4)):
+            english = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+            if rng.random() < 0.5:
+                english = '<speak>' + english + '</speak>'
+            latin = ' '.join(rng.choice(['verbum', 'et', 'in', 'x', 'sub-', '-que', '--']) for _ in range(rng.randint(0, 12)))
+            chunks.append({'cleaned_english_translation': english, 'original_latin': latin})
+        data = {'chunks': chunks}
+
+        checks = [check() for check in validator.ALL_CHECKS]
+        assert validator.run_checks(data, checks) == legacy_results(validator, data)
+
+
+def test_run_tests_on_file_reports_every_check(tmp_path):
+    validator = load_validator_module()
+    path = tmp_path / 'book.json'
+    path.write_text('{"chunks": [{"original_latin": "Verbum caro factum est.", '
+                    '"cleaned_english_translation": "<speak><p>The Word <p>was made</p> flesh</speak>"}]}',
+                    encoding='utf-8')
+
+    results = validator.run_tests_on_file(str(path))
+
+    assert list(results) == [check.name for check in validator.ALL_CHECKS]
+    assert results["Nested Tags"][0][1].startswith("Nested <p> tag detected.")
+    assert (0, "Unmatched opening tag: <p>") in results["Balanced Tags"]
+
+    ssml_list = ["<speak>ok</speak>", "<speak><s>no</speak>", "<speak></p.></speak>"]
+    expected = {}
+    data = {'chunks': [{'cleaned_english_translation': ssml} for ssml in ssml_list]}
+    for test_results in (validator.test_speak_tags(ssml_list), validator.test_balanced_tags(ssml_list),
+                         validator.test_nested_tags(ssml_list), validator.test_malformed_closing_tags(data)):
+        for chunk_index, message in test_results:
+            expected.setdefault(chunk_index, []).append(message)
+    assert validator.validate_ssml_for_synthesis(ssml_list) == expected
+    assert set(expected) == {1, 2}
+
+
+def test_cli_streams_jsonl_and_reuses_cached_results(tmp_path, capsys):
+    validator = load_validator_module()
+    books = tmp_path / 'books'
+    (books / 'nested').mkdir(parents=True)
+    good = {'chunks': [{'original_latin': 'Verbum caro factum est.',
+                        'cleaned_english_translation': '<speak>The Word was made flesh.</speak>'}]}
+    bad = {'chunks': [{'original_latin': 'Verbum caro factum est.',
+                       'cleaned_english_translation': '<speak><p>The Word was made flesh.</speak>'}]}
+    (books / 'good.json').write_text(json.dumps(good), encoding='utf-8')
+    (books / 'nested' / 'bad.json').write_text(json.dumps(bad), encoding='utf-8')
+    (books / 'nested' / 'broken.json').write_text('{"chunks": [', encoding='utf-8')
+    output = tmp_path / 'results.jsonl'
+    argv = [str(books), '--workers', '1', '--output', str(output), '--cache']
+
+    assert validator.main(argv) == 1
+    records = {record['file']: record for record in map(json.loads, output.read_text(encoding='utf-8').splitlines())}
+    assert records['good.json']['status'] == 'passed'
+    assert records[os.path.join('nested', 'bad.json')]['status'] == 'failed'
+    assert 'Balanced Tags' in records[os.path.join('nested', 'bad.json')]['findings']
+    assert records[os.path.join('nested', 'broken.json')]['status'] == 'error'
+    assert (books / validator.VALIDATION_CACHE_FILENAME).exists()
+
+    (books / 'nested' / 'bad.json').write_text(json.dumps(good), encoding='utf-8')
+    assert validator.main(argv) == 1
+    records = {record['file']: record for record in map(json.loads, output.read_text(encoding='utf-8').splitlines())}
+    assert records['good.json'].get('cached') is True
+    assert records[os.path.join('nested', 'bad.json')].get('cached') is None
+    assert records[os.path.join('nested', 'bad.json')]['status'] == 'passed'
+    assert 'from cache' in capsys.readouterr().err
+
+    future = str(time.time() + 3600)
+    assert validator.main([str(books), '--workers', '1', '--output', str(output), '--changed-since', future]) == 0
+    assert output.read_text(encoding='utf-8') == ''
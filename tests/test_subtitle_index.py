@@ -0,0 +1,95 @@
+import re
+import sys
+import types
+import importlib.util
+import importlib.machinery
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_audio_module():
+    class VideoClip:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    editor = types.SimpleNamespace(AudioFileClip=None, ColorClip=None, CompositeVideoClip=None,
+                                   TextClip=None, ImageClip=None, VideoClip=VideoClip)
+    stubs = {
+        'numpy': types.SimpleNamespace(),
+        'pydub': types.SimpleNamespace(AudioSegment=None),
+        'mutagen.mp4': types.SimpleNamespace(MP4=None, MP4Cover=None),
+        'mutagen.id3': types.SimpleNamespace(ID3=None, TIT2=None, TPE1=None, TALB=None, TDRC=None,
+                                             TCON=None, COMM=None, APIC=None, error=Exception),
+        'mutagen.mp3': types.SimpleNamespace(MP3=None),
+        'moviepy.editor': editor,
+        'moviepy.config': types.SimpleNamespace(change_settings=lambda settings: None),
+        'PIL': types.SimpleNamespace(Image=None, ImageDraw=None, ImageFont=None),
+    }
+    saved = {name: sys.modules.get(name) for name in stubs}
+    sys.modules.update(stubs)
+    try:
+        path = ROOT / 'pipeline_support' / 'audio_processing.py'
+        loader = importlib.machinery.SourceFileLoader('audio_module', str(path))
+        spec = importlib.util.spec_from_loader(loader.name, loader)
+        module = importlib.util.module_from_spec(spec)
+        loader.exec_module(module)
+    finally:
+        for name, original in saved.items():
+            if original is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = original
+    return module
+
+
+def legacy_parse_srt(srt_file, time_to_seconds):
+    """The read()/re.split parser that SubtitleIndex replaced."""
+    content = Path(srt_file).read_text(encoding='utf-8')
+    subtitles = []
+    for block in re.split(r'\n\s*\n', content.strip()):
+        parts = block.split('\n', 2)
+        if len(parts) < 3:
+            continue
+        time_match = re.match(r'(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})', parts[1])
+        if not time_match:
+            continue
+        start_time, end_time = time_match.groups()
+        subtitles.append({'index': int(parts[0]), 'start': time_to_seconds(start_time),
+                          'end': time_to_seconds(end_time), 'text': parts[2].strip()})
+    return subtitles
+
+
+@pytest.mark.parametrize('srt_name', sorted(p.name for p in (ROOT / 'subtitles').glob('*.srt')))
+def test_streaming_parser_matches_legacy(srt_name):
+    audio = load_audio_module()
+    srt_path = ROOT / 'subtitles' / srt_name
+    assert list(audio.parse_srt(str(srt_path))) == legacy_parse_srt(srt_path, audio.time_to_seconds)
+
+
+def test_parser_skips_malformed_blocks_and_sorts(tmp_path):
+    audio = load_audio_module()
+    srt_path = tmp_path / 'messy.srt'
+    srt_path.write_text("2\n00:00:05,000 --> 00:00:06,000\nSecond\nline two\n\n   \n\n"
+                        "1\n00:00:01,000 --> 00:00:02,500\nFirst\n\n"
+                        "3\nnot a time\nBroken\n\n"
+                        "4\n00:00:09,000 --> 00:00:10,000\n", encoding='utf-8')
+
+    index = audio.parse_srt(str(srt_path))
+    assert [sub['index'] for sub in index] == [1, 2]
+    assert index[1]['text'] == 'Second\nline two'
+
+
+def test_lookup_finds_active_subtitle():
+    audio = load_audio_module()
+    index = audio.SubtitleIndex.from_subtitles([
+        {'start': 3.0, 'end': 4.0, 'text': 'b'},
+        {'start': 0.5, 'end': 1.5, 'text': 'a'},
+    ])
+
+    assert [index.text_at(t) for t in (0.0, 0.5, 1.49, 1.5, 2.0, 3.5, 4.0)] == \
+        [None, 'a', 'a', None, None, 'b', None]
+    assert index.duration == 4.0
+    assert len(index) == 2
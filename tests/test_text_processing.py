@@ -0,0 +1,77 @@
+import os
+
+from pipeline_support.text_processing import (process_files_in_directory, remove_notes, remove_square_brackets,
+                                               strip_bracketed)
+
+
+def test_remove_notes_handles_any_nesting_depth():
+    text = 'Before [Note: a [b [c [d [e]]]] f] after'
+    assert remove_notes(text) == 'Before  after'
+    assert remove_notes('A [note: lower case] B [1] C') == 'A  B [1] C'
+    assert remove_notes('<p>[Note: only a note]</p><br> Text') == 'Text'
+
+
+def test_unmatched_brackets_are_kept():
+    assert remove_notes('Open [Note: never closed') == 'Open [Note: never closed'
+    assert remove_square_brackets('a] [b [c] d') == 'a] [b  d'
+    assert remove_square_brackets('[x [y] z] w') == ' w'
+    assert remove_square_brackets('[' * 50000) == '[' * 50000
+
+
+def test_streamed_pieces_match_whole_text():
+    text = 'One [Note: two [3]] four [No[5]te: six] seven [8 nine'
+    pieces = [text[i:i + 3] for i in range(0, len(text), 3)]
+    for notes_only in (True, False):
+        assert ''.join(strip_bracketed(pieces, notes_only)) == ''.join(strip_bracketed([text], notes_only))
+    assert ''.join(strip_bracketed(pieces, notes_only=True)) == 'One  four [No[5]te: six] seven [8 nine'
+
+
+def test_directory_processing_reports_and_skips_current_outputs(tmp_path):
+    source = tmp_path / 'source'
+    output = tmp_path / 'output'
+    source.mkdir()
+    (source / 'book.txt').write_text('<h4><center>ONE</center></h4>PROLOGUE\nText [Note: x] here.'
+                                     '<h4><center>TWO</center></h4>More [1] text.', encoding='utf-8')
+    (source / 'other.txt').write_text('Single section', encoding='utf-8')
+    (source / 'broken.txt').write_bytes(b'\xff\xfe not utf-8')
+
+    summary = process_files_in_directory(str(source), str(output), workers=1)
+
+    assert (summary['processed'], summary['skipped'], summary['failed']) == (2, 0, 1)
+    assert summary['sections'] == 3
+    assert sorted(p.name for p in output.iterdir()) == ['book_part_1.txt', 'book_part_2.txt', 'other_part_1.txt']
+    assert (output / 'book_part_1.txt').read_text(encoding='utf-8') == 'ONEPROLOGUE\nText  here.'
+    assert summary['bytes'] == sum(p.stat().st_size for p in output.iterdir())
+    assert 'UnicodeDecodeError' in summary['errors']['broken.txt']
+    book = next(result for result in summary['files'] if result['file'] == 'book.txt')
+    assert book['titles'] == {1: ['ONEPROLOGUE']} and book['seconds'] >= 0
+
+    summary = process_files_in_directory(str(source), str(output), workers=2)
+    assert (summary['processed'], summary['skipped'], summary['failed']) == (0, 2, 1)
+    assert summary['sections'] == 0
+
+    assert process_files_in_directory(str(source), str(output), workers=2, force=True)['processed'] == 2
+
+
+def test_rewritten_file_leaves_exactly_its_new_parts(tmp_path):
+    source = tmp_path / 'source'
+    output = tmp_path / 'output'
+    source.mkdir()
+    book = source / 'book.txt'
+    book.write_text('<h4><center>A</center></h4>one<h4><center>B</center></h4>two<h4><center>C</center></h4>three',
+                    encoding='utf-8')
+    process_files_in_directory(str(source), str(output), workers=1)
+    assert sorted(p.name for p in output.iterdir()) == ['book_part_1.txt', 'book_part_2.txt', 'book_part_3.txt']
+
+    book.write_text('<h4><center>A</center></h4>one<h4><center>B</center></h4>two', encoding='utf-8')
+    later = (output / 'book_part_1.txt').stat().st_mtime + 10
+    os.utime(book, (later, later))
+    assert process_files_in_directory(str(source), str(output), workers=1)['processed'] == 1
+    assert sorted(p.name for p in output.iterdir()) == ['book_part_1.txt', 'book_part_2.txt']
+
+    # A missing part is not a complete, current output even though the rest are newer
+    for part in output.iterdir():
+        os.utime(part, (later + 10, later + 10))
+    (output / 'book_part_1.txt').unlink()
+    assert process_files_in_directory(str(source), str(output), workers=1)['processed'] == 1
+    assert sorted(p.name for p in output.iterdir()) == ['book_part_1.txt', 'book_part_2.txt']
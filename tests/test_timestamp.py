@@ -0,0 +1,389 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import types
+import importlib.util
+import importlib.machinery
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_timestamp_module():
+    class Blueprint:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def route(self, *args, **kwargs):
+            return lambda func: func
+
+    flask = types.SimpleNamespace(Blueprint=Blueprint, render_template=None, request=None, send_file=None,
+                                  current_app=None, flash=None, Response=None)
+    stubs = {
+        'flask': flask,
+        'werkzeug.utils': types.SimpleNamespace(secure_filename=lambda name: name),
+        'numpy': types.SimpleNamespace(ndarray=object),
+        'mutagen.mp3': sys.modules.get('mutagen.mp3') or types.SimpleNamespace(MP3=None),
+    }
+    saved = {name: sys.modules.get(name) for name in stubs}
+    sys.modules.update(stubs)
+    sys.modules.pop('pipeline_support.silence_alignment', None)
+    try:
+        path = ROOT / 'textract_ssml_processor' / 'timestamp.py'
+        loader = importlib.machinery.SourceFileLoader('timestamp_module', str(path))
+        spec = importlib.util.spec_from_loader(loader.name, loader)
+        module = importlib.util.module_from_spec(spec)
+        loader.exec_module(module)
+    finally:
+        sys.modules.pop('pipeline_support.silence_alignment', None)
+        for name, original in saved.items():
+            if original is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = original
+    return module
+
+
+def write_project(root, name, chunks, durations):
+    ssml_dir = root / name / 'SSML'
+    audio_dir = root / name / 'Audio'
+    ssml_dir.mkdir(parents=True)
+    audio_dir.mkdir(parents=True)
+    (ssml_dir / 'book.json').write_text(json.dumps({'chunks': chunks}), encoding='utf-8')
+    with open(audio_dir / 'synthesis_manifest.jsonl', 'w', encoding='utf-8') as f:
+        for number, duration in enumerate(durations, start=1):
+            f.write(json.dumps({'source_json': 'book.json', 'chunk_number': number, 'duration': duration,
+                                'output_path': f'book/book_part{number:03d}_Matthew.mp3'}) + '\n')
+
+
+def test_timestamp_project_reports_each_project_independently(tmp_path):
+    timestamp = load_timestamp_module()
+    chunks = [
+        {'chunk_number': 1, 'cleaned_english_translation': '<speak>First sentence.</speak>',
+         'original_latin': 'Prima sententia.'},
+        {'chunk_number': 2, 'cleaned_english_translation': '<speak>Second one.</speak>',
+         'original_latin': 'Secunda.'},
+    ]
+    write_project(tmp_path, 'good', chunks, [2.5, 1.5])
+    write_project(tmp_path, 'broken', [{'chunk_number': 1}], [1.0])
+    (tmp_path / 'empty').mkdir()
+
+    good = timestamp.timestamp_project(str(tmp_path), 'good')
+    assert good['status'] == 'completed'
+    assert good['total_duration'] == '00:00:04,000'
+    assert good['english_srt_original'].startswith('1\n00:00:00,000 --> 00:00:02,500\nFirst sentence.\n')
+    assert (tmp_path / 'good' / 'subtitles' / 'latin_shorter.srt').exists()
+
+    broken = timestamp.timestamp_project(str(tmp_path), 'broken')
+    assert broken['status'] == 'failed'
+    assert 'KeyError' in broken['error']
+
+    empty = timestamp.timestamp_project(str(tmp_path), 'empty')
+    assert empty['status'] == 'skipped'
+
+
+def test_write_srt_files_matches_per_variant_generation(tmp_path):
+    timestamp = load_timestamp_module()
+    all_chunks = []
+    for i in range(40):
+        all_chunks.append({
+            'cleaned_english_translation': f'<speak><p>Sentence {i} is here. And (a note.) follows!</p>\n'
+                                           f'<break time="1s"/> Another line {i}?</speak>',
+            'original_latin': f'Sententia {i} hic est. Et (nota. alia) sequitur. ' * 3,
+            'start_time': i * 7.25,
+            'end_time': (i + 1) * 7.25,
+        })
+
+    previews = timestamp.write_srt_files(all_chunks, str(tmp_path), preview_chars=300)
+
+    for language, version in timestamp.SRT_VARIANTS:
+        expected = timestamp.generate_srt_content(all_chunks, language, use_shorter_subtitles=version == 'shorter')
+        written = (tmp_path / f'{language}_{version}.srt').read_text(encoding='utf-8')
+        assert written == expected
+        assert previews[f'{language}_srt_{version}'] == expected[:300]
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def baseline_srt_content(timestamp, all_chunks, language, use_shorter_subtitles):
+    """The SRT generator before incremental regeneration: every chunk is split at its absolute times."""
+    blocks = []
+    for chunk in all_chunks:
+        text = timestamp.clean_text(chunk['cleaned_english_translation'] if language == 'english' else chunk['original_latin'])
+        if not use_shorter_subtitles:
+            subtitles = [{'text': text, 'start': chunk['start_time'], 'end': chunk['end_time']}]
+        elif language == 'english':
+            subtitles = timestamp.split_into_subtitles(text, chunk['start_time'], chunk['end_time'])
+        else:
+            subtitles = timestamp.split_latin_subtitles(text, chunk['start_time'], chunk['end_time'])
+        for subtitle in subtitles:
+            blocks.append(timestamp.srt_block(len(blocks) + 1, subtitle))
+    return ''.join(blocks)
+
+
+def test_full_run_matches_baseline_generator_exactly(tmp_path):
+    timestamp = load_timestamp_module()
+    rng = random.Random(7)
+    words = ['Lorem', 'ipsum', 'dolor', 'sit', 'amet.', 'Quid?', 'Ecce!', '(nota bene.)', 'consectetur', 'adipiscing.']
+    for book in range(60):
+        all_chunks, cumulative_time = [], 0.0
+        for _ in range(rng.randint(1, 12)):
+            duration = rng.uniform(0.5, 45.0)
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 80)))
+            all_chunks.append({'cleaned_english_translation': f'<speak>{text}</speak>', 'original_latin': text,
+                               'start_time': cumulative_time, 'end_time': cumulative_time + duration})
+            cumulative_time += duration
+
+        output_dir = tmp_path / str(book)
+        timestamp.write_srt_files(all_chunks, str(output_dir))
+        for language, version in timestamp.SRT_VARIANTS:
+            expected = baseline_srt_content(timestamp, all_chunks, language, version == 'shorter')
+            assert (output_dir / f'{language}_{version}.srt').read_text(encoding='utf-8') == expected
+            assert timestamp.generate_srt_content(all_chunks, language, version == 'shorter') == expected
+
+
+def legacy_split_english(text):
+    result, current, in_block, block_char = [], "", False, None
+    for char in text:
+        current += char
+        if char in "([\"":
+            in_block, block_char = True, char
+        elif (char == ")" and block_char == "(") or (char == "]" and block_char == "[") or \
+             (char == "\"" and block_char == "\""):
+            in_block, block_char = False, None
+        elif char in ".!?" and not in_block and len(current.strip()) > 0:
+            result.append(current.strip())
+            current = ""
+    if current.strip():
+        result.append(current.strip())
+    return result
+
+
+def legacy_split_latin(text):
+    result, current, level = [], "", 0
+    for char in text:
+        current += char
+        if char == '(':
+            level += 1
+        elif char == ')':
+            level -= 1
+        elif char == '.' and level == 0 and len(current.strip()) > 0:
+            result.append(current.strip())
+            current = ""
+    if current.strip():
+        result.append(current.strip())
+    return result
+
+
+def legacy_split_long(sentence, max_chars):
+    chunks, current = [], ""
+    for word in sentence.split():
+        if len(current) + len(word) + 1 <= max_chars:
+            current += (" " if current else "") + word
+        else:
+            if current:
+                chunks.append(current)
+            current = word
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def test_sentence_splitters_match_character_loops():
+    timestamp = load_timestamp_module()
+    rng = random.Random(42)
+    alphabet = ['a', 'b', ' ', ' ', '\n', '.', '!', '?', '(', ')', '[', ']', '"', 'xyzzy', ' ']
+    for _ in range(2000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert timestamp.split_english_sentences(text) == legacy_split_english(text)
+        assert timestamp.split_latin_sentences(text) == legacy_split_latin(text)
+        max_chars = rng.randint(1, 12)
+        assert timestamp.split_long_sentence(text, max_chars) == legacy_split_long(text, max_chars)
+
+
+def parse_srt_blocks(content):
+    blocks = []
+    for block in content.strip().split('\n\n'):
+        _, times, text = block.split('\n', 2)
+        start, end = (srt_seconds(t) for t in times.split(' --> '))
+        blocks.append({'start': start, 'end': end, 'text': text})
+    return blocks
+
+
+def srt_seconds(value):
+    hours, minutes, rest = value.split(':')
+    seconds, millis = rest.split(',')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+
+@pytest.mark.parametrize('language', ['english', 'latin'])
+def test_shorter_subtitles_match_golden_files(language):
+    timestamp = load_timestamp_module()
+    originals = parse_srt_blocks((ROOT / 'subtitles' / f'{language}_original.srt').read_text(encoding='utf-8'))
+    key = 'cleaned_english_translation' if language == 'english' else 'original_latin'
+    # Each original subtitle is one whole chunk of the book
+    all_chunks = [{key: block['text'], 'start_time': block['start'], 'end_time': block['end']} for block in originals]
+
+    generated = timestamp.generate_srt_content(all_chunks, language, use_shorter_subtitles=True)
+    # tests/golden holds the baseline generator's output for these chunk times, which are truncated to milliseconds
+    assert generated == (ROOT / 'tests' / 'golden' / f'{language}_shorter.srt').read_text(encoding='utf-8')
+    expected = parse_srt_blocks((ROOT / 'subtitles' / f'{language}_shorter.srt').read_text(encoding='utf-8'))
+    assert [block['text'] for block in parse_srt_blocks(generated)] == [block['text'] for block in expected]
+
+
+def test_incremental_regeneration_only_resplits_edited_chunks(tmp_path, monkeypatch):
+    timestamp = load_timestamp_module()
+    chunks = [
+        {'chunk_number': n, 'cleaned_english_translation': f'<speak>Chunk {n} begins. It ends here.</speak>',
+         'original_latin': f'Pars {n} incipit. Hic finit.'}
+        for n in range(1, 6)
+    ]
+    write_project(tmp_path, 'book', chunks, [3.0] * 5)
+    subtitles = tmp_path / 'book' / 'subtitles'
+    timestamp.timestamp_project(str(tmp_path), 'book')
+
+    chunks[2]['cleaned_english_translation'] = '<speak>An edited chunk. With three. Sentences now.</speak>'
+    (tmp_path / 'book' / 'SSML' / 'book.json').write_text(json.dumps({'chunks': chunks}), encoding='utf-8')
+
+    resplit = []
+    real_chunk_subtitles = timestamp.chunk_subtitles
+    monkeypatch.setattr(timestamp, 'chunk_subtitles',
+                        lambda chunk, *args: resplit.append(chunk['chunk_number']) or real_chunk_subtitles(chunk, *args))
+    result = timestamp.timestamp_project(str(tmp_path), 'book', incremental=True)
+
+    assert result['regenerated_chunks'] == 1
+    assert set(resplit) == {3}
+    incremental = {path.name: path.read_text(encoding='utf-8') for path in subtitles.glob('*.srt')}
+
+    timestamp.timestamp_project(str(tmp_path), 'book')
+    assert {path.name: path.read_text(encoding='utf-8') for path in subtitles.glob('*.srt')} == incremental
+    assert 'An edited chunk.' in incremental['english_original.srt']
+
+
+def test_longer_first_chunk_only_redecodes_that_chunk(tmp_path, monkeypatch):
+    timestamp = load_timestamp_module()
+    chunks = [
+        {'chunk_number': n, 'cleaned_english_translation': f'<speak>Chunk {n} begins with a first sentence that is long. '
+                                                           f'Then it ends here after a pause.</speak>',
+         'original_latin': f'Pars {n} incipit. Hic finit.'}
+        for n in range(1, 6)
+    ]
+    write_project(tmp_path, 'book', chunks, [3.0] * 5)
+    subtitles = tmp_path / 'book' / 'subtitles'
+    decoded = []
+    monkeypatch.setattr(timestamp, 'find_pauses_for_files',
+                        lambda paths: decoded.extend(paths) or {path: [(1.5, 1.9)] for path in paths})
+    timestamp.timestamp_project(str(tmp_path), 'book', align_to_silence=True)
+    assert len(decoded) == 5
+
+    # Re-synthesised chunk 1 is a second longer, so every later chunk starts a second later
+    chunks[0]['cleaned_english_translation'] = '<speak>Chunk 1 was edited. It is longer now.</speak>'
+    (tmp_path / 'book' / 'SSML' / 'book.json').write_text(json.dumps({'chunks': chunks}), encoding='utf-8')
+    with open(tmp_path / 'book' / 'Audio' / 'synthesis_manifest.jsonl', 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'source_json': 'book.json', 'chunk_number': 1, 'duration': 4.0,
+                            'output_path': 'book/book_part001_Matthew.mp3'}) + '\n')
+
+    decoded.clear()
+    result = timestamp.timestamp_project(str(tmp_path), 'book', align_to_silence=True, incremental=True)
+
+    assert result['regenerated_chunks'] == 1
+    assert [Path(path).name for path in decoded] == ['book_part001_Matthew.mp3']
+    incremental = {path.name: path.read_text(encoding='utf-8') for path in subtitles.glob('*.srt')}
+    assert '00:00:04,000 --> 00:00:07,000\nChunk 2 begins' in incremental['english_original.srt']
+    assert '00:00:04,000 --> 00:00:05,700\nChunk 2 begins' in incremental['english_shorter.srt']
+
+    timestamp.timestamp_project(str(tmp_path), 'book', align_to_silence=True)
+    assert {path.name: path.read_text(encoding='utf-8') for path in subtitles.glob('*.srt')} == incremental
+
+
+def test_srt_downloads_use_fresh_compressed_copies(tmp_path):
+    timestamp = load_timestamp_module()
+    all_chunks = [{'cleaned_english_translation': 'One. Two.', 'original_latin': 'Unus. Duo.',
+                   'start_time': 0.0, 'end_time': 4.0}]
+    timestamp.write_srt_files(all_chunks, str(tmp_path))
+    srt = tmp_path / 'english_original.srt'
+
+    assert gzip.decompress((tmp_path / 'english_original.srt.gz').read_bytes()) == srt.read_bytes()
+    assert timestamp.choose_srt_encoding(str(srt), [('gzip', 1.0)]) == (str(srt) + '.gz', 'gzip')
+    assert timestamp.choose_srt_encoding(str(srt), [('br', 1.0)]) == (str(srt), None)
+    assert timestamp.choose_srt_encoding(str(srt), [('gzip', 0)]) == (str(srt), None)
+
+    etag = timestamp.file_etag(str(srt))
+    assert etag == hashlib.sha256(srt.read_bytes()).hexdigest()
+
+    # A hand-edited SRT is served as is until the copies are rewritten
+    srt.write_text('1\n00:00:00,000 --> 00:00:01,000\nEdited\n\n', encoding='utf-8')
+    os.utime(srt, ns=(2 ** 62, 2 ** 62))
+    assert timestamp.choose_srt_encoding(str(srt), [('gzip', 1.0)]) == (str(srt), None)
+    assert timestamp.file_etag(str(srt)) != etag
+
+
+def test_manifest_warns_about_chunks_edited_after_synthesis(tmp_path, capsys):
+    timestamp = load_timestamp_module()
+    chunks = [{'chunk_number': n, 'cleaned_english_translation': f'<speak>Chunk {n}.</speak>'} for n in (1, 2, 4)]
+    (tmp_path / 'book.json').write_text(json.dumps({'chunks': chunks}), encoding='utf-8')
+    manifest = {
+        ('book.json', 1): {'duration': 2.0, 'output_path': 'part001.mp3',
+                           'ssml_sha256': hashlib.sha256(b'<speak>Chunk 1.</speak>').hexdigest()},
+        ('book.json', 2): {'duration': 3.0, 'output_path': 'part002.mp3',
+                           'ssml_sha256': hashlib.sha256(b'<speak>Before the edit.</speak>').hexdigest()},
+    }
+
+    placed, total = timestamp.build_chunks_from_manifest(str(tmp_path), ['book.json'], manifest)
+
+    assert [chunk['chunk_number'] for chunk in placed] == [1, 2]
+    assert total == 5.0
+    output = capsys.readouterr().out
+    assert 'book.json chunk 2 was edited after synthesis' in output
+    assert 'chunk 1 was edited' not in output
+    assert 'No synthesized audio recorded for book.json chunk 4.' in output
+
+
+def test_chunks_without_manifest_use_the_book_folders(tmp_path):
+    from tests.test_mp3_duration import SECONDS_PER_FRAME, frame
+
+    timestamp = load_timestamp_module()
+    ssml_dir, audio_dir = tmp_path / 'SSML', tmp_path / 'Audio'
+    ssml_dir.mkdir()
+    for name, count in (('alpha_part_1.txt.json', 2), ('beta_part_2.txt.json', 1)):
+        chunks = [{'chunk_number': n, 'cleaned_english_translation': f'<speak>{name} {n}.</speak>'}
+                  for n in range(1, count + 1)]
+        (ssml_dir / name).write_text(json.dumps({'chunks': chunks}), encoding='utf-8')
+    for path, frames in (('alpha/alpha_part002_Matthew.mp3', 50), ('alpha/alpha_part001_Matthew.mp3', 100),
+                         ('beta/beta_part001_Matthew.mp3', 25)):
+        (audio_dir / path).parent.mkdir(parents=True, exist_ok=True)
+        (audio_dir / path).write_bytes(frame() * frames)
+
+    all_chunks, total = timestamp.build_project_chunks(str(ssml_dir), str(audio_dir))
+
+    assert [chunk['audio_file'] for chunk in all_chunks] == [
+        'alpha/alpha_part001_Matthew.mp3', 'alpha/alpha_part002_Matthew.mp3', 'beta/beta_part001_Matthew.mp3']
+    assert [chunk['start_time'] for chunk in all_chunks] == pytest.approx([0.0, 100 * SECONDS_PER_FRAME, 150 * SECONDS_PER_FRAME])
+    assert total == pytest.approx(175 * SECONDS_PER_FRAME)
+
+
+@pytest.mark.parametrize('projects, workers', [(['only'], None), (['first', 'second', 'third'], 1)])
+def test_batch_timestamps_run_inline_without_a_pool(tmp_path, monkeypatch, projects, workers):
+    import pipeline_support.utils
+
+    timestamp = load_timestamp_module()
+    for project in projects:
+        (tmp_path / project).mkdir()
+    flashes = []
+    monkeypatch.setattr(pipeline_support.utils, 'ProcessPoolExecutor', None)
+    monkeypatch.setattr(timestamp, 'request', types.SimpleNamespace(form={'projects_directory': str(tmp_path)}))
+    monkeypatch.setattr(timestamp, 'current_app', types.SimpleNamespace(config={'TIMESTAMP_WORKERS': workers}))
+    monkeypatch.setattr(timestamp, 'flash', lambda message, category: flashes.append(category))
+    monkeypatch.setattr(timestamp, 'render_template', lambda template, **context: context)
+    monkeypatch.setattr(timestamp, 'timestamp_project', lambda directory, project, align, incremental: (
+        {'project': project, 'status': 'failed', 'error': 'broken'} if project == 'second'
+        else {'project': project, 'status': 'completed'}))
+
+    results = timestamp.batch_create_timestamps()['results']
+
+    assert [result['project'] for result in results] == projects
+    assert flashes == (['danger'] if 'second' in projects else [])
@@ -7,6 +7,12 @@ from pathlib import Path
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    # utils.py opens a translation log under ./translation_logs when imported
+    monkeypatch.chdir(tmp_path)
+
+
 def load_utils_module():
     sys.modules['openai'] = types.ModuleType('openai')
     class DummyCompletions:
@@ -90,3 +96,16 @@ def test_estimate_total_cost(tmp_path):
     assert totals[1] == pytest.approx(total_chars / 1_000_000 * 20)
     assert totals[2] == pytest.approx(total_chars / 1_000_000 * 30)
     assert totals[3] == pytest.approx(total_chars / 1_000_000 * 100)
+
+
+def test_estimate_cost_ignores_markup_for_polly(tmp_path):
+    utils = load_utils_module()
+    sample_text = '<speak>Hello <break time="1s"/>world</speak>'
+    file_path = tmp_path / 'sample.ssml'
+    file_path.write_text(sample_text, encoding='utf-8')
+
+    count, gpt_cost, gen_cost, long_cost = utils.estimate_cost(str(file_path))
+
+    assert count == len(sample_text)
+    assert gen_cost == pytest.approx(len('Hello world') / 1_000_000 * 30)
+    assert long_cost == pytest.approx(len('Hello world') / 1_000_000 * 100)
@@ -1,11 +1,24 @@
 from flask import Blueprint, render_template, request, send_file, current_app, flash, Response
 import os
 import json
-from mutagen.mp3 import MP3
 from werkzeug.utils import secure_filename
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import gzip
+import hashlib
 import io
 import re
+import time
+from contextlib import ExitStack
+
+from pipeline_support.mp3_duration import directory_durations
+from pipeline_support.silence_alignment import find_pauses_for_files, snap_to_pauses
+from pipeline_support.synthesis_manifest import load_manifest, ssml_hash
+from pipeline_support.utils import parallel_map
+
+try:
+    import zstandard
+except ImportError:  # zstd copies are optional; gzip is always written
+    zstandard = None
 
 bp = Blueprint('timestamp', __name__)
 
@@ -22,33 +35,78 @@ def clean_text(text: str) -> str:
     # Join the non-empty lines back together
     return '\n'.join(lines)
 
-def split_into_subtitles(text: str, start_time: float, end_time: float, max_chars: int = 80, target_duration: float = 5.0) -> List[Dict]:
-    def split_sentences(text):
-        result = []
-        current_sentence = ""
-        in_special_block = False
-        special_block_char = None
-
-        for char in text:
-            current_sentence += char
-            if char in "([\"":
-                in_special_block = True
-                special_block_char = char
-            elif (char == ")" and special_block_char == "(") or \
-                 (char == "]" and special_block_char == "[") or \
-                 (char == "\"" and special_block_char == "\""):
-                in_special_block = False
-                special_block_char = None
-            elif char in ".!?" and not in_special_block and len(current_sentence.strip()) > 0:
-                result.append(current_sentence.strip())
-                current_sentence = ""
-
-        if current_sentence.strip():
-            result.append(current_sentence.strip())
+# Only these characters change the sentence splitters' state, so the splitters
+# jump between them and slice whole sentences out of the text
+ENGLISH_SENTENCE_MARKS = re.compile(r'[(\["\)\].!?]')
+LATIN_SENTENCE_MARKS = re.compile(r'[().]')
 
-        return result
+def split_english_sentences(text: str) -> List[str]:
+    """
+    Split on '.', '!' and '?' outside a bracketed or quoted block.
+
+    A block opens at '(', '[' or '"' and only closes at the bracket matching
+    the most recent opener; a '"' always (re)opens a block.
+    """
+    result = []
+    sentence_start = 0
+    special_block_char = None
+
+    for match in ENGLISH_SENTENCE_MARKS.finditer(text):
+        char = match.group()
+        if char in "([\"":
+            special_block_char = char
+        elif (char == ")" and special_block_char == "(") or (char == "]" and special_block_char == "["):
+            special_block_char = None
+        elif char in ".!?" and special_block_char is None:
+            result.append(text[sentence_start:match.end()].strip())
+            sentence_start = match.end()
+
+    rest = text[sentence_start:].strip()
+    if rest:
+        result.append(rest)
+    return result
 
-    sentences = split_sentences(text)
+def split_latin_sentences(text: str) -> List[str]:
+    """Split on '.' outside parentheses."""
+    sentences = []
+    sentence_start = 0
+    parenthesis_level = 0
+
+    for match in LATIN_SENTENCE_MARKS.finditer(text):
+        char = match.group()
+        if char == '(':
+            parenthesis_level += 1
+        elif char == ')':
+            parenthesis_level -= 1
+        elif parenthesis_level == 0:
+            sentences.append(text[sentence_start:match.end()].strip())
+            sentence_start = match.end()
+
+    rest = text[sentence_start:].strip()
+    if rest:
+        sentences.append(rest)
+    return sentences
+
+def split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """Greedily pack whole words into chunks of at most ``max_chars`` characters."""
+    words = sentence.split()
+    chunks = []
+    chunk_start = 0
+    chunk_length = 0
+    for i, word in enumerate(words):
+        if chunk_length + len(word) + 1 <= max_chars:
+            chunk_length += len(word) + (1 if i > chunk_start else 0)
+        else:
+            if i > chunk_start:
+                chunks.append(" ".join(words[chunk_start:i]))
+            chunk_start = i
+            chunk_length = len(word)
+    if chunk_start < len(words):
+        chunks.append(" ".join(words[chunk_start:]))
+    return chunks
+
+def split_into_subtitles(text: str, start_time: float, end_time: float, max_chars: int = 80, target_duration: float = 5.0) -> List[Dict]:
+    sentences = split_english_sentences(text)
     total_duration = end_time - start_time
     time_per_char = total_duration / len(text)
     
@@ -90,42 +148,7 @@ def split_into_subtitles(text: str, start_time: float, end_time: float, max_char
     return subtitles
 
 def split_latin_subtitles(text: str, start_time: float, end_time: float, max_chars: int = 300) -> List[Dict]:
-    def split_sentences(text):
-        sentences = []
-        current_sentence = ""
-        parenthesis_level = 0
-        
-        for char in text:
-            current_sentence += char
-            if char == '(':
-                parenthesis_level += 1
-            elif char == ')':
-                parenthesis_level -= 1
-            elif char == '.' and parenthesis_level == 0 and len(current_sentence.strip()) > 0:
-                sentences.append(current_sentence.strip())
-                current_sentence = ""
-        
-        if current_sentence.strip():
-            sentences.append(current_sentence.strip())
-        
-        return sentences
-
-    def split_long_sentence(sentence, max_chars):
-        words = sentence.split()
-        chunks = []
-        current_chunk = ""
-        for word in words:
-            if len(current_chunk) + len(word) + 1 <= max_chars:
-                current_chunk += (" " if current_chunk else "") + word
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = word
-        if current_chunk:
-            chunks.append(current_chunk)
-        return chunks
-
-    sentences = split_sentences(text)
+    sentences = split_latin_sentences(text)
     total_duration = end_time - start_time
     time_per_char = total_duration / len(text)
     
@@ -179,49 +202,203 @@ def split_latin_subtitles(text: str, start_time: float, end_time: float, max_cha
 
     return subtitles
 
-def generate_srt_content(all_chunks: List[Dict], language: str, use_shorter_subtitles: bool = False) -> str:
-    srt_content = ""
-    subtitle_index = 1
+SUBTITLE_STATE_FILENAME = 'subtitle_state.json'
+
+# Pre-compressed copies written next to each SRT, in order of preference
+SRT_ENCODINGS = [('zstd', '.zst'), ('gzip', '.gz')]
+
+_etag_cache: Dict[str, Tuple[int, int, str]] = {}
+
+SRT_VARIANTS = [('english', 'original'), ('english', 'shorter'), ('latin', 'original'), ('latin', 'shorter')]
+
+def chunk_subtitles(chunk: Dict, language: str, use_shorter_subtitles: bool, text: str = None) -> List[Dict]:
+    """Subtitles for one chunk in one SRT variant. ``text`` skips cleaning when it is already clean."""
+    if text is None:
+        text = clean_text(chunk['cleaned_english_translation'] if language == 'english' else chunk['original_latin'])
+    if not use_shorter_subtitles:
+        return [{"text": text, "start": chunk['start_time'], "end": chunk['end_time']}]
     
+    if language == 'english':
+        subtitles = split_into_subtitles(text, chunk['start_time'], chunk['end_time'])
+    else:  # Latin
+        subtitles = split_latin_subtitles(text, chunk['start_time'], chunk['end_time'])
+    if chunk.get('pauses'):
+        subtitles = snap_to_pauses(subtitles, chunk['pauses'], chunk['start_time'], chunk['end_time'])
+    return subtitles
+
+def srt_block(subtitle_index: int, subtitle: Dict) -> str:
+    return f"{subtitle_index}\n{format_time(subtitle['start'])} --> {format_time(subtitle['end'])}\n{subtitle['text']}\n\n"
+
+def generate_srt_content(all_chunks: List[Dict], language: str, use_shorter_subtitles: bool = False) -> str:
+    blocks = []
     for chunk in all_chunks:
-        if language == 'english':
-            text = clean_text(chunk['cleaned_english_translation'])
-            if use_shorter_subtitles:
-                subtitles = split_into_subtitles(text, chunk['start_time'], chunk['end_time'])
-            else:
-                subtitles = [{"text": text, "start": chunk['start_time'], "end": chunk['end_time']}]
-        else:  # Latin
-            text = clean_text(chunk['original_latin'])
-            if use_shorter_subtitles:
-                subtitles = split_latin_subtitles(text, chunk['start_time'], chunk['end_time'])
-            else:
-                subtitles = [{"text": text, "start": chunk['start_time'], "end": chunk['end_time']}]
-        
-        for subtitle in subtitles:
-            start = format_time(subtitle['start'])
-            end = format_time(subtitle['end'])
-            srt_content += f"{subtitle_index}\n{start} --> {end}\n{subtitle['text']}\n\n"
-            subtitle_index += 1
-    
-    return srt_content
+        for subtitle in chunk_subtitles(chunk, language, use_shorter_subtitles):
+            blocks.append(srt_block(len(blocks) + 1, subtitle))
+    return "".join(blocks)
 
+def chunk_state_hash(chunk: Dict, align_to_silence: bool = False) -> str:
+    """Fingerprint of everything a chunk's subtitles depend on: its text, its duration and alignment.
 
-def save_srt_files(english_original, english_shorter, latin_original, latin_shorter, output_dir=None):
-    if output_dir is None:
-        output_dir = current_app.config['SUBTITLE_OUTPUT']
-    
+    The chunk's place on the timeline is left out, so a longer or shorter chunk
+    only shifts the chunks after it instead of invalidating them.
+    """
+    state = [chunk['cleaned_english_translation'], chunk['original_latin'],
+             round(chunk['end_time'] - chunk['start_time'], 6), align_to_silence]
+    return hashlib.sha256(json.dumps(state, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def chunk_state_key(chunk: Dict, position: int) -> str:
+    return chunk.get('chunk_key') or f"#{position}"
+
+def load_subtitle_state(output_dir: str) -> Dict:
+    """Per-chunk hashes and subtitles saved by the previous ``write_srt_files`` run, or an empty state."""
+    try:
+        with open(os.path.join(output_dir, SUBTITLE_STATE_FILENAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def reusable_chunk_state(cached: Optional[Dict], chunk: Dict, align_to_silence: bool = False) -> bool:
+    """Whether ``cached`` was produced from the same text, duration and alignment as ``chunk``.
+
+    An aligned chunk is only reusable when its pauses were saved, so it can be
+    re-timed at a new start without decoding its audio again.
+    """
+    return (bool(cached) and cached.get('hash') == chunk_state_hash(chunk, align_to_silence)
+            and (not align_to_silence or 'pauses' in cached))
+
+def changed_chunks(all_chunks: List[Dict], previous_state: Optional[Dict], align_to_silence: bool = False) -> List[Dict]:
+    """Chunks that must be split again, and decoded again when aligning, instead of reusing ``previous_state``."""
+    previous = (previous_state or {}).get('chunks', {})
+    return [chunk for position, chunk in enumerate(all_chunks)
+            if not reusable_chunk_state(previous.get(chunk_state_key(chunk, position)), chunk, align_to_silence)]
+
+def write_srt_files(all_chunks: List[Dict], output_dir: str, preview_chars: int = 500,
+                    align_to_silence: bool = False, previous_state: Optional[Dict] = None) -> Dict[str, str]:
+    """Write all four SRT variants in one pass over ``all_chunks``.
+
+    Each chunk's English and Latin text is cleaned once and its subtitles are
+    streamed straight to the four files, so no full SRT is held in memory.
+    With ``previous_state``, chunks whose text, duration and times are
+    unchanged reuse their stored subtitles. An unchanged chunk that moved
+    because an earlier chunk grew or shrank is re-timed at its new start from
+    its stored pauses, without decoding audio, so the output is exactly what a
+    full run writes. Subtitle numbers are always reassigned, so a chunk that
+    gains or loses subtitles shifts the rest. The files are written under
+    temporary names and swapped in at the end, followed by the new state. Returns the first ``preview_chars``
+    characters of each variant, keyed like ``english_srt_original``.
+    """
     os.makedirs(output_dir, exist_ok=True)
+    previous = (previous_state or {}).get('chunks', {})
+    state_chunks = {}
+    paths = {variant: os.path.join(output_dir, f"{variant[0]}_{variant[1]}.srt") for variant in SRT_VARIANTS}
+    counters = {variant: 0 for variant in SRT_VARIANTS}
+    previews = {variant: [] for variant in SRT_VARIANTS}
+    preview_lengths = {variant: 0 for variant in SRT_VARIANTS}
     
-    files = {
-        'english_original.srt': english_original,
-        'english_shorter.srt': english_shorter,
-        'latin_original.srt': latin_original,
-        'latin_shorter.srt': latin_shorter
-    }
+    with ExitStack() as stack:
+        files = {variant: stack.enter_context(open(paths[variant] + '.tmp', 'w', encoding='utf-8'))
+                 for variant in SRT_VARIANTS}
+        for position, chunk in enumerate(all_chunks):
+            key = chunk_state_key(chunk, position)
+            digest = chunk_state_hash(chunk, align_to_silence)
+            cached = previous.get(key)
+            reusable = reusable_chunk_state(cached, chunk, align_to_silence)
+            if reusable and (cached.get('start'), cached.get('end')) == (chunk['start_time'], chunk['end_time']):
+                chunk_blocks = cached['subtitles']
+            else:
+                if reusable and align_to_silence:
+                    chunk['pauses'] = cached['pauses']
+                texts = {
+                    'english': clean_text(chunk['cleaned_english_translation']),
+                    'latin': clean_text(chunk['original_latin']),
+                }
+                chunk_blocks = {
+                    f"{language}_{version}": [[subtitle['start'], subtitle['end'], subtitle['text']]
+                                              for subtitle in chunk_subtitles(chunk, language, version == 'shorter', texts[language])]
+                    for language, version in SRT_VARIANTS
+                }
+            state_chunks[key] = {'hash': digest, 'start': chunk['start_time'], 'end': chunk['end_time'],
+                                 'subtitles': chunk_blocks}
+            if align_to_silence:
+                state_chunks[key]['pauses'] = chunk.get('pauses') or []
+            
+            for variant in SRT_VARIANTS:
+                for start, end, text in chunk_blocks[f"{variant[0]}_{variant[1]}"]:
+                    counters[variant] += 1
+                    block = srt_block(counters[variant], {'start': start, 'end': end, 'text': text})
+                    files[variant].write(block)
+                    if preview_lengths[variant] < preview_chars:
+                        previews[variant].append(block[:preview_chars - preview_lengths[variant]])
+                        preview_lengths[variant] += len(previews[variant][-1])
+    
+    for variant in SRT_VARIANTS:
+        os.replace(paths[variant] + '.tmp', paths[variant])
+        write_compressed_copies(paths[variant])
+    
+    state_path = os.path.join(output_dir, SUBTITLE_STATE_FILENAME)
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'chunks': state_chunks}, f, ensure_ascii=False)
+    os.replace(state_path + '.tmp', state_path)
     
-    for filename, content in files.items():
-        with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
-            f.write(content)
+    return {f"{language}_srt_{version}": "".join(previews[(language, version)]) for language, version in SRT_VARIANTS}
+
+def write_compressed_copies(path: str) -> None:
+    """Write ``.gz`` (and, with zstandard installed, ``.zst``) copies of ``path`` for ``download_srt``."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    copies = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if zstandard is not None:
+        copies['.zst'] = zstandard.ZstdCompressor(level=19).compress(data)
+    for suffix, compressed in copies.items():
+        with open(path + suffix + '.tmp', 'wb') as f:
+            f.write(compressed)
+        os.replace(path + suffix + '.tmp', path + suffix)
+
+def file_etag(path: str) -> str:
+    """SHA-256 of the file's content, re-hashed only when its size or mtime changes."""
+    stat = os.stat(path)
+    cached = _etag_cache.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    _etag_cache[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+    return digest.hexdigest()
+
+def choose_srt_encoding(file_path: str, accept_encodings) -> Tuple[str, Optional[str]]:
+    """Pick the file to serve for an ``Accept-Encoding`` list of ``(encoding, quality)`` pairs.
+
+    A compressed copy is only used when it is at least as new as the SRT, so a
+    file edited by hand is never shadowed by a stale copy.
+    """
+    qualities = dict(accept_encodings)
+    srt_mtime = os.stat(file_path).st_mtime_ns
+    for encoding, suffix in SRT_ENCODINGS:
+        if qualities.get(encoding, qualities.get('*', 0)) <= 0:
+            continue
+        try:
+            if os.stat(file_path + suffix).st_mtime_ns >= srt_mtime:
+                return file_path + suffix, encoding
+        except FileNotFoundError:
+            continue
+    return file_path, None
+
+def regenerate_subtitles(all_chunks: List[Dict], audio_dir: str, output_dir: str,
+                         align_to_silence: bool = False, incremental: bool = False) -> Tuple[Dict[str, str], int]:
+    """Write the SRT files for ``all_chunks``, re-splitting only changed chunks when ``incremental``.
+
+    Audio is only decoded for pause detection on chunks that are re-split.
+    Returns the previews and the number of chunks that were re-split.
+    """
+    previous_state = load_subtitle_state(output_dir) if incremental else None
+    changed = changed_chunks(all_chunks, previous_state, align_to_silence)
+    if align_to_silence and changed:
+        print(f"Aligning subtitle boundaries to pauses in {len(changed)} chunks")
+        attach_pauses(changed, audio_dir)
+    previews = write_srt_files(all_chunks, output_dir, align_to_silence=align_to_silence, previous_state=previous_state)
+    return previews, len(changed)
 
 
 def format_time(seconds: float) -> str:
@@ -234,6 +411,123 @@ def natural_sort_key(s):
     return [int(c) if c.isdigit() else c.lower() for c in re.split(r'(\d+)', s)]
 
 
+def build_chunks_from_manifest(processed_folder: str, json_files: List[str], manifest: Dict) -> Tuple[List[Dict], float]:
+    """Place every chunk on the timeline using durations recorded at synthesis time.
+
+    Chunks are matched to audio by ``(source JSON, chunk_number)`` rather than
+    by position, so a missing part only drops that chunk instead of shifting
+    every later subtitle. No audio files are opened. A chunk whose SSML no
+    longer matches the hash recorded at synthesis time keeps its recorded
+    duration, which is still the length of its audio, but is reported as
+    needing re-synthesis.
+    """
+    all_chunks = []
+    cumulative_time = 0.0
+
+    for json_file in json_files:
+        with open(os.path.join(processed_folder, json_file), 'r', encoding='utf-8') as f:
+            chunks = json.load(f)['chunks']
+
+        for chunk_index, chunk in enumerate(chunks, start=1):
+            chunk_number = chunk.get('chunk_number', chunk_index)
+            entry = manifest.get((json_file, chunk_number))
+            if entry is None:
+                print(f"Warning: No synthesized audio recorded for {json_file} chunk {chunk_number}. Skipping.")
+                continue
+            recorded_hash = entry.get('ssml_sha256')
+            if recorded_hash and recorded_hash != ssml_hash(chunk.get('cleaned_english_translation', '')):
+                print(f"Warning: {json_file} chunk {chunk_number} was edited after synthesis; "
+                      f"its audio is stale and should be re-synthesized.")
+
+            chunk['start_time'] = cumulative_time
+            cumulative_time += entry['duration']
+            chunk['end_time'] = cumulative_time
+            chunk['audio_file'] = entry['output_path']
+            chunk['chunk_key'] = f"{json_file}#{chunk_number}"
+            all_chunks.append(chunk)
+
+    return all_chunks, cumulative_time
+
+
+def attach_pauses(all_chunks: List[Dict], audio_dir: str) -> None:
+    """Decode each chunk's audio once and store its detected pauses in ``chunk['pauses']``.
+
+    ``generate_srt_content`` then snaps the shorter subtitles' boundaries to
+    these pauses instead of relying only on a constant time per character.
+    """
+    paths = [os.path.join(audio_dir, *chunk['audio_file'].split('/')) for chunk in all_chunks]
+    pauses = find_pauses_for_files(paths)
+    for chunk, path in zip(all_chunks, paths):
+        chunk['pauses'] = pauses[path]
+
+
+def book_audio_files(audio_dir: str) -> Dict[Optional[str], List[str]]:
+    """MP3 files in ``audio_dir`` in natural order, keyed by book folder (``None`` for flat files).
+
+    Paths are relative to ``audio_dir`` in the ``book/book_partNNN_Voice.mp3``
+    form synthesis writes.
+    """
+    books = {None: []}
+    for name in sorted(os.listdir(audio_dir), key=natural_sort_key):
+        path = os.path.join(audio_dir, name)
+        if os.path.isdir(path):
+            books[name] = sorted([f"{name}/{f}" for f in os.listdir(path) if f.endswith('.mp3')], key=natural_sort_key)
+        elif name.endswith('.mp3'):
+            books[None].append(name)
+    return books
+
+
+def build_project_chunks(processed_folder: str, audio_dir: str) -> Tuple[List[Dict], float]:
+    """Load every chunk of a project and place it on the audio timeline.
+
+    Uses the synthesis manifest when there is one. Otherwise each JSON file's
+    chunks are paired in natural order with the MP3 files in its book folder,
+    the way synthesis lays them out, falling back to flat MP3 files in
+    ``audio_dir`` from older runs; durations come from the cached duration index.
+    """
+    json_files = sorted([f for f in os.listdir(processed_folder) if f.endswith('.json')], key=natural_sort_key)
+    books = book_audio_files(audio_dir)
+    audio_files = [file for files in books.values() for file in files]
+    manifest = load_manifest(audio_dir)
+    
+    print(f"Number of JSON files: {len(json_files)}")
+    print(f"Number of audio files: {len(audio_files)}")
+    
+    if manifest:
+        print(f"Using synthesis manifest with {len(manifest)} entries")
+        return build_chunks_from_manifest(processed_folder, json_files, manifest)
+    
+    all_chunks = []
+    cumulative_time = 0.0
+    durations = directory_durations(audio_dir, audio_files)
+    queues = {book: iter(files) for book, files in books.items()}
+    for json_file in json_files:
+        json_file_path = os.path.join(processed_folder, json_file)
+        with open(json_file_path, 'r', encoding='utf-8') as f:
+            json_data = json.load(f)
+        chunks = json_data['chunks']
+        print(f"Number of chunks in {json_file}: {len(chunks)}")
+        book_name = json_file.split('_part_')[0]
+        queue = queues[book_name if book_name in queues else None]
+    
+        for chunk_index, chunk in enumerate(chunks, start=1):
+            audio_file = next(queue, None)
+            if audio_file is None:
+                print(f"Warning: More chunks than audio files for {json_file}. Stopping processing.")
+                break
+        
+            duration = durations[audio_file]
+        
+            chunk['start_time'] = cumulative_time
+            cumulative_time += duration
+            chunk['end_time'] = cumulative_time
+            chunk['audio_file'] = audio_file
+            chunk['chunk_key'] = f"{json_file}#{chunk.get('chunk_number', chunk_index)}"
+            all_chunks.append(chunk)
+    
+    return all_chunks, cumulative_time
+
+
 @bp.route('/create_timestamps', methods=['GET', 'POST'])
 def create_timestamps():
     if request.method == 'POST':
@@ -243,66 +537,41 @@ def create_timestamps():
         print(f"Processed folder: {processed_folder}")
         print(f"Audio directory: {audio_dir}")
         
-        json_files = sorted([f for f in os.listdir(processed_folder) if f.endswith('.json')], key=natural_sort_key)
-        audio_files = sorted([f for f in os.listdir(audio_dir) if f.endswith('.mp3')], key=natural_sort_key)
-        
-        print(f"Number of JSON files: {len(json_files)}")
-        print(f"Number of audio files: {len(audio_files)}")
-        
-        all_chunks = []
-        cumulative_time = 0.0
-        
-        audio_file_index = 0
-        for json_file in json_files:
-            json_file_path = os.path.join(processed_folder, json_file)
-            print(f"Processing JSON file: {json_file}")
-            
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-            chunks = json_data['chunks']
-            print(f"Number of chunks in {json_file}: {len(chunks)}")
-            
-            for chunk in chunks:
-                if audio_file_index >= len(audio_files):
-                    print("Warning: More chunks than audio files. Stopping processing.")
-                    break
-                
-                audio_file = audio_files[audio_file_index]
-                file_path = os.path.join(audio_dir, audio_file)
-                print(f"Processing audio file: {audio_file}")
-                audio = MP3(file_path)
-                duration = audio.info.length
-                
-                chunk['start_time'] = cumulative_time
-                cumulative_time += duration
-                chunk['end_time'] = cumulative_time
-                all_chunks.append(chunk)
-                
-                audio_file_index += 1
+        all_chunks, cumulative_time = build_project_chunks(processed_folder, audio_dir)
         
         print(f"Total number of chunks processed: {len(all_chunks)}")
         print(f"Total duration: {cumulative_time} seconds")
         
-        english_srt_original = generate_srt_content(all_chunks, 'english', use_shorter_subtitles=False)
-        english_srt_shorter = generate_srt_content(all_chunks, 'english', use_shorter_subtitles=True)
-        latin_srt_original = generate_srt_content(all_chunks, 'latin', use_shorter_subtitles=False)
-        latin_srt_shorter = generate_srt_content(all_chunks, 'latin', use_shorter_subtitles=True)
-        
-        print(f"Length of english_srt_original: {len(english_srt_original)}")
-        print(f"Length of english_srt_shorter: {len(english_srt_shorter)}")
-        print(f"Length of latin_srt_original: {len(latin_srt_original)}")
-        print(f"Length of latin_srt_shorter: {len(latin_srt_shorter)}")
+        subtitle_output_dir = current_app.config['SUBTITLE_OUTPUT']
+        previews, _ = regenerate_subtitles(all_chunks, audio_dir, subtitle_output_dir,
+                                           align_to_silence=bool(request.form.get('align_to_silence')))
+        print(f"Subtitle files written to {subtitle_output_dir}")
         
-        save_srt_files(english_srt_original, english_srt_shorter, latin_srt_original, latin_srt_shorter)
         return render_template('timestamp_result.html', 
-                               english_srt_original=english_srt_original,
-                               english_srt_shorter=english_srt_shorter,
-                               latin_srt_original=latin_srt_original,
-                               latin_srt_shorter=latin_srt_shorter,
-                               total_duration=format_time(cumulative_time))
+                               total_duration=format_time(cumulative_time),
+                               **previews)
     
     return render_template('create_timestamps.html')
 
+@bp.route('/update_timestamps', methods=['POST'])
+def update_timestamps():
+    """Refresh the existing SRT files after chunk edits, re-splitting only the chunks that changed."""
+    processed_folder = current_app.config['PROCESSED_FOLDER']
+    audio_dir = current_app.config['AUDIO_OUTPUT_FOLDER']
+    subtitle_output_dir = current_app.config['SUBTITLE_OUTPUT']
+    
+    all_chunks, cumulative_time = build_project_chunks(processed_folder, audio_dir)
+    previews, changed = regenerate_subtitles(all_chunks, audio_dir, subtitle_output_dir,
+                                             align_to_silence=bool(request.form.get('align_to_silence')),
+                                             incremental=True)
+    print(f"Regenerated subtitles for {changed} of {len(all_chunks)} chunks")
+    
+    return render_template('timestamp_result.html', 
+                           total_duration=format_time(cumulative_time),
+                           regenerated_chunks=changed,
+                           total_chunks=len(all_chunks),
+                           **previews)
+
 @bp.route('/download_srt/<language>/<version>')
 def download_srt(language, version):
     filename = f"{language}_{version}.srt"
@@ -311,75 +580,84 @@ def download_srt(language, version):
     if not os.path.exists(file_path):
         return f"File not found: {file_path}", 404
 
-    return send_file(file_path,
-                     as_attachment=True,
-                     download_name=filename,
-                     mimetype='text/plain')
+    # send_file answers If-None-Match with 304 and Range with 206 against the
+    # served representation, so each encoding carries its own strong ETag
+    served_path, encoding = choose_srt_encoding(file_path, request.accept_encodings)
+    response = send_file(served_path,
+                         as_attachment=True,
+                         download_name=filename,
+                         mimetype='text/plain',
+                         etag=file_etag(served_path),
+                         conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def timestamp_project(projects_directory: str, project: str, align_to_silence: bool = False,
+                      incremental: bool = False) -> Dict:
+    """Generate and save the four SRT variants for one project.
+
+    Errors are caught and reported in the result so one bad project never
+    stops the rest of the batch.
+    """
+    start = time.time()
+    result = {'project': project}
+    processed_folder = os.path.join(projects_directory, project, 'SSML')
+    audio_dir = os.path.join(projects_directory, project, 'Audio')
+    subtitle_output_dir = os.path.join(projects_directory, project, 'subtitles')
+    
+    if not os.path.exists(processed_folder) or not os.path.exists(audio_dir):
+        result['status'] = 'skipped'
+        result['error'] = f'Missing directories for project: {project}'
+        return result
+    
+    try:
+        all_chunks, cumulative_time = build_project_chunks(processed_folder, audio_dir)
+        previews, changed = regenerate_subtitles(all_chunks, audio_dir, subtitle_output_dir,
+                                                 align_to_silence=align_to_silence, incremental=incremental)
+    except Exception as e:
+        print(f"Error creating timestamps for {project}: {e}")
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['seconds'] = round(time.time() - start, 2)
+        return result
+    
+    result.update(previews)
+    result.update({
+        'status': 'completed',
+        'regenerated_chunks': changed,
+        'total_chunks': len(all_chunks),
+        'total_duration': format_time(cumulative_time),
+        'seconds': round(time.time() - start, 2)
+    })
+    return result
 
 @bp.route('/batch_create_timestamps', methods=['POST'])
 def batch_create_timestamps():
     projects_directory = request.form['projects_directory']
+    align_to_silence = bool(request.form.get('align_to_silence'))
+    incremental = bool(request.form.get('incremental'))
     
     if not os.path.exists(projects_directory):
         flash('Projects directory does not exist.', 'danger')
         return render_template('create_timestamps.html')
     
-    project_dirs = [d for d in os.listdir(projects_directory) if os.path.isdir(os.path.join(projects_directory, d))]
+    project_dirs = sorted([d for d in os.listdir(projects_directory) if os.path.isdir(os.path.join(projects_directory, d))],
+                          key=natural_sort_key)
     
+    # Projects are independent, so the batch takes as long as the slowest one;
+    # timestamp_project reports its own errors, so one bad project never stops the rest
+    workers = current_app.config.get('TIMESTAMP_WORKERS')
+    count = len(project_dirs)
     all_results = []
-    
-    for project in project_dirs:
-        processed_folder = os.path.join(projects_directory, project, 'SSML')
-        audio_dir = os.path.join(projects_directory, project, 'Audio')
-        subtitle_output_dir = os.path.join(projects_directory, project, 'subtitles')
-        
-        if not os.path.exists(processed_folder) or not os.path.exists(audio_dir):
-            flash(f'Missing directories for project: {project}', 'warning')
+    for result in parallel_map(timestamp_project, [projects_directory] * count, project_dirs,
+                               [align_to_silence] * count, [incremental] * count, workers=workers):
+        if result['status'] == 'skipped':
+            flash(result['error'], 'warning')
             continue
-        
-        json_files = sorted([f for f in os.listdir(processed_folder) if f.endswith('.json')], key=natural_sort_key)
-        audio_files = sorted([f for f in os.listdir(audio_dir) if f.endswith('.mp3')], key=natural_sort_key)
-        
-        all_chunks = []
-        cumulative_time = 0.0
-        audio_file_index = 0
-        
-        for json_file in json_files:
-            json_file_path = os.path.join(processed_folder, json_file)
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-            chunks = json_data['chunks']
-            
-            for chunk in chunks:
-                if audio_file_index >= len(audio_files):
-                    break
-                
-                audio_file = audio_files[audio_file_index]
-                file_path = os.path.join(audio_dir, audio_file)
-                audio = MP3(file_path)
-                duration = audio.info.length
-                
-                chunk['start_time'] = cumulative_time
-                cumulative_time += duration
-                chunk['end_time'] = cumulative_time
-                all_chunks.append(chunk)
-                
-                audio_file_index += 1
-        
-        english_srt_original = generate_srt_content(all_chunks, 'english', use_shorter_subtitles=False)
-        english_srt_shorter = generate_srt_content(all_chunks, 'english', use_shorter_subtitles=True)
-        latin_srt_original = generate_srt_content(all_chunks, 'latin', use_shorter_subtitles=False)
-        latin_srt_shorter = generate_srt_content(all_chunks, 'latin', use_shorter_subtitles=True)
-        
-        save_srt_files(english_srt_original, english_srt_shorter, latin_srt_original, latin_srt_shorter, output_dir=subtitle_output_dir)
-        
-        all_results.append({
-            'project': project,
-            'english_srt_original': english_srt_original,
-            'english_srt_shorter': english_srt_shorter,
-            'latin_srt_original': latin_srt_original,
-            'latin_srt_shorter': latin_srt_shorter,
-            'total_duration': format_time(cumulative_time)
-        })
+        if result['status'] == 'failed':
+            flash(f"Failed to create timestamps for {result['project']}: {result['error']}", 'danger')
+        all_results.append(result)
     
-    return render_template('batch_timestamp_result.html', results=all_results)
\ No newline at end of file
+    return render_template('batch_timestamp_result.html', results=all_results)
@@ -16,6 +16,8 @@ from flask import current_app
 from xml.etree import ElementTree as ET
 from xml.etree.ElementTree import ParseError
 
+from pipeline_support.polly_usage import billed_characters, character_cost
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -443,13 +445,14 @@ def estimate_cost(file_path):
         text = file.read()
     
     character_count = len(text)
+    polly_characters = billed_characters(text)  # Polly does not bill for markup
 
     # OpenAI gpt-4o cost
     gpt_cost = (character_count / 1000000) * 20  # $0.02 per 1k tokens (approx 750 characters)
 
     # Amazon Polly costs
-    polly_cost_generative = (character_count / 1000000) * 30  # $30 per 1M characters
-    polly_cost_long_form = (character_count / 1000000) * 100  # $100 per 1M characters
+    polly_cost_generative = character_cost(polly_characters, 'generative')
+    polly_cost_long_form = character_cost(polly_characters, 'long-form')
 
     return character_count, gpt_cost, polly_cost_generative, polly_cost_long_form
 
@@ -464,12 +467,13 @@ def estimate_total_cost(file_paths):
             file_content = file.read()
         
         character_count = len(file_content)
+        polly_characters = billed_characters(file_content)  # Polly does not bill for markup
         total_character_count += character_count
         
         # Calculate costs
         gpt_cost = (character_count / 1000000) * 20  # $0.02 per 1k tokens (approx 750 characters)
-        polly_cost_generative = (character_count / 1000000) * 30  # $30 per 1M characters
-        polly_cost_long_form = (character_count / 1000000) * 100  # $100 per 1M characters
+        polly_cost_generative = character_cost(polly_characters, 'generative')
+        polly_cost_long_form = character_cost(polly_characters, 'long-form')
         
         total_gpt_cost += gpt_cost
         total_polly_cost_generative += polly_cost_generative